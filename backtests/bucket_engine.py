@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from multi_source_alpha.backtests.ic_engine import sparse_entries
+
+
+def valid_mask(sig: np.ndarray, ret: np.ndarray, exclude_zeros: bool = False) -> np.ndarray:
+    mask = ~np.isnan(sig) & ~np.isnan(ret)
+    if exclude_zeros:
+        mask &= sig != 0
+    return mask
+
+
+def assign_buckets(sig: np.ndarray, mask: np.ndarray, n_buckets: int = 10, groups: np.ndarray = None) -> np.ndarray:
+    """
+    Bucket codes 1..n_buckets for every masked entry, 0 elsewhere.
+
+    Each row is ranked with ties broken by column order (Series.rank(method="first"))
+    and cut into equal-count buckets: floor((rank - 1) / (n / n_buckets)) + 1.
+    With integer `groups` (same shape), ranks and counts are taken within each
+    (row, group) instead, as in a sequential (conditional) sort.
+    """
+    T, N = sig.shape
+    if groups is not None:
+        return _assign_buckets_grouped(sig, mask, n_buckets, groups)
+    # Masked-out names sort last; stable lexsort keeps column order on ties
+    order = np.lexsort((np.where(mask, sig, 0.0), ~mask), axis=1)
+    ranks = np.empty((T, N), dtype=np.int64)
+    np.put_along_axis(ranks, order, np.arange(1, N + 1)[None, :], axis=1)
+
+    n = mask.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bucket = np.floor((ranks - 1) / (n / n_buckets)) + 1
+    bucket = np.clip(np.nan_to_num(bucket, nan=0.0), 1, n_buckets).astype(np.int16)
+    bucket[~mask] = 0
+    return bucket
+
+
+def _assign_buckets_grouped(sig: np.ndarray, mask: np.ndarray, n_buckets: int, groups: np.ndarray) -> np.ndarray:
+    T, N = sig.shape
+    order = np.lexsort((np.where(mask, sig, 0.0), np.where(mask, groups, 0), ~mask), axis=1)
+    g = np.take_along_axis(np.where(mask, groups, -1), order, axis=1)
+    pos = np.broadcast_to(np.arange(N), (T, N))
+
+    # Start / end of each (row, group) run in sorted order
+    new = np.ones((T, N), dtype=bool)
+    new[:, 1:] = g[:, 1:] != g[:, :-1]
+    start = np.maximum.accumulate(np.where(new, pos, 0), axis=1)
+    last = np.ones((T, N), dtype=bool)
+    last[:, :-1] = new[:, 1:]
+    end = np.minimum.accumulate(np.where(last, pos, N - 1)[:, ::-1], axis=1)[:, ::-1]
+
+    rank = pos - start + 1
+    n = end - start + 1
+    bucket_sorted = np.clip(np.floor((rank - 1) / (n / n_buckets)) + 1, 1, n_buckets).astype(np.int16)
+    bucket = np.empty((T, N), dtype=np.int16)
+    np.put_along_axis(bucket, order, bucket_sorted, axis=1)
+    bucket[~mask] = 0
+    return bucket
+
+
+def bucket_means(buckets: np.ndarray, values: np.ndarray, n_buckets: int = 10) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-row mean of `values` in each bucket via grouped sums/counts.
+    Returns (means, counts), both rows x n_buckets; empty buckets are NaN.
+    """
+    T = buckets.shape[0]
+    keep = buckets > 0
+    codes = (np.arange(T)[:, None] * n_buckets + buckets - 1)[keep]
+    size = T * n_buckets
+    sums = np.bincount(codes, weights=values[keep], minlength=size).reshape(T, n_buckets)
+    counts = np.bincount(codes, minlength=size).reshape(T, n_buckets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return means, counts
+
+
+def compute_bucket_returns(signal: pd.DataFrame,
+                           fwd: pd.DataFrame,
+                           n_buckets: int = 10,
+                           min_obs: int = 50,
+                           exclude_zeros: bool = False) -> pd.DataFrame:
+    """
+    Mean forward return per signal bucket per date (dates x buckets 1..n_buckets).
+    Dates with fewer than `min_obs` valid names are dropped.
+    """
+    cols = signal.columns.intersection(fwd.columns)
+    sig = signal.reindex(columns=cols).to_numpy(dtype=float)
+    ret = fwd.reindex(index=signal.index, columns=cols).to_numpy(dtype=float)
+
+    mask = valid_mask(sig, ret, exclude_zeros)
+    used = mask.sum(axis=1) >= min_obs
+
+    buckets = assign_buckets(sig[used], mask[used], n_buckets)
+    means, _ = bucket_means(buckets, ret[used], n_buckets)
+    return pd.DataFrame(means,
+                        index=pd.DatetimeIndex(signal.index[used]),
+                        columns=range(1, n_buckets + 1))
+
+
+def compute_bucket_returns_sparse(signal,
+                                  dates: pd.DatetimeIndex,
+                                  tickers: pd.Index,
+                                  fwd: pd.DataFrame,
+                                  n_buckets: int = 10,
+                                  min_obs: int = 50) -> pd.DataFrame:
+    """
+    Same as compute_bucket_returns(..., exclude_zeros=True) for a CSR
+    dates x tickers signal, working only on its non-zero entries.
+    """
+    rows, cols, sig, ret = sparse_entries(signal, dates, tickers, fwd)
+    T = len(dates)
+    n = np.bincount(rows, minlength=T)
+    used = n >= min_obs
+    keep = used[rows]
+    rows, cols, sig, ret = rows[keep], cols[keep], sig[keep], ret[keep]
+
+    # Rank within each date, ties broken by column order (rank(method="first"))
+    order = np.lexsort((cols, sig, rows))
+    row_start = np.concatenate(([0], np.cumsum(n * used)))[:-1]
+    ranks = np.empty(len(rows), dtype=np.int64)
+    ranks[order] = np.arange(len(rows)) - row_start[rows[order]] + 1
+
+    bucket = np.floor((ranks - 1) / (n[rows] / n_buckets)) + 1
+    bucket = np.clip(bucket, 1, n_buckets).astype(np.int64)
+
+    codes = rows * n_buckets + bucket - 1
+    sums = np.bincount(codes, weights=ret, minlength=T * n_buckets).reshape(T, n_buckets)
+    counts = np.bincount(codes, minlength=T * n_buckets).reshape(T, n_buckets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums[used] / counts[used]
+    return pd.DataFrame(means,
+                        index=pd.DatetimeIndex(dates[used]),
+                        columns=range(1, n_buckets + 1))
@@ -0,0 +1,147 @@
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from multi_source_alpha.backtests.bucket_engine import assign_buckets
+from multi_source_alpha.data_providers.panel_store import read_sparse_panel
+from multi_source_alpha.signals.returns import load_forward_returns
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MOM_PATH = REPO_ROOT / "data" / "signals" / "momentum_z.parquet"
+SENT_PATH = REPO_ROOT / "data" / "sentiment" / "processed" / "earnings_sentiment_daily.csr"
+VOL_PATH = REPO_ROOT / "data" / "volume" / "processed" / "volume_shock_z.parquet"
+OUT_PATH = REPO_ROOT / "data" / "research" / "conditional_sort.csv"
+
+SORT_METHODS = ("independent", "sequential")
+
+
+# ------------------------
+# Cell assignment
+# ------------------------
+def assign_cells(sigs: list[np.ndarray],
+                 mask: np.ndarray,
+                 n_buckets: tuple[int, ...],
+                 method: str = "independent") -> np.ndarray:
+    """
+    Integer cell code per entry (-1 where masked out) for an N-way sort.
+
+    "independent": every signal is bucketed over the full cross-section.
+    "sequential": each signal is bucketed within the cells of the ones before
+    it (e.g. sentiment terciles inside each momentum quintile).
+    Cell code = row-major position of (b1, ..., bk) in the n1 x ... x nk grid.
+    """
+    if method not in SORT_METHODS:
+        raise ValueError(f"Unknown sort method {method!r}; expected one of {SORT_METHODS}")
+    cell = np.zeros(mask.shape, dtype=np.int32)
+    for k, (sig, nb) in enumerate(zip(sigs, n_buckets)):
+        groups = cell if method == "sequential" and k > 0 else None
+        b = assign_buckets(sig, mask, nb, groups=groups)
+        cell = cell * nb + (b.astype(np.int32) - 1)
+    cell[~mask] = -1
+    return cell
+
+
+def cell_means(cells: np.ndarray, values: np.ndarray, n_cells: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (dates x cells) mean of `values` and name count per cell, from one
+    bincount over date * n_cells + cell.
+    """
+    T = cells.shape[0]
+    ok = cells >= 0
+    codes = (np.arange(T)[:, None] * n_cells + cells)[ok]
+    sums = np.bincount(codes, weights=values[ok], minlength=T * n_cells).reshape(T, n_cells)
+    counts = np.bincount(codes, minlength=T * n_cells).reshape(T, n_cells)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return means, counts
+
+
+# ------------------------
+# Conditional sort
+# ------------------------
+def conditional_sort_returns(signals: dict,
+                             fwd: pd.DataFrame,
+                             n_buckets=5,
+                             method: str = "independent",
+                             min_obs: int = 50,
+                             exclude_zeros=()) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Mean forward return and name count per (date, cell) for a 2- or 3-way
+    sort on the dates x tickers panels in `signals` (sorted in dict order).
+
+    `n_buckets` is an int or one count per signal; names listed in
+    `exclude_zeros` treat 0 as "no signal" (e.g. sentiment off event days).
+    Only names valid on every signal and on `fwd` are sorted, and dates with
+    fewer than `min_obs` of them are dropped.
+    Returns (means, counts), dates x MultiIndex columns of bucket labels.
+    """
+    names = list(signals)
+    nb = (n_buckets,) * len(names) if np.isscalar(n_buckets) else tuple(n_buckets)
+    if len(nb) != len(names):
+        raise ValueError(f"Got {len(nb)} bucket counts for {len(names)} signals")
+
+    dates = fwd.index
+    cols = fwd.columns
+    for s in signals.values():
+        dates = dates.intersection(s.index)
+        cols = cols.intersection(s.columns)
+    ret = fwd.reindex(index=dates, columns=cols).to_numpy(dtype=float)
+    sigs = [signals[n].reindex(index=dates, columns=cols).to_numpy(dtype=float) for n in names]
+
+    mask = ~np.isnan(ret)
+    for n, sig in zip(names, sigs):
+        mask &= ~np.isnan(sig)
+        if n in exclude_zeros:
+            mask &= sig != 0
+    used = mask.sum(axis=1) >= min_obs
+
+    cells = assign_cells([s[used] for s in sigs], mask[used], nb, method)
+    means, counts = cell_means(cells, ret[used], int(np.prod(nb)))
+
+    labels = pd.MultiIndex.from_product([range(1, k + 1) for k in nb], names=names)
+    index = pd.DatetimeIndex(dates[used])
+    return (pd.DataFrame(means, index=index, columns=labels),
+            pd.DataFrame(counts, index=index, columns=labels))
+
+
+def summarize_cells(means: pd.DataFrame, counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per cell: time-series mean of the daily cell return, average names per
+    date and the number of dates the cell was populated.
+    """
+    return pd.DataFrame({
+        "mean_ret": means.mean(),
+        "avg_names": counts.mean(),
+        "n_dates": means.notna().sum(),
+    })
+
+
+def main(horizon: int = 63, n_buckets=5, method: str = "independent"):
+    print("[Load] Signals")
+    mom = pd.read_parquet(MOM_PATH)
+    vol = pd.read_parquet(VOL_PATH)
+    sent, sent_dates, sent_tickers = read_sparse_panel(SENT_PATH)
+    sent = pd.DataFrame(sent.toarray(), index=sent_dates, columns=sent_tickers)
+
+    print(f"[Load] Forward returns ({horizon}d)")
+    fwd = load_forward_returns(horizon)
+
+    signals = {"momentum": mom, "sentiment": sent, "volume_shock": vol}
+    print(f"[Compute] {method} {n_buckets}-bucket sort on {', '.join(signals)}")
+    means, counts = conditional_sort_returns(signals, fwd, n_buckets=n_buckets, method=method,
+                                             exclude_zeros=("sentiment",))
+    table = summarize_cells(means, counts)
+    print(f"\n=== {horizon}d forward return by cell ({len(means)} dates) ===")
+    print(table.to_string(float_format=lambda v: f"{v: .4f}"))
+
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(OUT_PATH)
+    print(f"\n[Saved] {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_source_alpha.backtests.conditional_sort [--sequential] [--buckets 3]
+    args = sys.argv[1:]
+    main(n_buckets=int(args[args.index("--buckets") + 1]) if "--buckets" in args else 5,
+         method="sequential" if "--sequential" in args else "independent")
@@ -1,42 +1,26 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import spearmanr
 import sys
 import os
 # Add the parent directory of 'multi_source_alpha' to the path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from multi_source_alpha.signals.momentum import load_sp500_adj_close
-from multi_source_alpha.signals.returns import compute_forward_returns
+from multi_source_alpha.backtests.ic_engine import compute_ic_sparse
+from multi_source_alpha.backtests.significance import print_significance, summarize_significance
+from multi_source_alpha.data_providers.panel_store import read_sparse_panel
+from multi_source_alpha.signals.returns import load_forward_returns
 from pathlib import Path
 REPO_ROOT = Path(__file__).resolve().parents[1]
-SENT_PATH = REPO_ROOT / "data" / "sentiment" / "processed" / "earnings_sentiment_daily.parquet"
-sent = pd.read_parquet(SENT_PATH)
+SENT_PATH = REPO_ROOT / "data" / "sentiment" / "processed" / "earnings_sentiment_daily.csr"
 
-def compute_ic_series(sent: pd.DataFrame, fwd: pd.DataFrame, min_obs=50) -> pd.Series:
+def compute_ic_series(sent, dates: pd.DatetimeIndex, tickers: pd.Index, fwd: pd.DataFrame, min_obs=50) -> pd.Series:
     """
-    Cross-sectional Spearman IC at each date.
+    Cross-sectional Spearman IC at each date of the CSR sentiment panel
+    (zero sentiment = no signal, so only stored entries are used).
     """
-    ics = []
+    return compute_ic_sparse(sent, dates, tickers, fwd, min_obs=min_obs)
 
-    for date in sent.index:
-        s_t = sent.loc[date]
-        r_t = fwd.loc[date]
 
-        valid = s_t.replace(0, np.nan).dropna().index.intersection(
-            r_t.dropna().index
-        )
-
-        if len(valid) < min_obs:
-            ics.append(np.nan)
-            continue
-
-        ic, _ = spearmanr(s_t.loc[valid], r_t.loc[valid])
-        ics.append(ic)
-
-    return pd.Series(ics, index=sent.index)
-
-
-def summarize_ic(ic: pd.Series) -> None:
+def summarize_ic(ic: pd.Series, horizon: int = 63) -> None:
     ic = ic.dropna()
 
     mean_ic = ic.mean()
@@ -47,25 +31,24 @@ def summarize_ic(ic: pd.Series) -> None:
     print("\n=== Earnings Sentiment IC Summary ===")
     print(f"Mean IC        : {mean_ic:.5f}")
     print(f"IC Std Dev    : {std_ic:.5f}")
-    print(f"IC t-stat     : {t_stat:.2f}")
+    print(f"IC t-stat     : {t_stat:.2f}  (naive; {horizon}d returns overlap)")
     print(f"% Positive IC : {pct_pos:.2f}%")
+    print_significance(summarize_significance(ic, horizon=horizon), "Earnings Sentiment IC Significance")
 
 
 def main():
     print("[Load] Earnings sentiment")
-    sent = pd.read_parquet(SENT_PATH)
+    sent, dates, tickers = read_sparse_panel(SENT_PATH)
 
-    print("[Load] Prices & forward returns")
-    prices = load_sp500_adj_close()
-    fwd = compute_forward_returns(prices, horizons=(63,))[63]
+    print("[Load] Forward returns")
+    fwd = load_forward_returns(63)
 
     # Align dates
-    common_dates = sent.index.intersection(fwd.index)
-    sent = sent.loc[common_dates]
-    fwd = fwd.loc[common_dates]
+    keep = dates.isin(fwd.index)
+    sent, dates = sent[keep], dates[keep]
 
     print("[Compute] IC series")
-    ic_series = compute_ic_series(sent, fwd)
+    ic_series = compute_ic_series(sent, dates, tickers, fwd)
 
     summarize_ic(ic_series)
 
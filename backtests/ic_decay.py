@@ -0,0 +1,179 @@
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.sparse import issparse
+
+from multi_source_alpha.backtests.ic_engine import (
+    _ic_one_horizon,
+    _signal_mask,
+    grouped_average_rank,
+    grouped_corr,
+    rank_rows,
+)
+from multi_source_alpha.backtests.significance import newey_west_tstat
+from multi_source_alpha.data_providers.panel_store import read_sparse_panel
+from multi_source_alpha.signals.momentum import compute_momentum_zscore, compute_raw_momentum, load_sp500_adj_close
+from multi_source_alpha.signals.returns import ForwardReturns
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+VOL_PATH = REPO_ROOT / "data/volume/processed/volume_shock_z.parquet"
+SENT_PATH = REPO_ROOT / "data" / "sentiment" / "processed" / "earnings_sentiment_daily.csr"
+OUT_PATH = REPO_ROOT / "data" / "research" / "ic_decay.csv"
+
+DECAY_HORIZONS = (1, 2, 3, 5, 10, 15, 21, 42, 63, 84, 105, 126, 189, 252)
+# Sparse signals denser than this are ranked through the dense path
+DENSE_ABOVE = 0.25
+
+
+# ------------------------
+# IC per horizon
+# ------------------------
+def _positions(index: pd.Index, wanted: pd.Index) -> tuple[np.ndarray, np.ndarray]:
+    pos = index.get_indexer(wanted)
+    return pos, pos >= 0
+
+
+def dense_ic_by_horizon(signal: pd.DataFrame,
+                        provider: ForwardReturns,
+                        horizons=DECAY_HORIZONS,
+                        min_obs: int = 30,
+                        exclude_zeros: bool = False) -> pd.DataFrame:
+    """
+    dates x horizon Spearman IC of a dense signal panel. The signal is
+    ranked once; each horizon's returns are one log-price difference
+    (same ranks as simple returns) and only its return ranks are new.
+    """
+    rows, row_ok = _positions(provider.index, signal.index)
+    cols, col_ok = _positions(provider.columns, signal.columns)
+    signal = signal.iloc[row_ok, col_ok]
+    rows, cols = rows[row_ok], cols[col_ok]
+
+    sig = signal.to_numpy(dtype=float)
+    sig_mask = _signal_mask(sig, exclude_zeros)
+    sig_rank = rank_rows(np.where(sig_mask, sig, np.nan))
+
+    L = provider.log_price()[:, cols]
+    T = len(L)
+    out = {}
+    for h in horizons:
+        ret = np.full(sig.shape, np.nan)
+        ahead = rows + h < T
+        ret[ahead] = L[rows[ahead] + h] - L[rows[ahead]]
+        out[h] = _ic_one_horizon(sig, sig_mask, sig_rank, ret, min_obs)
+    return pd.DataFrame(out, index=signal.index)
+
+
+def sparse_ic_by_horizon(signal,
+                         dates: pd.DatetimeIndex,
+                         tickers: pd.Index,
+                         provider: ForwardReturns,
+                         horizons=DECAY_HORIZONS,
+                         min_obs: int = 50) -> pd.DataFrame:
+    """
+    Same for a CSR signal (zeros = no signal): each horizon only gathers the
+    log-price difference at the stored entries, O(nnz) per horizon.
+    """
+    signal = signal.tocsr()
+    entry_row = np.repeat(np.arange(signal.shape[0]), np.diff(signal.indptr))
+    rows, row_ok = _positions(provider.index, dates)
+    cols, col_ok = _positions(provider.columns, tickers)
+    sig = signal.data.astype(float)
+    keep = row_ok[entry_row] & col_ok[signal.indices] & ~np.isnan(sig) & (sig != 0)
+    entry_row, sig = entry_row[keep], sig[keep]
+    r, c = rows[entry_row], cols[signal.indices[keep]]
+
+    sig_rank = grouped_average_rank(entry_row, sig)
+
+    L = provider.log_price()
+    T = len(L)
+    out = {}
+    for h in horizons:
+        ret = np.full(len(r), np.nan)
+        ahead = r + h < T
+        ret[ahead] = L[r[ahead] + h, c[ahead]] - L[r[ahead], c[ahead]]
+        ok = ~np.isnan(ret)
+        g = entry_row[ok]
+        # Signal ranks only change on dates that lose names to missing returns
+        x_rank = sig_rank[ok]
+        lost = np.zeros(len(dates), dtype=bool)
+        lost[entry_row[~ok]] = True
+        redo = lost[g]
+        if redo.any():
+            x_rank[redo] = grouped_average_rank(g[redo], sig[ok][redo])
+        ic, n = grouped_corr(g, x_rank, grouped_average_rank(g, ret[ok]), len(dates))
+        ic[n < min_obs] = np.nan
+        out[h] = ic
+    return pd.DataFrame(out, index=dates)
+
+
+def summarize_decay(ic_by_horizon: pd.DataFrame) -> pd.DataFrame:
+    """
+    horizon x {mean IC, t-stat, hit rate, dates}. The t-stat is Newey-West
+    with h-1 lags, since h-day returns on consecutive dates overlap.
+    """
+    rows = {}
+    for h, ic in ic_by_horizon.items():
+        ic = ic.dropna()
+        rows[h] = {
+            "mean_ic": ic.mean(),
+            "t_stat": newey_west_tstat(ic, horizon=h)[0],
+            "hit_rate": (ic > 0).mean() if len(ic) else np.nan,
+            "n_dates": len(ic),
+        }
+    out = pd.DataFrame.from_dict(rows, orient="index")
+    out.index.name = "horizon"
+    return out
+
+
+def compute_ic_decay(signals: dict, provider: ForwardReturns, horizons=DECAY_HORIZONS) -> dict[str, pd.DataFrame]:
+    """
+    IC decay table per signal. Values are dense panels or (csr, dates,
+    tickers) triples for sparse signals.
+    """
+    out = {}
+    for name, signal in signals.items():
+        if isinstance(signal, tuple) and issparse(signal[0]):
+            m, dates, tickers = signal
+            if m.nnz > DENSE_ABOVE * m.shape[0] * m.shape[1]:
+                # Mostly-filled panels rank faster as dense rows (same ICs)
+                dense = pd.DataFrame(m.toarray(), index=dates, columns=tickers)
+                ic = dense_ic_by_horizon(dense, provider, horizons=horizons, min_obs=50, exclude_zeros=True)
+            else:
+                ic = sparse_ic_by_horizon(m, dates, tickers, provider, horizons=horizons)
+        else:
+            ic = dense_ic_by_horizon(signal, provider, horizons=horizons)
+        out[name] = summarize_decay(ic)
+    return out
+
+
+def main(horizons=DECAY_HORIZONS):
+    print("[Load] Prices")
+    prices = load_sp500_adj_close()
+    provider = ForwardReturns.from_store()
+
+    signals = {}
+    print("[Compute] Momentum z-score")
+    signals["momentum"] = compute_momentum_zscore(compute_raw_momentum(prices))
+    if VOL_PATH.exists():
+        print("[Load] Volume shock")
+        signals["volume_shock"] = pd.read_parquet(VOL_PATH)
+    if SENT_PATH.exists():
+        print("[Load] Earnings sentiment")
+        signals["earnings_sentiment"] = read_sparse_panel(SENT_PATH)
+
+    print(f"[Compute] IC decay over {len(horizons)} horizons ({min(horizons)}-{max(horizons)}d)")
+    decay = compute_ic_decay(signals, provider, horizons=horizons)
+    for name, table in decay.items():
+        print(f"\n=== {name} IC decay ===")
+        print(table.to_string(float_format=lambda v: f"{v: .4f}"))
+
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    pd.concat(decay, names=["signal"]).to_csv(OUT_PATH)
+    print(f"\n[Saved] {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_source_alpha.backtests.ic_decay [--all-horizons]
+    args = sys.argv[1:]
+    main(horizons=range(1, 253) if "--all-horizons" in args else DECAY_HORIZONS)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+
+def rank_rows(values: np.ndarray) -> np.ndarray:
+    """
+    Average ranks (1..n) along each row, ignoring NaNs (NaN in -> NaN out).
+    Same tie handling as scipy.stats.spearmanr.
+    """
+    return pd.DataFrame(values).rank(axis=1, method="average").to_numpy()
+
+
+def row_corr(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of each row of x with the same row of y.
+    Both inputs must share the same NaN mask. Returns (corr, n_obs).
+    """
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        xc = np.where(valid, x - (x.sum(axis=1) / n)[:, None], 0.0)
+        yc = np.where(valid, y - (y.sum(axis=1) / n)[:, None], 0.0)
+        cov = (xc * yc).sum(axis=1)
+        var = np.sqrt((xc * xc).sum(axis=1) * (yc * yc).sum(axis=1))
+        corr = cov / var
+    corr[var == 0] = np.nan
+    return corr, n
+
+
+def _signal_mask(sig: np.ndarray, exclude_zeros: bool) -> np.ndarray:
+    mask = ~np.isnan(sig)
+    if exclude_zeros:
+        mask &= sig != 0
+    return mask
+
+
+def _ic_one_horizon(sig: np.ndarray,
+                    sig_mask: np.ndarray,
+                    sig_rank: np.ndarray,
+                    ret: np.ndarray,
+                    min_obs: int) -> np.ndarray:
+    mask = sig_mask & ~np.isnan(ret)
+
+    # Signal ranks computed on the signal's own mask are reused as-is; only
+    # rows where the return panel drops extra names need re-ranking.
+    x_rank = sig_rank.copy()
+    rerank = (sig_mask & ~mask).any(axis=1)
+    if rerank.any():
+        x_rank[rerank] = rank_rows(np.where(mask[rerank], sig[rerank], np.nan))
+    x_rank[~mask] = np.nan
+    y_rank = rank_rows(np.where(mask, ret, np.nan))
+
+    ic, n = row_corr(x_rank, y_rank)
+    ic[n < min_obs] = np.nan
+    return ic
+
+
+def compute_ic(signal: pd.DataFrame,
+               fwd,
+               min_obs: int = 30,
+               exclude_zeros: bool = False):
+    """
+    Cross-sectional Spearman IC at each date of `signal`.
+
+    `fwd` is either one forward-return panel (returns a Series) or a dict
+    {horizon: panel} (returns a dates x horizon DataFrame). Per date, only
+    names with both a signal and a forward return are used (and a non-zero
+    signal if `exclude_zeros`); dates with fewer than `min_obs` names are NaN.
+    """
+    single = isinstance(fwd, pd.DataFrame)
+    panels = {None: fwd} if single else dict(fwd)
+
+    cols = signal.columns
+    for panel in panels.values():
+        cols = cols.intersection(panel.columns)
+
+    sig = signal.reindex(columns=cols).to_numpy(dtype=float)
+    sig_mask = _signal_mask(sig, exclude_zeros)
+    sig_rank = rank_rows(np.where(sig_mask, sig, np.nan))
+
+    out = {}
+    for h, panel in panels.items():
+        ret = panel.reindex(index=signal.index, columns=cols).to_numpy(dtype=float)
+        out[h] = _ic_one_horizon(sig, sig_mask, sig_rank, ret, min_obs)
+
+    if single:
+        return pd.Series(out[None], index=signal.index)
+    return pd.DataFrame(out, index=signal.index)
+
+
+# ------------------------
+# Long-format (sparse) entries: one value per (row, ticker) that is present
+# ------------------------
+def grouped_average_rank(group: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Average ranks (1..n) of `values` within each group id, in one lexsort.
+    """
+    n = len(group)
+    if n == 0:
+        return np.empty(0)
+    if group.max() < 2**16:
+        # Value sort (ties stay adjacent, so it need not be stable), then a
+        # stable radix sort on 16-bit group ids: much faster than lexsort
+        order = np.argsort(values)
+        order = order[np.argsort(group[order].astype(np.uint16), kind="stable")]
+    else:
+        order = np.lexsort((values, group))
+    g, v = group[order], values[order]
+    pos = np.arange(n)
+
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = g[1:] != g[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, pos, 0))
+    rank_first = pos - group_start + 1
+
+    new_tie = new_group.copy()
+    new_tie[1:] |= v[1:] != v[:-1]
+    tie_id = np.cumsum(new_tie) - 1
+    tie_start = np.flatnonzero(new_tie)
+    tie_lo = rank_first[tie_start]
+    tie_hi = rank_first[np.append(tie_start[1:] - 1, n - 1)]
+
+    ranks = np.empty(n)
+    ranks[order] = (tie_lo[tie_id] + tie_hi[tie_id]) / 2.0
+    return ranks
+
+
+def grouped_corr(group: np.ndarray, x: np.ndarray, y: np.ndarray, n_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of x and y within each group id. Returns (corr, n_obs).
+    """
+    n = np.bincount(group, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        xc = x - (np.bincount(group, weights=x, minlength=n_groups) / n)[group]
+        yc = y - (np.bincount(group, weights=y, minlength=n_groups) / n)[group]
+        cov = np.bincount(group, weights=xc * yc, minlength=n_groups)
+        var = np.sqrt(np.bincount(group, weights=xc * xc, minlength=n_groups)
+                      * np.bincount(group, weights=yc * yc, minlength=n_groups))
+        corr = cov / var
+    corr[var == 0] = np.nan
+    return corr, n
+
+
+def sparse_entries(signal, dates: pd.DatetimeIndex, tickers: pd.Index, fwd: pd.DataFrame):
+    """
+    (row, column, signal, forward return) for every stored non-zero entry of
+    a CSR dates x tickers signal that has a forward return.
+    """
+    signal = signal.tocsr()
+    rows = np.repeat(np.arange(signal.shape[0]), np.diff(signal.indptr))
+    ret = fwd.reindex(index=dates, columns=tickers).to_numpy(dtype=float)[rows, signal.indices]
+    sig = signal.data.astype(float)
+    keep = ~np.isnan(ret) & ~np.isnan(sig) & (sig != 0)
+    return rows[keep], signal.indices[keep], sig[keep], ret[keep]
+
+
+def compute_ic_sparse(signal,
+                      dates: pd.DatetimeIndex,
+                      tickers: pd.Index,
+                      fwd: pd.DataFrame,
+                      min_obs: int = 50) -> pd.Series:
+    """
+    Same as compute_ic(..., exclude_zeros=True) for a CSR signal, touching only
+    its non-zero entries.
+    """
+    rows, _, sig, ret = sparse_entries(signal, dates, tickers, fwd)
+    ic, n = grouped_corr(rows, grouped_average_rank(rows, sig), grouped_average_rank(rows, ret), len(dates))
+    ic[n < min_obs] = np.nan
+    return pd.Series(ic, index=dates)
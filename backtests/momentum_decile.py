@@ -1,6 +1,8 @@
-from multi_source_alpha.research.combine_factors import combine_momentum_and_returns
+from multi_source_alpha.backtests.bucket_engine import compute_bucket_returns
+from multi_source_alpha.backtests.significance import decile_spread, print_significance, summarize_significance
+from multi_source_alpha.research.combine_factors import combine_momentum_and_returns, combined_blocks
+import sys
 import pandas as pd
-import numpy as np
 
 
 def extract_momentum_and_fwd(df, horizon_label="fwd_63d"):
@@ -10,52 +12,41 @@ def extract_momentum_and_fwd(df, horizon_label="fwd_63d"):
 
 
 def compute_decile_returns(mom, fwd, n_deciles=10, debug_date_idx=300):
-    decile_returns = {d: [] for d in range(1, n_deciles + 1)}
-    dates_used = []
-
-    for idx, date in enumerate(mom.index):
-        mom_t = mom.loc[date]
-        fwd_t = fwd.loc[date]
-
-        valid = mom_t.dropna().index.intersection(fwd_t.dropna().index)
-        if len(valid) < 50:
-            continue
-
-        mom_t = mom_t.loc[valid]
-        fwd_t = fwd_t.loc[valid]
-
-        # Rank momentum cross-sectionally (ascending=True => lowest mom gets rank 1)
-        ranks = mom_t.rank(method="first")
-
-        bin_size = len(valid) / n_deciles
-        decile_cut = np.floor((ranks - 1) / bin_size) + 1
-        decile_cut = decile_cut.clip(1, n_deciles)
-
-        # --- DEBUG / SANITY CHECK (runs once) ---
-        if idx == debug_date_idx:
-            print(f"\nDEBUG DATE: {date}")
+    # --- DEBUG / SANITY CHECK (runs once) ---
+    if debug_date_idx is not None and debug_date_idx < len(mom.index):
+        row = mom.iloc[[debug_date_idx]]
+        row_fwd = fwd.reindex(index=row.index, columns=row.columns)
+        mom_by_decile = compute_bucket_returns(row, row.where(row_fwd.notna()), n_buckets=n_deciles, min_obs=50)
+        if not mom_by_decile.empty:
+            print(f"\nDEBUG DATE: {row.index[0]}")
             print("Momentum mean by decile (should be increasing if Decile 1 = lowest momentum):")
-            for d in range(1, n_deciles + 1):
-                members = decile_cut[decile_cut == d].index
-                print(d, mom_t.loc[members].mean())
+            for d, m in mom_by_decile.iloc[0].items():
+                print(d, m)
             print("If this is decreasing, your decile labels are flipped.\n")
-            # no break here; you can break if you want only this date
-            # break
-
-        for d in range(1, n_deciles + 1):
-            members = decile_cut[decile_cut == d].index
-            decile_returns[d].append(fwd_t.loc[members].mean())
 
-        dates_used.append(date)
-
-    return pd.DataFrame(decile_returns, index=pd.DatetimeIndex(dates_used)).sort_index()
+    # Rank momentum cross-sectionally (ascending => lowest mom gets decile 1)
+    return compute_bucket_returns(mom, fwd, n_buckets=n_deciles, min_obs=50).sort_index()
 
 
 if __name__ == "__main__":
-    combined = combine_momentum_and_returns()
-    mom, fwd = extract_momentum_and_fwd(combined, horizon_label="fwd_63d")
-
-    decile_df = compute_decile_returns(mom, fwd, n_deciles=10, debug_date_idx=300)
+    # Usage: python -m multi_source_alpha.backtests.momentum_decile [--budget-mb 512]
+    args = sys.argv[1:]
+    if "--budget-mb" in args:
+        # Decile returns are per date, so date blocks give the same table without the full panel
+        budget_mb = float(args[args.index("--budget-mb") + 1])
+        parts, offset = [], 0
+        for block in combined_blocks(budget_mb):
+            mom, fwd = extract_momentum_and_fwd(block, horizon_label="fwd_63d")
+            debug_idx = 300 - offset if offset <= 300 < offset + len(block) else None
+            parts.append(compute_decile_returns(mom, fwd, n_deciles=10, debug_date_idx=debug_idx))
+            offset += len(block)
+        decile_df = pd.concat(parts).sort_index()
+    else:
+        combined = combine_momentum_and_returns()
+        mom, fwd = extract_momentum_and_fwd(combined, horizon_label="fwd_63d")
+
+        decile_df = compute_decile_returns(mom, fwd, n_deciles=10, debug_date_idx=300)
 
     print("Mean forward return by decile:")
     print(decile_df.mean())
+    print_significance(summarize_significance(decile_spread(decile_df), horizon=63), "D10 - D1 Spread Significance")
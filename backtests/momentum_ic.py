@@ -1,40 +1,23 @@
+import sys
 import pandas as pd
 import numpy as np
-from scipy.stats import spearmanr
 
-from multi_source_alpha.research.combine_factors import combine_momentum_and_returns
+from multi_source_alpha.backtests.ic_engine import compute_ic
+from multi_source_alpha.backtests.significance import summarize_significance
+from multi_source_alpha.research.combine_factors import combine_momentum_and_returns, combined_blocks
 
 
 def compute_ic_series(mom: pd.DataFrame, fwd21: pd.DataFrame) -> pd.Series:
     """
     Compute daily Spearman IC between momentum and 21d forward returns.
     """
-    ics = []
+    return compute_ic(mom, fwd21, min_obs=30)
 
-    for date in mom.index:
-        mom_t = mom.loc[date]
-        fwd_t = fwd21.loc[date]
 
-        # Drop NaNs
-        valid = mom_t.dropna().index.intersection(fwd_t.dropna().index)
-        if len(valid) < 30:
-            ics.append(np.nan)
-            continue
-
-        mom_v = mom_t.loc[valid]
-        fwd_v = fwd_t.loc[valid]
-
-        # Spearman returns an object; take .correlation
-        ic = spearmanr(mom_v, fwd_v).correlation
-        ics.append(ic)
-
-    ic_series = pd.Series(ics, index=mom.index)
-    return ic_series
-
-
-def summarize_ic(ic_series: pd.Series) -> dict:
+def summarize_ic(ic_series: pd.Series, horizon: int = 63) -> dict:
     """
-    Compute mean IC, std, t-stat, and percent positive IC.
+    Compute mean IC, std, t-stat, and percent positive IC, plus the
+    overlap-adjusted (Newey-West) t-stat and a block-bootstrap CI.
     """
     valid = ic_series.dropna()
 
@@ -43,21 +26,31 @@ def summarize_ic(ic_series: pd.Series) -> dict:
     t_stat = mean_ic / (std_ic / np.sqrt(valid.count()))
     pct_positive = (valid[valid > 0].count() / valid.count()) * 100
 
+    sig = summarize_significance(valid, horizon=horizon)
     return {
         "Mean IC": mean_ic,
         "IC Std Dev": std_ic,
         "IC t-stat": t_stat,
+        "IC NW t-stat": sig["NW t-stat"],
+        "IC CI 95% low": sig["CI 95% low"],
+        "IC CI 95% high": sig["CI 95% high"],
+        "Bootstrap p-value": sig["Bootstrap p-value"],
         "Pct Positive IC": pct_positive,
     }
 
 
 if __name__ == "__main__":
-    combined = combine_momentum_and_returns()
-    mom = combined["mom"]
-    fwd63 = combined["fwd_63d"]
-
-    ic_series = compute_ic_series(mom, fwd63)
-    summary = summarize_ic(ic_series)
+    # Usage: python -m multi_source_alpha.backtests.momentum_ic [--budget-mb 512]
+    args = sys.argv[1:]
+    if "--budget-mb" in args:
+        # IC is per date, so date blocks give the same series without the full panel
+        budget_mb = float(args[args.index("--budget-mb") + 1])
+        ic_series = pd.concat([compute_ic_series(block["mom"], block["fwd_63d"])
+                               for block in combined_blocks(budget_mb)])
+    else:
+        combined = combine_momentum_and_returns()
+        ic_series = compute_ic_series(combined["mom"], combined["fwd_63d"])
+    summary = summarize_ic(ic_series, horizon=63)
 
     print("IC Summary:")
     for k, v in summary.items():
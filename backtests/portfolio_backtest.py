@@ -1,8 +1,18 @@
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+from multi_source_alpha.backtests.rebalance_engine import (
+    rebalance_mask,
+    simulate_rebalanced,
+    targets_from_events,
+    targets_from_weights,
+)
+from multi_source_alpha.data_providers.panel_store import ADJ_CLOSE_STORE, load_adj_close
+from multi_source_alpha.pipeline.profiling import profiled, step
+
 # ------------------------
 # Paths (robust: absolute repo root)
 # ------------------------
@@ -10,7 +20,7 @@ REPO_ROOT = Path(__file__).resolve().parents[1]  # .../multi_source_alpha
 DATA_DIR = REPO_ROOT / "data"
 
 WEIGHTS_PATH = DATA_DIR / "portfolio" / "weights_long_only.parquet"
-PRICES_PATH = DATA_DIR / "prices" / "sp500_adj_close.csv"
+PRICES_PATH = ADJ_CLOSE_STORE
 
 OUT_DIR = DATA_DIR / "portfolio"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -69,24 +79,13 @@ def plot_equity_curves(out_df: pd.DataFrame, save_path: Path):
 
 
 # ------------------------
-# Main backtest
+# Backtest core
 # ------------------------
-def main(tc_bps: float = 0.0):
-    print("[Load] Weights:", WEIGHTS_PATH)
-    W = pd.read_parquet(WEIGHTS_PATH)
-    W.index = pd.to_datetime(W.index)
-
-    print("[Load] Prices:", PRICES_PATH)
-    prices = pd.read_csv(PRICES_PATH, index_col=0, parse_dates=True).sort_index()
-
-    # Align tickers
-    common_cols = W.columns.intersection(prices.columns)
-    W = W[common_cols].sort_index()
-    prices = prices[common_cols].sort_index()
-
-    # Daily simple returns
-    rets = prices.pct_change()
-
+def run_backtest(W: pd.DataFrame, rets: pd.DataFrame, tc_bps: float = 0.0) -> tuple[pd.DataFrame, dict]:
+    """
+    Daily PnL of weights `W` against simple returns `rets` (same tickers).
+    Returns (equity/pnl/turnover frame, metrics dict).
+    """
     # Align dates
     W, rets = W.align(rets, join="inner", axis=0)
 
@@ -100,12 +99,23 @@ def main(tc_bps: float = 0.0):
     to = turnover(W).reindex(pnl.index)
     pnl_net = apply_transaction_costs(pnl, to, bps=tc_bps)
 
+    # Benchmark: equal-weight return proxy from same universe
+    bench_ret = rets.mean(axis=1).reindex(pnl.index)
+    return summarize_backtest(pnl, pnl_net, to, bench_ret, tc_bps)
+
+
+def summarize_backtest(pnl: pd.Series,
+                       pnl_net: pd.Series,
+                       to: pd.Series,
+                       bench_ret: pd.Series,
+                       tc_bps: float) -> tuple[pd.DataFrame, dict]:
+    """
+    Equity curves and metrics from daily gross/net PnL, turnover and the
+    benchmark return. Shared by the dense and the rebalance engines.
+    """
     # Equity curves
     equity = (1.0 + pnl).cumprod()
     equity_net = (1.0 + pnl_net).cumprod()
-
-    # Benchmark: equal-weight return proxy from same universe
-    bench_ret = rets.mean(axis=1).reindex(pnl.index)
     bench_equity = (1.0 + bench_ret).cumprod()
 
     # Metrics
@@ -122,6 +132,87 @@ def main(tc_bps: float = 0.0):
         "TC (bps)": tc_bps,
     }
 
+    out = pd.DataFrame(
+        {
+            "portfolio_gross": equity,
+            "portfolio_net": equity_net,
+            "benchmark_ew": bench_equity,
+            "pnl_gross": pnl,
+            "pnl_net": pnl_net,
+            "turnover": to,
+        }
+    )
+    return out, metrics
+
+
+def run_backtest_sparse(W: pd.DataFrame,
+                        rets: pd.DataFrame,
+                        tc_bps: float = 0.0,
+                        rebalance: str = "daily") -> tuple[pd.DataFrame, dict]:
+    """
+    Rebalance-driven backtest: the book is reset to the target weights on
+    each `rebalance` day (daily / weekly / monthly) and drifts with realized
+    returns in between; PnL and turnover only touch held names.
+
+    `W` is either a dates x tickers weight panel (dense or sparse dtype) or
+    long-form rebalance events with columns date, ticker, weight (in which
+    case `rebalance` is ignored). Output matches run_backtest's layout;
+    with daily rebalancing the gross PnL is the same, while turnover is
+    measured against the drifted book.
+    """
+    if {"date", "ticker", "weight"}.issubset(W.columns):
+        rows, targets = targets_from_events(W, rets.index, rets.columns)
+    else:
+        W = W.reindex(columns=rets.columns, fill_value=0.0)
+        W, rets = W.align(rets, join="inner", axis=0)
+        rows, targets = targets_from_weights(W, rebalance_mask(W.index, rebalance))
+
+    pnl, to, _ = simulate_rebalanced(rows, targets, rets.to_numpy(dtype=float))
+    pnl = pd.Series(pnl, index=rets.index)
+    to = pd.Series(to, index=rets.index)
+    pnl_net = apply_transaction_costs(pnl, to, bps=tc_bps)
+    bench_ret = rets.mean(axis=1)
+    return summarize_backtest(pnl, pnl_net, to, bench_ret, tc_bps)
+
+
+# ------------------------
+# Main backtest
+# ------------------------
+@profiled("backtest")
+def main(tc_bps: float = 0.0, rebalance: str = None):
+    """
+    rebalance=None runs the dense daily engine; "daily" / "weekly" /
+    "monthly" run the rebalance engine on that schedule.
+    """
+    print("[Load] Weights:", WEIGHTS_PATH)
+    with step("load_weights") as st:
+        W = pd.read_parquet(WEIGHTS_PATH)
+        W.index = pd.to_datetime(W.index)
+        st.output("W", W)
+
+    print("[Load] Prices:", PRICES_PATH)
+    with step("load_prices") as st:
+        prices = load_adj_close()
+        st.output("prices", prices)
+
+    # Align tickers
+    common_cols = W.columns.intersection(prices.columns)
+    W = W[common_cols].sort_index()
+    prices = prices[common_cols].sort_index()
+
+    # Daily simple returns
+    rets = prices.pct_change()
+
+    with step("pnl") as st:
+        if rebalance is None:
+            out, metrics = run_backtest(W, rets, tc_bps=tc_bps)
+        else:
+            print(f"[Compute] Rebalance engine ({rebalance})")
+            out, metrics = run_backtest_sparse(W, rets, tc_bps=tc_bps, rebalance=rebalance)
+        st.input("W", W)
+        st.input("rets", rets)
+        st.output("out", out)
+
     print("\n=== Portfolio Performance ===")
     for k, v in metrics.items():
         if isinstance(v, float):
@@ -133,21 +224,15 @@ def main(tc_bps: float = 0.0):
             print(f"{k:24s}: {v}")
 
     # Save equity curves + diagnostics
-    out = pd.DataFrame(
-        {
-            "portfolio_gross": equity,
-            "portfolio_net": equity_net,
-            "benchmark_ew": bench_equity,
-            "pnl_gross": pnl,
-            "pnl_net": pnl_net,
-            "turnover": to,
-        }
-    )
-    out.to_parquet(OUT_EQUITY_PATH)
-    pd.DataFrame([metrics]).to_csv(OUT_METRICS_PATH, index=False)
+    with step("save") as st:
+        out.to_parquet(OUT_EQUITY_PATH)
+        pd.DataFrame([metrics]).to_csv(OUT_METRICS_PATH, index=False)
+        st.output("equity_file", OUT_EQUITY_PATH)
 
     # Plot
-    plot_equity_curves(out, OUT_PLOT_PATH)
+    with step("plot") as st:
+        plot_equity_curves(out, OUT_PLOT_PATH)
+        st.output("plot_file", OUT_PLOT_PATH)
 
     print("\n[Saved] Equity curve:", OUT_EQUITY_PATH)
     print("[Saved] Metrics:", OUT_METRICS_PATH)
@@ -156,4 +241,6 @@ def main(tc_bps: float = 0.0):
 
 if __name__ == "__main__":
     # Set tc_bps to e.g. 5.0 for 5 bps per unit turnover
-    main(tc_bps=0.0)
+    # Usage: python -m multi_source_alpha.backtests.portfolio_backtest [--rebalance weekly]
+    args = sys.argv[1:]
+    main(tc_bps=0.0, rebalance=args[args.index("--rebalance") + 1] if "--rebalance" in args else None)
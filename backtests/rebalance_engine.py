@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix, issparse
+
+SCHEDULES = {"daily": None, "weekly": "W", "monthly": "M"}
+
+
+def rebalance_mask(dates: pd.DatetimeIndex, schedule: str = "daily") -> np.ndarray:
+    """
+    True on the first trading day of each period of `schedule`
+    (daily / weekly / monthly).
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown rebalance schedule {schedule!r}; expected one of {list(SCHEDULES)}")
+    if SCHEDULES[schedule] is None or len(dates) == 0:
+        return np.ones(len(dates), dtype=bool)
+    period = pd.DatetimeIndex(dates).to_period(SCHEDULES[schedule]).asi8
+    return np.r_[True, period[1:] != period[:-1]]
+
+
+def targets_from_weights(W, mask: np.ndarray = None) -> tuple[np.ndarray, csr_matrix]:
+    """
+    Rebalance targets from a dates x tickers weight panel (dense, sparse-dtype
+    DataFrame or CSR), keeping the rows where `mask` is True.
+    Returns (row positions, CSR of target weights, one row per rebalance).
+    """
+    if isinstance(W, pd.DataFrame):
+        W = W.sparse.to_coo().tocsr() if all(isinstance(t, pd.SparseDtype) for t in W.dtypes) else W.to_numpy(dtype=float)
+    rows = np.arange(W.shape[0]) if mask is None else np.flatnonzero(mask)
+    if issparse(W):
+        targets = W.tocsr()[rows]
+    else:
+        targets = csr_matrix(np.nan_to_num(np.asarray(W)[rows], nan=0.0))
+    targets.eliminate_zeros()
+    return rows, targets
+
+
+def targets_from_events(events: pd.DataFrame,
+                        dates: pd.DatetimeIndex,
+                        tickers: pd.Index) -> tuple[np.ndarray, csr_matrix]:
+    """
+    Rebalance targets from long-form events (date, ticker, weight). Each date's
+    rows are the complete target book; names left out are sold. Events on
+    non-trading days apply at the next trading day's close.
+    """
+    i = np.asarray(pd.DatetimeIndex(dates).searchsorted(pd.to_datetime(events["date"]).to_numpy(), side="left"))
+    j = pd.Index(tickers).get_indexer(events["ticker"])
+    keep = (i < len(dates)) & (j >= 0)
+    rows, inv = np.unique(i[keep], return_inverse=True)
+    w = events["weight"].to_numpy(dtype=float)[keep]
+    targets = coo_matrix((w, (inv, j[keep])), shape=(len(rows), len(tickers))).tocsr()
+    targets.eliminate_zeros()
+    return rows, targets
+
+
+def simulate_rebalanced(rows: np.ndarray, targets: csr_matrix, rets: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hold the target book set at each rebalance close and let it drift with
+    realized returns until the next one (uninvested weight is cash at 0%).
+    Each holding period is one (days x held names) block, so the work is
+    O(held names) per day. Returns (daily pnl, turnover, names held).
+    """
+    T = rets.shape[0]
+    pnl = np.zeros(T)
+    to = np.zeros(T)
+    n_held = np.zeros(T, dtype=np.int64)
+    held = np.empty(0, dtype=np.intp)
+    w = np.empty(0)
+    # Per-name scratch for trade sizes; only touched (and reset) at traded names
+    trade = np.zeros(rets.shape[1])
+    for k, a in enumerate(rows):
+        if a >= T:
+            break
+        lo, hi = targets.indptr[k], targets.indptr[k + 1]
+        cols, tw = targets.indices[lo:hi].astype(np.intp), targets.data[lo:hi].astype(float)
+        # Trade = target - drifted book, over the union of old and new names
+        trade[held] -= w
+        trade[cols] += tw
+        sold = np.abs(trade[held]).sum()
+        trade[held] = 0.0
+        to[a] = sold + np.abs(trade[cols]).sum()
+        trade[cols] = 0.0
+        held, w = cols, tw
+
+        # Drift through the days up to and including the next rebalance
+        b = rows[k + 1] if k + 1 < len(rows) else T - 1
+        b = min(b, T - 1)
+        n_held[a:b + 1] = len(held)
+        if b == a or not len(held):
+            continue
+        if b == a + 1:
+            # Daily rebalancing: a single step, no cumulative growth needed
+            g = w * rets[b, held]
+            g[np.isnan(g)] = 0.0
+            p = g.sum()
+            pnl[b] = p
+            w = (w + g) / (1.0 + p)
+            continue
+        R = rets[a + 1:b + 1, held]
+        R = np.where(np.isnan(R), 0.0, R)
+        # Growth of each name since the rebalance, as of the previous close
+        G_prev = np.ones_like(R)
+        np.cumprod(1.0 + R[:-1], axis=0, out=G_prev[1:])
+        V_prev = (1.0 - w.sum()) + G_prev @ w
+        pnl[a + 1:b + 1] = ((G_prev * R) @ w) / V_prev
+        G_end = G_prev[-1] * (1.0 + R[-1])
+        w = w * G_end / ((1.0 - w.sum()) + G_end @ w)
+    return pnl, to, n_held
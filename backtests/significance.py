@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Resamples drawn per chunk (bounds the index array to chunk x n int32s)
+RESAMPLE_CHUNK = 1000
+
+
+# ------------------------
+# Newey-West
+# ------------------------
+def default_lags(n: int, horizon: int = None) -> int:
+    """
+    Overlapping h-day returns are autocorrelated up to lag h-1; otherwise the
+    usual Newey-West rule floor(4 (n/100)^(2/9)).
+    """
+    if horizon is not None and horizon > 1:
+        return int(horizon) - 1
+    return int(np.floor(4 * (n / 100.0) ** (2.0 / 9.0)))
+
+
+def newey_west_tstat(x, lags: int = None, horizon: int = None) -> tuple[float, float, int]:
+    """
+    t-stat of the mean of `x` with a Bartlett-kernel HAC standard error.
+    Returns (t-stat, standard error of the mean, lags used).
+    """
+    x = np.asarray(pd.Series(x).dropna(), dtype=float)
+    n = len(x)
+    if n < 2:
+        return np.nan, np.nan, 0
+    lags = default_lags(n, horizon) if lags is None else int(lags)
+    lags = min(lags, n - 1)
+    e = x - x.mean()
+    # All autocovariances at once: acov[k] = sum_t e_t e_{t-k} / n
+    f = np.fft.rfft(e, 2 * n)
+    acov = np.fft.irfft(f * np.conj(f))[:lags + 1] / n
+    weights = 1.0 - np.arange(1, lags + 1) / (lags + 1.0)
+    var = acov[0] + 2.0 * (weights * acov[1:]).sum()
+    se = np.sqrt(max(var, 0.0) / n)
+    return (x.mean() / se if se > 0 else np.nan), se, lags
+
+
+# ------------------------
+# Block bootstrap
+# ------------------------
+def block_bootstrap_indices(n: int,
+                            n_resamples: int,
+                            block_len: float,
+                            method: str = "stationary",
+                            rng: np.random.Generator = None) -> np.ndarray:
+    """
+    (n_resamples x n) resample positions, built without Python loops.
+
+    "stationary": Politis-Romano, geometric block lengths with mean
+    `block_len`; "moving": fixed-length blocks. Both wrap around the end.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if method == "moving":
+        L = max(int(round(block_len)), 1)
+        n_blocks = -(-n // L)
+        starts = rng.integers(0, n, (n_resamples, n_blocks), dtype=np.int64)
+        idx = (starts[:, :, None] + np.arange(L)).reshape(n_resamples, -1)[:, :n]
+        return (idx % n).astype(np.int32)
+    if method != "stationary":
+        raise ValueError(f"Unknown bootstrap method {method!r}; expected 'stationary' or 'moving'")
+
+    new_block = rng.random((n_resamples, n)) < 1.0 / max(block_len, 1.0)
+    new_block[:, 0] = True
+    starts = rng.integers(0, n, (n_resamples, n), dtype=np.int64)
+    # Position where the current block began, and that block's random start
+    pos = np.arange(n)
+    began = np.maximum.accumulate(np.where(new_block, pos, 0), axis=1)
+    start = np.take_along_axis(starts, began, axis=1)
+    return ((start + pos - began) % n).astype(np.int32)
+
+
+def bootstrap_means(x,
+                    n_resamples: int = 10000,
+                    block_len: float = None,
+                    method: str = "stationary",
+                    seed: int = 0) -> np.ndarray:
+    """
+    Means of `n_resamples` block-bootstrap resamples of the series `x` (NaNs
+    dropped), drawn in chunks of RESAMPLE_CHUNK index arrays.
+    """
+    x = np.asarray(pd.Series(x).dropna(), dtype=float)
+    n = len(x)
+    if n == 0:
+        return np.full(n_resamples, np.nan)
+    block_len = max(n ** (1.0 / 3.0), 1.0) if block_len is None else block_len
+    rng = np.random.default_rng(seed)
+    out = np.empty(n_resamples)
+    for i in range(0, n_resamples, RESAMPLE_CHUNK):
+        m = min(RESAMPLE_CHUNK, n_resamples - i)
+        out[i:i + m] = x[block_bootstrap_indices(n, m, block_len, method, rng)].mean(axis=1)
+    return out
+
+
+def summarize_significance(x,
+                           horizon: int = None,
+                           n_resamples: int = 10000,
+                           block_len: float = None,
+                           method: str = "stationary",
+                           alpha: float = 0.05,
+                           seed: int = 0) -> dict:
+    """
+    Mean of a daily series (IC, decile spread) with its naive and
+    Newey-West t-stats and a block-bootstrap confidence interval.
+    With an h-day `horizon`, blocks default to h days and NW lags to h-1.
+    """
+    s = pd.Series(x).dropna()
+    n = len(s)
+    if block_len is None:
+        block_len = max(horizon or 1, n ** (1.0 / 3.0)) if n else 1.0
+    nw_t, nw_se, lags = newey_west_tstat(s, horizon=horizon)
+    boot = bootstrap_means(s, n_resamples=n_resamples, block_len=block_len, method=method, seed=seed)
+    lo, hi = np.quantile(boot, [alpha / 2, 1 - alpha / 2]) if n else (np.nan, np.nan)
+    naive_se = s.std() / np.sqrt(n) if n > 1 else np.nan
+    return {
+        "Mean": s.mean(),
+        "Naive t-stat": s.mean() / naive_se if naive_se else np.nan,
+        "NW t-stat": nw_t,
+        "NW lags": lags,
+        "Bootstrap SE": boot.std(ddof=1) if n else np.nan,
+        f"CI {1 - alpha:.0%} low": lo,
+        f"CI {1 - alpha:.0%} high": hi,
+        # Two-sided: share of resampled means on the far side of zero
+        "Bootstrap p-value": min(1.0, 2 * min((boot <= 0).mean(), (boot >= 0).mean())) if n else np.nan,
+        "N": n,
+        "Block length": block_len,
+    }
+
+
+def decile_spread(bucket_returns: pd.DataFrame) -> pd.Series:
+    """
+    Daily top-minus-bottom bucket return from compute_bucket_returns output.
+    """
+    cols = sorted(bucket_returns.columns)
+    return (bucket_returns[cols[-1]] - bucket_returns[cols[0]]).rename("spread")
+
+
+def print_significance(stats: dict, title: str) -> None:
+    print(f"\n=== {title} ===")
+    for k, v in stats.items():
+        print(f"{k:18s}: {v:.5f}" if isinstance(v, float) else f"{k:18s}: {v}")
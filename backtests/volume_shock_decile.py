@@ -1,43 +1,17 @@
 import pandas as pd
-import numpy as np
 from pathlib import Path
 
+from multi_source_alpha.backtests.bucket_engine import compute_bucket_returns
+from multi_source_alpha.backtests.significance import decile_spread, print_significance, summarize_significance
+from multi_source_alpha.signals.returns import load_forward_returns
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 
 VOL_PATH = REPO_ROOT / "data/volume/processed/volume_shock_z.parquet"
-PRICES_PATH = REPO_ROOT / "data/prices/sp500_adj_close.csv"
-
-
-def load_forward_returns(horizon=21):
-    prices = pd.read_csv(PRICES_PATH, index_col=0, parse_dates=True)
-    fwd = prices.shift(-horizon) / prices - 1.0
-    return fwd
 
 
 def compute_decile_returns(signal, fwd, n_deciles=10):
-    decile_returns = {d: [] for d in range(1, n_deciles + 1)}
-
-    for date in signal.index:
-        s = signal.loc[date]
-        r = fwd.loc[date]
-
-        valid = s.dropna().index.intersection(r.dropna().index)
-        if len(valid) < 50:
-            continue
-
-        s = s.loc[valid]
-        r = r.loc[valid]
-
-        ranks = s.rank(method="first")
-        bin_size = len(valid) / n_deciles
-        decile = np.floor((ranks - 1) / bin_size) + 1
-        decile = decile.clip(1, n_deciles)
-
-        for d in range(1, n_deciles + 1):
-            members = decile[decile == d].index
-            decile_returns[d].append(r.loc[members].mean())
-
-    return pd.DataFrame(decile_returns).mean()
+    return compute_bucket_returns(signal, fwd, n_buckets=n_deciles, min_obs=50)
 
 
 def main():
@@ -51,11 +25,13 @@ def main():
     vol = vol.loc[common_dates]
     fwd63 = fwd63.loc[common_dates]
     print("[Compute] Decile returns")
-    mean_deciles = compute_decile_returns(vol, fwd63)
+    deciles = compute_decile_returns(vol, fwd63)
+    mean_deciles = deciles.mean()
 
     print("\nMean forward return by volume shock decile:")
     print(mean_deciles)
     print("\nD10 - D1:", mean_deciles[10] - mean_deciles[1])
+    print_significance(summarize_significance(decile_spread(deciles), horizon=63), "D10 - D1 Spread Significance")
 
 
 if __name__ == "__main__":
@@ -1,36 +1,18 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import spearmanr
 from pathlib import Path
 
+from multi_source_alpha.backtests.ic_engine import compute_ic
+from multi_source_alpha.backtests.significance import print_significance, summarize_significance
+from multi_source_alpha.signals.returns import load_forward_returns
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 
 VOL_PATH = REPO_ROOT / "data/volume/processed/volume_shock_z.parquet"
-PRICES_PATH = REPO_ROOT / "data/prices/sp500_adj_close.csv"
-
-
-def load_forward_returns(horizon=21):
-    prices = pd.read_csv(PRICES_PATH, index_col=0, parse_dates=True)
-    fwd = prices.shift(-horizon) / prices - 1.0
-    return fwd
 
 
 def compute_ic_series(signal, fwd):
-    ics = []
-
-    for date in signal.index:
-        s = signal.loc[date]
-        r = fwd.loc[date]
-
-        valid = s.dropna().index.intersection(r.dropna().index)
-        if len(valid) < 30:
-            ics.append(np.nan)
-            continue
-
-        ic, _ = spearmanr(s.loc[valid], r.loc[valid])
-        ics.append(ic)
-
-    return pd.Series(ics, index=signal.index)
+    return compute_ic(signal, fwd, min_obs=30)
 
 
 def main():
@@ -52,8 +34,9 @@ def main():
 
     print("\n=== Volume Shock IC Summary ===")
     print(f"Mean IC      : {mean_ic:.5f}")
-    print(f"IC t-stat   : {t_stat:.2f}")
+    print(f"IC t-stat   : {t_stat:.2f}  (naive; 63d returns overlap)")
     print(f"% Positive  : {pct_pos:.2f}%")
+    print_significance(summarize_significance(ic, horizon=63), "Volume Shock IC Significance")
 
     print("\nLast 10 IC values:")
     print(ic.tail(10))
@@ -0,0 +1,377 @@
+import json
+import multiprocessing
+import platform
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+# Add the parent directory of 'multi_source_alpha' to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import numpy as np
+import pandas as pd
+
+from multi_source_alpha.pipeline.proc_stats import max_rss_mb, proc_status_mb, reset_peak_rss
+from multi_source_alpha.benchmarks.synthetic import (
+    SCALES,
+    synthetic_prices,
+    synthetic_volume,
+    synthetic_earnings_events,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BENCH_DIR = REPO_ROOT / "data" / "benchmarks"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+LATEST_PATH = BENCH_DIR / "latest.json"
+
+# A case is slower than its baseline when wall time grows by more than this
+DEFAULT_TOLERANCE = 0.25
+
+
+# ------------------------
+# Inputs (built once per worker process, deterministic per scale)
+# ------------------------
+_INPUTS = {}
+
+
+def _input(name: str, scale: str):
+    key = (name, scale)
+    if key not in _INPUTS:
+        _INPUTS[key] = _BUILDERS[name](scale)
+    return _INPUTS[key]
+
+
+def _prices(scale):
+    n_tickers, n_years = SCALES[scale]
+    return synthetic_prices(n_tickers, n_years)
+
+
+def _volume(scale):
+    return synthetic_volume(_input("prices", scale))
+
+
+def _events(scale):
+    return synthetic_earnings_events(_input("prices", scale))
+
+
+def _event_surprise(scale):
+    from multi_source_alpha.signals.sentiment.earnings import compute_eps_surprise
+    return compute_eps_surprise(_input("events", scale))
+
+
+def _event_z(scale):
+    from multi_source_alpha.signals.sentiment.earnings import standardize_surprise_within_ticker
+    return standardize_surprise_within_ticker(_input("event_surprise", scale))
+
+
+def _sentiment(scale):
+    from multi_source_alpha.signals.sentiment.earnings import build_daily_decayed_sentiment
+    return build_daily_decayed_sentiment(_input("event_z", scale), _input("prices", scale).index)
+
+
+def _momentum_z(scale):
+    from multi_source_alpha.signals.momentum import compute_raw_momentum, compute_momentum_zscore
+    return compute_momentum_zscore(compute_raw_momentum(_input("prices", scale)))
+
+
+def _fwd_63(scale):
+    from multi_source_alpha.signals.returns import compute_forward_returns
+    return compute_forward_returns(_input("prices", scale), horizons=(63,))[63]
+
+
+def _raw_weights(scale):
+    # Top-quintile momentum names, equal raw score (what build_weights feeds normalize_long_only)
+    mom = _input("momentum_z", scale)
+    return (mom.ge(mom.quantile(0.8, axis=1), axis=0)).astype(float)
+
+
+def _weights(scale):
+    from multi_source_alpha.scripts.build_portfolio_weights import normalize_long_only
+    return normalize_long_only(_input("raw_weights", scale))
+
+
+def _rets(scale):
+    return _input("prices", scale).pct_change()
+
+
+_BUILDERS = {
+    "prices": _prices,
+    "volume": _volume,
+    "events": _events,
+    "event_surprise": _event_surprise,
+    "event_z": _event_z,
+    "sentiment": _sentiment,
+    "momentum_z": _momentum_z,
+    "fwd_63": _fwd_63,
+    "raw_weights": _raw_weights,
+    "weights": _weights,
+    "rets": _rets,
+}
+
+
+# ------------------------
+# Cases: name -> setup(scale) returning (callable, n_items, item label)
+# ------------------------
+def _case_raw_momentum(scale):
+    from multi_source_alpha.signals.momentum import compute_raw_momentum
+    prices = _input("prices", scale)
+    return (lambda: compute_raw_momentum(prices)), prices.size, "cells"
+
+
+def _case_forward_returns(scale):
+    from multi_source_alpha.signals.returns import compute_forward_returns
+    prices = _input("prices", scale)
+    return (lambda: compute_forward_returns(prices)), prices.size, "cells"
+
+
+def _case_forward_returns_lazy(scale):
+    from multi_source_alpha.signals.returns import ForwardReturns
+    prices = _input("prices", scale)
+    # In-memory provider: one log pass, then a subtraction + expm1 per horizon
+    run = lambda: ForwardReturns.from_frame(prices, cache_dir=None).horizons((1, 5, 21, 63))
+    return run, prices.size, "cells"
+
+
+def _case_merge_events(scale):
+    from multi_source_alpha.data_providers.event_store import resolve_priority, to_canonical
+    events = _input("events", scale)
+    # Same prints from both sources, so every (symbol, date) needs resolving
+    kaggle, finnhub = to_canonical(events, "kaggle"), to_canonical(events, "finnhub")
+    return (lambda: resolve_priority([kaggle, finnhub])), 2 * len(events), "events"
+
+
+def _case_volume_shock(scale):
+    from multi_source_alpha.signals.volume_shock import compute_volume_shock
+    volume = _input("volume", scale)
+    return (lambda: compute_volume_shock(volume)), volume.size, "cells"
+
+
+def _case_standardize_surprise(scale):
+    from multi_source_alpha.signals.sentiment.earnings import standardize_surprise_within_ticker
+    surprise = _input("event_surprise", scale)
+    return (lambda: standardize_surprise_within_ticker(surprise)), len(surprise), "events"
+
+
+def _case_decayed_sentiment(scale):
+    from multi_source_alpha.signals.sentiment.earnings import build_daily_decayed_sentiment
+    event_z = _input("event_z", scale)
+    index = _input("prices", scale).index
+    n_cells = len(index) * event_z["ticker"].nunique()
+    return (lambda: build_daily_decayed_sentiment(event_z, index)), n_cells, "cells"
+
+
+def _case_ic(scale):
+    from multi_source_alpha.backtests.ic_engine import compute_ic
+    mom, fwd = _input("momentum_z", scale), _input("fwd_63", scale)
+    return (lambda: compute_ic(mom, fwd)), mom.size, "cells"
+
+
+def _case_deciles(scale):
+    from multi_source_alpha.backtests.bucket_engine import compute_bucket_returns
+    mom, fwd = _input("momentum_z", scale), _input("fwd_63", scale)
+    return (lambda: compute_bucket_returns(mom, fwd)), mom.size, "cells"
+
+
+def _case_sentiment_ic_sparse(scale):
+    from scipy.sparse import csr_matrix
+    from multi_source_alpha.backtests.ic_engine import compute_ic_sparse
+    sent, fwd = _input("sentiment", scale), _input("fwd_63", scale)
+    m = csr_matrix(sent.to_numpy())
+    return (lambda: compute_ic_sparse(m, sent.index, sent.columns, fwd)), sent.size, "cells"
+
+
+def _case_bootstrap_ic(scale):
+    from multi_source_alpha.backtests.ic_engine import compute_ic
+    from multi_source_alpha.backtests.significance import summarize_significance
+    ic = compute_ic(_input("momentum_z", scale), _input("fwd_63", scale))
+    return (lambda: summarize_significance(ic, horizon=63, n_resamples=10000)), 10000 * ic.notna().sum(), "draws"
+
+
+def _case_triple_sort(scale):
+    from multi_source_alpha.backtests.conditional_sort import conditional_sort_returns
+    from multi_source_alpha.signals.volume_shock import compute_volume_shock
+    mom, fwd = _input("momentum_z", scale), _input("fwd_63", scale)
+    signals = {"momentum": mom, "sentiment": _input("sentiment", scale),
+               "volume_shock": compute_volume_shock(_input("volume", scale))}
+    return (lambda: conditional_sort_returns(signals, fwd, n_buckets=5, method="sequential")), mom.size, "cells"
+
+
+def _case_normalize_long_only(scale):
+    from multi_source_alpha.scripts.build_portfolio_weights import normalize_long_only
+    raw = _input("raw_weights", scale)
+    return (lambda: normalize_long_only(raw)), raw.size, "cells"
+
+
+def _case_portfolio_backtest(scale):
+    from multi_source_alpha.backtests.portfolio_backtest import run_backtest
+    W, rets = _input("weights", scale), _input("rets", scale)
+    return (lambda: run_backtest(W, rets, tc_bps=5.0)), W.size, "cells"
+
+
+def _case_portfolio_backtest_sparse(scale):
+    from multi_source_alpha.backtests.portfolio_backtest import run_backtest_sparse
+    W, rets = _input("weights", scale), _input("rets", scale)
+    return (lambda: run_backtest_sparse(W, rets, tc_bps=5.0, rebalance="weekly")), W.size, "cells"
+
+
+CASES = {
+    "raw_momentum": _case_raw_momentum,
+    "forward_returns": _case_forward_returns,
+    "forward_returns_lazy": _case_forward_returns_lazy,
+    "merge_events": _case_merge_events,
+    "volume_shock": _case_volume_shock,
+    "standardize_surprise": _case_standardize_surprise,
+    "decayed_sentiment": _case_decayed_sentiment,
+    "ic": _case_ic,
+    "deciles": _case_deciles,
+    "sentiment_ic_sparse": _case_sentiment_ic_sparse,
+    "bootstrap_ic": _case_bootstrap_ic,
+    "triple_sort": _case_triple_sort,
+    "normalize_long_only": _case_normalize_long_only,
+    "portfolio_backtest": _case_portfolio_backtest,
+    "portfolio_backtest_sparse": _case_portfolio_backtest_sparse,
+}
+
+
+# ------------------------
+# Measurement
+# ------------------------
+def run_case(case: str, scale: str, repeat: int = 3) -> dict:
+    """
+    Time `case` at `scale` (best of `repeat` runs) and record the process
+    peak RSS while it runs. Meant to run in a fresh worker process.
+    """
+    fn, n_items, unit = CASES[case](scale)
+    rss_before = proc_status_mb("VmRSS") or max_rss_mb() or float("nan")
+    exact_peak = reset_peak_rss()
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    peak = (proc_status_mb("VmHWM") if exact_peak else None) or max_rss_mb() or float("nan")
+    wall = min(times)
+    return {
+        "case": case,
+        "scale": scale,
+        "wall_s": wall,
+        "wall_s_all": times,
+        "peak_rss_mb": peak,
+        "delta_rss_mb": max(peak - rss_before, 0.0),
+        "items": int(n_items),
+        "unit": unit,
+        "throughput": n_items / wall if wall > 0 else float("inf"),
+    }
+
+
+def run_suite(scales=("small",), cases=None, repeat: int = 3) -> list[dict]:
+    """
+    Run every (scale, case) pair, each in its own process so peak RSS is per case.
+    """
+    cases = list(cases or CASES)
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for scale in scales:
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                res = pool.submit(run_case, case, scale, repeat).result()
+            print(f"[Bench] {scale:7s} {case:26s} {res['wall_s']:9.4f}s "
+                  f"{res['peak_rss_mb']:9.1f} MB peak  {res['throughput']:,.0f} {res['unit']}/s")
+            results.append(res)
+    return results
+
+
+# ------------------------
+# Baseline
+# ------------------------
+def _key(res: dict) -> str:
+    return f"{res['scale']}/{res['case']}"
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> dict:
+    if not Path(path).exists():
+        return {}
+    return json.loads(Path(path).read_text())["results"]
+
+
+def save_results(results: list[dict], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    existing = load_baseline(path) if path.exists() else {}
+    existing.update({_key(r): r for r in results})
+    path.write_text(json.dumps({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "results": existing,
+    }, indent=2))
+
+
+def compare_to_baseline(results: list[dict], baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> pd.DataFrame:
+    """
+    Wall-time and peak-RSS ratios (current / baseline) per case;
+    `slower` marks cases whose wall time grew by more than `tolerance`.
+    """
+    rows = []
+    for res in results:
+        base = baseline.get(_key(res))
+        if base is None:
+            rows.append({"scale": res["scale"], "case": res["case"], "wall_s": res["wall_s"],
+                         "base_wall_s": np.nan, "wall_ratio": np.nan, "rss_ratio": np.nan, "slower": False})
+            continue
+        wall_ratio = res["wall_s"] / base["wall_s"] if base["wall_s"] > 0 else np.nan
+        rows.append({
+            "scale": res["scale"],
+            "case": res["case"],
+            "wall_s": res["wall_s"],
+            "base_wall_s": base["wall_s"],
+            "wall_ratio": wall_ratio,
+            "rss_ratio": res["peak_rss_mb"] / base["peak_rss_mb"] if base["peak_rss_mb"] else np.nan,
+            "slower": bool(wall_ratio > 1.0 + tolerance),
+        })
+    return pd.DataFrame(rows)
+
+
+def main(scales=("small",), cases=None, repeat: int = 3, save_baseline: bool = False,
+         tolerance: float = DEFAULT_TOLERANCE) -> int:
+    results = run_suite(scales=scales, cases=cases, repeat=repeat)
+    save_results(results, LATEST_PATH)
+    print(f"[Saved] {LATEST_PATH}")
+
+    if save_baseline:
+        save_results(results, BASELINE_PATH)
+        print(f"[Saved] baseline {BASELINE_PATH}")
+        return 0
+
+    baseline = load_baseline()
+    if not baseline:
+        print("[Baseline] none stored yet (run with --save-baseline)")
+        return 0
+    report = compare_to_baseline(results, baseline, tolerance=tolerance)
+    print("\n=== vs baseline ===")
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    slower = report[report["slower"]]
+    if not slower.empty:
+        print(f"\n[Regression] {len(slower)} case(s) more than {tolerance:.0%} slower than baseline: "
+              + ", ".join(slower["scale"] + "/" + slower["case"]))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_source_alpha.benchmarks.run_benchmarks
+    #        [--scale small,medium] [--cases ic,deciles] [--repeat 3]
+    #        [--tolerance 0.25] [--save-baseline]
+    args = sys.argv[1:]
+    scales = args[args.index("--scale") + 1].split(",") if "--scale" in args else ("small",)
+    cases = args[args.index("--cases") + 1].split(",") if "--cases" in args else None
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 3
+    tolerance = float(args[args.index("--tolerance") + 1]) if "--tolerance" in args else DEFAULT_TOLERANCE
+    sys.exit(main(scales=scales, cases=cases, repeat=repeat,
+                  save_baseline="--save-baseline" in args, tolerance=tolerance))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# name -> (n_tickers, n_years)
+SCALES = {
+    "small": (500, 5),
+    "medium": (3000, 25),
+    "large": (10000, 25),
+}
+
+
+def synthetic_index(n_years: int, end: str = "2024-12-31") -> pd.DatetimeIndex:
+    return pd.bdate_range(end=end, periods=n_years * TRADING_DAYS, name="Date")
+
+
+def synthetic_tickers(n_tickers: int) -> pd.Index:
+    return pd.Index([f"T{i:05d}" for i in range(n_tickers)])
+
+
+def synthetic_prices(n_tickers: int, n_years: int, seed: int = 0, listed_frac: float = 0.9) -> pd.DataFrame:
+    """
+    Geometric random-walk adjusted closes (dates x tickers). A (1 - listed_frac)
+    share of names lists part-way through the sample (NaN before listing),
+    as in the real S&P 500 panel.
+    """
+    rng = np.random.default_rng(seed)
+    dates = synthetic_index(n_years)
+    T = len(dates)
+    vol = rng.uniform(0.01, 0.03, n_tickers)
+    log_ret = rng.standard_normal((T, n_tickers)) * vol + 0.0003
+    prices = 50.0 * np.exp(np.cumsum(log_ret, axis=0))
+
+    late = rng.random(n_tickers) > listed_frac
+    first = np.where(late, rng.integers(0, T, n_tickers), 0)
+    prices[np.arange(T)[:, None] < first[None, :]] = np.nan
+    return pd.DataFrame(prices, index=dates, columns=synthetic_tickers(n_tickers))
+
+
+def synthetic_volume(prices: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    """
+    Log-normal daily share volume with occasional spikes, NaN where prices are.
+    """
+    rng = np.random.default_rng(seed)
+    T, N = prices.shape
+    level = rng.uniform(13.0, 17.0, N)
+    logv = level + 0.4 * rng.standard_normal((T, N))
+    logv += np.where(rng.random((T, N)) < 0.01, rng.uniform(1.0, 2.5, (T, N)), 0.0)
+    vol = np.round(np.exp(logv))
+    vol[np.isnan(prices.to_numpy())] = np.nan
+    return pd.DataFrame(vol, index=prices.index, columns=prices.columns)
+
+
+def synthetic_earnings_events(prices: pd.DataFrame, seed: int = 2) -> pd.DataFrame:
+    """
+    Quarterly earnings events per listed ticker in the canonical event layout
+    (symbol, date, epsActual, epsEstimate, source).
+    """
+    rng = np.random.default_rng(seed)
+    dates = prices.index
+    listed = prices.notna().to_numpy()
+    rows = []
+    for j, ticker in enumerate(prices.columns):
+        first = int(np.argmax(listed[:, j]))
+        pos = np.arange(first + int(rng.integers(0, 63)), len(dates), 63)
+        pos = np.clip(pos + rng.integers(-5, 6, len(pos)), 0, len(dates) - 1)
+        est = rng.normal(1.0, 0.5, len(pos))
+        actual = est + rng.normal(0.02, 0.2, len(pos))
+        rows.append(pd.DataFrame({
+            "symbol": ticker,
+            "date": dates[pos],
+            "epsActual": actual,
+            "epsEstimate": est,
+        }))
+    events = pd.concat(rows, ignore_index=True).drop_duplicates(subset=["symbol", "date"])
+    events["source"] = "synthetic"
+    return events.sort_values(["date", "symbol"]).reset_index(drop=True)
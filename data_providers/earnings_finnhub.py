@@ -1,22 +1,27 @@
 import os 
+import json
 import time 
+import asyncio
 import pandas as pd
 import requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
-from datetime import date,timedelta
+from datetime import date,datetime,timedelta,timezone
+from email.utils import parsedate_to_datetime
 Base_URL = "https://finnhub.io/api/v1/"
+CACHE_DIR = Path(__file__).parent.parent / "data" / "sentiment" / "raw" / "finnhub_cache"
 def _get_key() -> str:
     key = os.getenv("FINNHUB_API_KEY")
     if not key:
         raise RuntimeError("Finnhub API key not found. Please set the FINNHUB_API_KEY environment variable.")
     return key
 
-def fetch_earnings_calendar(from_date:str, to_date:str) -> pd.DataFrame:
+def fetch_earnings_calendar(from_date:str, to_date:str, base_url:str = Base_URL) -> pd.DataFrame:
     key = _get_key()
-    url = f"{Base_URL}calendar/earnings"
+    url = f"{base_url}calendar/earnings"
     params = {
         "from": from_date,
         "to": to_date,
@@ -33,21 +38,181 @@ def fetch_earnings_calendar(from_date:str, to_date:str) -> pd.DataFrame:
     df = pd.DataFrame(rows)
     return df
 
-def fetch_earnings_history(start ="2021-01-01", end = None, chunk_days = 90, sleep_s=1.0) -> pd.DataFrame:
-    if end is None:
-        end = date.today().isoformat()
+class TokenBucket:
+    """
+    Async token bucket: at most `rate` acquisitions per second, bursts up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _chunk_windows(start, end, chunk_days) -> list[tuple[date, date]]:
     cur = pd.to_datetime(start).date()
     end_dt = pd.to_datetime(end).date()
-    out =[]
+    windows = []
     while cur <= end_dt:
         nxt = min(cur + timedelta(days=chunk_days - 1), end_dt)
-        print(f"Fetching earnings from {cur} to {nxt}")
-        df = fetch_earnings_calendar(cur.isoformat(), nxt.isoformat())
-        if not df.empty:
-            out.append(df)
+        windows.append((cur, nxt))
         cur = nxt + timedelta(days=1)
-        time.sleep(sleep_s)
+    return windows
+
+
+def _cache_path(cache_dir: Path, a: date, b: date) -> Path:
+    return Path(cache_dir) / f"earnings_{a.isoformat()}_{b.isoformat()}.json"
+
+
+def _read_cache(cache_dir: Path, a: date, b: date, settle_days: int):
+    """
+    Cached rows for a window, or None if missing or not final yet. A window is
+    final once it ended `settle_days` before it was fetched (actuals are in).
+    """
+    path = _cache_path(cache_dir, a, b)
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text())
+    fetched = date.fromisoformat(payload["fetched"])
+    if b + timedelta(days=settle_days) > fetched:
+        return None
+    return payload["rows"]
+
+
+def _write_cache(cache_dir: Path, a: date, b: date, rows: list) -> None:
+    path = _cache_path(cache_dir, a, b)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"fetched": date.today().isoformat(), "rows": rows}))
+    tmp.replace(path)
+    # The last window ends today, so its end moves every run: drop the copies it supersedes
+    for old in path.parent.glob(f"earnings_{a.isoformat()}_*.json"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def _retry_delay(retry_after, default: float) -> float:
+    """
+    Seconds to wait from a Retry-After header, which is either a number of
+    seconds or an HTTP date; `default` when absent or unparseable.
+    """
+    if not retry_after:
+        return default
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+async def _fetch_window(session, limiter, sem, url, key, a, b, max_retries, backoff_s, cache_dir) -> list:
+    params = {"from": a.isoformat(), "to": b.isoformat()}
+    headers = {"X-Finnhub-Token": key}
+    async with sem:
+        for attempt in range(max_retries + 1):
+            await limiter.acquire()
+            try:
+                r = await asyncio.to_thread(session.get, url, headers=headers, params=params, timeout=30)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == max_retries:
+                    raise RuntimeError(f"Finnhub request for {a}..{b} failed after {max_retries} retries: {e}") from e
+                delay = backoff_s * 2**attempt
+                print(f"[Finnhub] {type(e).__name__} for {a}..{b}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            if r.status_code == 429 or r.status_code >= 500:
+                if attempt == max_retries:
+                    raise RuntimeError(f"Finnhub {r.status_code} for {a}..{b} after {max_retries} retries.")
+                delay = _retry_delay(r.headers.get("Retry-After"), backoff_s * 2**attempt)
+                print(f"[Finnhub] {r.status_code} for {a}..{b}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            r.raise_for_status()
+            print(f"Fetched earnings from {a} to {b}")
+            rows = r.json().get("earningsCalendar", [])
+            # Cached as soon as it lands, so a later failing window does not discard it
+            if cache_dir is not None:
+                _write_cache(cache_dir, a, b, rows)
+            return rows
+
+
+async def _fetch_windows(windows, base_url, rate_per_s, max_concurrency, max_retries, backoff_s, cache_dir) -> list:
+    """
+    Rows per window, or the exception that window ended with.
+    """
+    key = _get_key()
+    url = f"{base_url}calendar/earnings"
+    limiter = TokenBucket(rate_per_s)
+    sem = asyncio.Semaphore(max_concurrency)
+    with requests.Session() as session:
+        session.mount("http://", HTTPAdapter(pool_maxsize=max_concurrency))
+        session.mount("https://", HTTPAdapter(pool_maxsize=max_concurrency))
+        return await asyncio.gather(*[
+            _fetch_window(session, limiter, sem, url, key, a, b, max_retries, backoff_s, cache_dir)
+            for a, b in windows
+        ], return_exceptions=True)
+
+
+def fetch_earnings_history(start ="2021-01-01",
+                           end = None,
+                           chunk_days = 90,
+                           rate_per_s = 1.0,
+                           max_concurrency = 4,
+                           max_retries = 5,
+                           backoff_s = 1.0,
+                           settle_days = 7,
+                           cache_dir: Path = CACHE_DIR,
+                           base_url: str = Base_URL) -> pd.DataFrame:
+    """
+    Earnings calendar for [start, end] in `chunk_days` windows.
+
+    Windows are fetched concurrently over one pooled session, throttled by a
+    token bucket (`rate_per_s`) and retried with exponential backoff on 429/5xx
+    and connection errors / timeouts. Each window is cached on disk as soon as
+    it is fetched, so only new, still-settling or failed windows are requested
+    again; if any window fails, the error is raised after all others finish.
+    """
+    if end is None:
+        end = date.today().isoformat()
+    windows = _chunk_windows(start, end, chunk_days)
+
+    rows = {}
+    for a, b in windows:
+        cached = None if cache_dir is None else _read_cache(cache_dir, a, b, settle_days)
+        if cached is not None:
+            rows[(a, b)] = cached
+    todo = [w for w in windows if w not in rows]
+    print(f"[Finnhub] {len(windows) - len(todo)} windows cached, {len(todo)} to fetch")
+
+    if todo:
+        fetched = asyncio.run(_fetch_windows(todo, base_url, rate_per_s, max_concurrency, max_retries, backoff_s, cache_dir))
+        failed = [(w, e) for w, e in zip(todo, fetched) if isinstance(e, BaseException)]
+        if failed:
+            (a, b), err = failed[0]
+            raise RuntimeError(f"{len(failed)} of {len(todo)} Finnhub windows failed (first: {a}..{b}); "
+                               f"fetched windows are cached.") from err
+        rows.update(zip(todo, fetched))
+
+    out = [pd.DataFrame(rows[w]) for w in windows if rows[w]]
     if not out:
         return pd.DataFrame()
     all_df = pd.concat(out, ignore_index=True).drop_duplicates()
-    return all_df
\ No newline at end of file
+    return all_df
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EVENTS_STORE = REPO_ROOT / "data" / "sentiment" / "processed" / "earnings_events.parquet"
+
+EVENT_COLUMNS = ["symbol", "date", "epsActual", "epsEstimate", "source"]
+# Lower wins when two sources report the same (symbol, date)
+SOURCE_PRIORITY = {"finnhub": 0, "kaggle": 1}
+UNKNOWN_PRIORITY = 9
+
+
+# ------------------------
+# Typed canonical columns
+# ------------------------
+def strip_categorical(values) -> pd.Categorical:
+    """
+    Symbols as a categorical with whitespace stripped once per distinct
+    value (not per row); blank symbols become missing.
+    """
+    cat = pd.Categorical(values)
+    labels = pd.Index(cat.categories.astype(str)).str.strip()
+    remap, uniques = pd.factorize(labels.where(labels != ""), sort=True)
+    # Code -1 (missing) stays -1 through the appended slot
+    codes = np.append(remap, -1)[cat.codes]
+    return pd.Categorical.from_codes(codes, categories=uniques)
+
+
+def to_canonical(df: pd.DataFrame, source: str) -> pd.DataFrame:
+    """
+    symbol (categorical), date (datetime64), epsActual / epsEstimate (float64)
+    and source (categorical) from a frame with those first four columns.
+    Values that do not parse are left missing.
+    """
+    out = pd.DataFrame({"symbol": strip_categorical(df["symbol"])}, index=df.index)
+    out["date"] = pd.to_datetime(df["date"], errors="coerce")
+    for col in ("epsActual", "epsEstimate"):
+        x = df[col] if col in df else pd.Series(np.nan, index=df.index)
+        # Typed readers already give floats; only stray text needs coercing
+        out[col] = x.astype("float64") if pd.api.types.is_numeric_dtype(x) else pd.to_numeric(x, errors="coerce")
+    sources = pd.Index(list(SOURCE_PRIORITY)).union([source])
+    out["source"] = pd.Categorical.from_codes(np.full(len(df), sources.get_loc(source), dtype=np.int8), categories=sources)
+    return out.reset_index(drop=True)
+
+
+def _union_categoricals(frames: list[pd.DataFrame], col: str) -> list[pd.DataFrame]:
+    cats = pd.Index(sorted(set().union(*(f[col].cat.categories for f in frames))))
+    return [f.assign(**{col: f[col].cat.set_categories(cats)}) for f in frames]
+
+
+# ------------------------
+# Priority resolution
+# ------------------------
+def resolve_priority(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per (symbol, date), ordered by (date, symbol), from canonical
+    event frames. A lower SOURCE_PRIORITY wins; at equal priority the row
+    from the later frame wins (so newer fetches overwrite stored ones).
+
+    All of it is one argsort of an integer key built from the date rank,
+    the symbol code, the source priority and the frame position.
+    """
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                             zip(EVENT_COLUMNS, ["category", "datetime64[ns]", "float64", "float64", "category"])})
+    frames = _union_categoricals(frames, "symbol")
+    frames = _union_categoricals(frames, "source")
+    df = pd.concat(frames, ignore_index=True)
+    age = np.repeat(np.arange(len(frames))[::-1], [len(f) for f in frames])
+    keep = (df["symbol"].notna() & df["date"].notna()).to_numpy()
+    df, age = df[keep].reset_index(drop=True), age[keep]
+
+    prio = df["source"].map(SOURCE_PRIORITY).astype("float64").fillna(UNKNOWN_PRIORITY).to_numpy(dtype=np.int64)
+    date_code, _ = pd.factorize(df["date"], sort=True)
+    sym_code = df["symbol"].cat.codes.to_numpy(dtype=np.int64)
+
+    n_sym = len(df["symbol"].cat.categories)
+    n_age = len(frames)
+    key = ((date_code * n_sym + sym_code) * (UNKNOWN_PRIORITY + 1) + prio) * n_age + age
+    order = np.argsort(key, kind="stable")
+    cell = (date_code * n_sym + sym_code)[order]
+    first = np.r_[True, cell[1:] != cell[:-1]]
+    return df.iloc[order[first]].reset_index(drop=True)
+
+
+# ------------------------
+# Persisted store
+# ------------------------
+def read_events(store: Path = EVENTS_STORE) -> pd.DataFrame:
+    """
+    Canonical events from the store (symbol / source come back categorical).
+    """
+    df = pd.read_parquet(store)
+    for col in ("symbol", "source"):
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = strip_categorical(df[col]) if col == "symbol" else df[col].astype("category")
+    return df[EVENT_COLUMNS]
+
+
+def write_events(events: pd.DataFrame, store: Path = EVENTS_STORE) -> Path:
+    store = Path(store)
+    store.parent.mkdir(parents=True, exist_ok=True)
+    # Write aside and rename, so readers never see a half-written file
+    fd, tmp = tempfile.mkstemp(suffix=".parquet", dir=store.parent)
+    os.close(fd)
+    try:
+        events[EVENT_COLUMNS].to_parquet(tmp, index=False)
+        os.replace(tmp, store)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return store
+
+
+def upsert_events(new: pd.DataFrame, store: Path = EVENTS_STORE) -> tuple[pd.DataFrame, int]:
+    """
+    Merge canonical `new` rows into the stored events under the same
+    priority rules as resolve_priority (new rows win ties with stored ones)
+    and rewrite the store only if something changed.
+    Returns (events, number of rows added or replaced).
+    """
+    store = Path(store)
+    stored = read_events(store) if store.exists() else resolve_priority([])
+    events = resolve_priority([stored, new])
+    stored, _ = _union_categoricals([stored, events], "symbol")
+    stored_key = pd.MultiIndex.from_arrays([stored["symbol"].cat.codes, stored["date"]])
+    merged_key = pd.MultiIndex.from_arrays([events["symbol"].cat.codes, events["date"]])
+    # Rows whose (symbol, date) is new, or whose values differ from the stored row
+    pos = stored_key.get_indexer(merged_key)
+    changed = pos < 0
+    same = ~changed
+    if same.any():
+        old = stored.iloc[pos[same]].reset_index(drop=True)
+        cur = events[same].reset_index(drop=True)
+        diff = np.zeros(len(cur), dtype=bool)
+        for col in ("epsActual", "epsEstimate"):
+            a, b = old[col].to_numpy(), cur[col].to_numpy()
+            diff |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+        old_src, cur_src = _union_categoricals([old, cur], "source")
+        diff |= old_src["source"].cat.codes.to_numpy() != cur_src["source"].cat.codes.to_numpy()
+        changed[same] = diff
+    n_changed = int(changed.sum())
+    if n_changed or not store.exists():
+        write_events(events, store)
+    return events, n_changed
@@ -0,0 +1,430 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.sparse import csr_matrix, vstack
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PRICES_DIR = REPO_ROOT / "data" / "prices"
+
+# Wide CSVs are only read by import_csv (again whenever they change); everything else reads the stores.
+ADJ_CLOSE_CSV = PRICES_DIR / "sp500_adj_close.csv"
+ADJ_CLOSE_STORE = PRICES_DIR / "sp500_adj_close.panel"
+VOLUME_CSV = PRICES_DIR / "sp500_volume.csv"
+VOLUME_STORE = PRICES_DIR / "sp500_volume.panel"
+
+VALUES_FILE = "values.npy"
+DATES_FILE = "dates.npy"
+META_FILE = "meta.json"
+
+# Sparse (CSR-by-date) stores: row i holds the non-zero entries of date i
+INDPTR_FILE = "indptr.npy"
+INDICES_FILE = "indices.npy"
+DATA_FILE = "data.npy"
+
+# Rewritten stores keep each version in its own subdirectory; this file names the current one
+POINTER_FILE = "CURRENT"
+
+
+def panel_dir(store_path: Path) -> Path:
+    """
+    Directory holding a store's current files: the version named by its
+    pointer file, or the store itself (stores filled in place, older stores).
+    Resolve it once per read so that every file comes from the same version.
+    """
+    store_path = Path(store_path)
+    try:
+        return store_path / (store_path / POINTER_FILE).read_text().strip()
+    except FileNotFoundError:
+        return store_path
+
+
+def _version_time(version: Path) -> int:
+    return int(version.name[1:].split("_")[0])
+
+
+def _new_version(store_path: Path) -> Path:
+    version = store_path / f"v{time.time_ns()}_{os.getpid()}"
+    version.mkdir(parents=True)
+    return version
+
+
+def _publish(store_path: Path, version: Path) -> None:
+    """
+    Make a fully written version current by atomically replacing the pointer
+    file; the store path itself never disappears, so readers see either the
+    old version or the new one. The previous version stays for reads still
+    under way; older ones are removed (best effort: files still open or
+    mapped elsewhere, as on Windows, are left for a later write).
+    """
+    prev = panel_dir(store_path)
+    fd, tmp = tempfile.mkstemp(prefix=POINTER_FILE + ".", dir=store_path)
+    with os.fdopen(fd, "w") as f:
+        f.write(version.name)
+    os.replace(tmp, store_path / POINTER_FILE)
+
+    # Another writer may have published meanwhile: never drop what the pointer names now
+    keep = {version, prev, panel_dir(store_path)}
+    for old in store_path.glob("v*_*"):
+        if old.is_dir() and old not in keep and _version_time(old) < _version_time(version):
+            shutil.rmtree(old, ignore_errors=True)
+    if prev != store_path:
+        # Files of a store written before versioning, now two versions back
+        for name in (VALUES_FILE, DATES_FILE, META_FILE, INDPTR_FILE, INDICES_FILE, DATA_FILE):
+            try:
+                (store_path / name).unlink(missing_ok=True)
+            except OSError:
+                pass
+
+
+def _source_stamp(csv_path: Path) -> dict:
+    st = Path(csv_path).stat()
+    return {"path": str(csv_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def write_panel(df: pd.DataFrame, store_path: Path, dtype=np.float64, source: dict = None) -> Path:
+    """
+    Write a dates x tickers panel as a column-major .npy block (one contiguous
+    run per ticker), a datetime64 date index and a ticker dictionary.
+    `source` (size / mtime of the imported file) is kept in the metadata.
+    """
+    store_path = Path(store_path)
+    df = df.sort_index()
+
+    values = np.asfortranarray(df.to_numpy(dtype=dtype, na_value=np.nan))
+    dates = pd.DatetimeIndex(df.index).values.astype("datetime64[ns]")
+    meta = {
+        "tickers": [str(c) for c in df.columns],
+        "index_name": df.index.name,
+        "dtype": np.dtype(dtype).name,
+    }
+    if source is not None:
+        meta["source"] = source
+
+    version = _new_version(store_path)
+    try:
+        np.save(version / VALUES_FILE, values)
+        np.save(version / DATES_FILE, dates)
+        (version / META_FILE).write_text(json.dumps(meta))
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    _publish(store_path, version)
+    return store_path
+
+
+def import_csv(csv_path: Path, store_path: Path, dtype=np.float64) -> Path:
+    """
+    Import a wide CSV (Date index, one column per ticker), recording its
+    size and mtime so that a re-downloaded CSV is picked up by ensure_panel.
+    """
+    source = _source_stamp(csv_path)
+    df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+    df = df.apply(pd.to_numeric, errors="coerce")
+    return write_panel(df, store_path, dtype=dtype, source=source)
+
+
+def ensure_panel(store_path: Path, csv_path: Path = None, dtype=np.float64) -> Path:
+    """
+    Return `store_path`, (re-)importing `csv_path` first if the store does not
+    exist yet or the CSV has changed since it was imported.
+    """
+    store_path = Path(store_path)
+    have_store = (panel_dir(store_path) / VALUES_FILE).exists()
+    have_csv = csv_path is not None and Path(csv_path).exists()
+    if not have_store and not have_csv:
+        raise FileNotFoundError(f"Panel store not found at {store_path} and no CSV to import from.")
+    if have_store:
+        if not have_csv:
+            return store_path
+        stamp = _source_stamp(csv_path)
+        stored = read_panel_meta(store_path).get("source") or {}
+        if stored.get("size") == stamp["size"] and stored.get("mtime_ns") == stamp["mtime_ns"]:
+            return store_path
+        print(f"[Reimport] {csv_path} changed since the last import -> {store_path}")
+    else:
+        print(f"[Import] {csv_path} -> {store_path}")
+    return import_csv(csv_path, store_path, dtype=dtype)
+
+
+def refresh_panels() -> None:
+    """
+    Re-import the price / volume stores whose CSVs were re-downloaded.
+    """
+    for csv_path, store_path in ((ADJ_CLOSE_CSV, ADJ_CLOSE_STORE), (VOLUME_CSV, VOLUME_STORE)):
+        if csv_path.exists():
+            ensure_panel(store_path, csv_path)
+
+
+def read_panel_meta(store_path: Path) -> dict:
+    return json.loads((panel_dir(store_path) / META_FILE).read_text())
+
+
+def read_panel_index(store_path: Path) -> pd.DatetimeIndex:
+    d = panel_dir(store_path)
+    meta = read_panel_meta(d)
+    return pd.DatetimeIndex(np.load(d / DATES_FILE), name=meta["index_name"])
+
+
+def read_panel(store_path: Path,
+               tickers=None,
+               start=None,
+               end=None,
+               dtype=None) -> pd.DataFrame:
+    """
+    Load a panel (or a ticker / date-range slice of it) from a store.
+
+    The value block is memory-mapped, so only the requested columns and rows
+    are read from disk. `dtype` optionally casts the result (e.g. np.float32).
+    """
+    store_path = Path(store_path)
+    d = panel_dir(store_path)
+    meta = read_panel_meta(d)
+    values = np.load(d / VALUES_FILE, mmap_mode="r")
+    dates = read_panel_index(d)
+
+    i0 = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side="left")
+    i1 = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side="right")
+
+    all_tickers = meta["tickers"]
+    if tickers is None:
+        names = all_tickers
+        block = values[i0:i1]
+    else:
+        lookup = {t: j for j, t in enumerate(all_tickers)}
+        names = [str(t) for t in tickers]
+        missing = [t for t in names if t not in lookup]
+        if missing:
+            raise KeyError(f"Tickers not in panel store {store_path}: {missing[:10]}")
+        block = values[i0:i1, [lookup[t] for t in names]]
+
+    # Copy out of the memmap so callers get an ordinary writable frame
+    block = np.array(block, dtype=dtype or values.dtype)
+    return pd.DataFrame(block, index=dates[i0:i1], columns=pd.Index(names))
+
+
+# ------------------------
+# Block access (out-of-core jobs: each call maps the file, copies, unmaps)
+# ------------------------
+def create_panel(store_path: Path, index: pd.DatetimeIndex, tickers, dtype=np.float64) -> Path:
+    """
+    Allocate a column-major store to be filled block by block. The value file
+    is created sparse (all zeros) without touching its pages, so every block
+    must be written.
+    """
+    store_path = Path(store_path)
+    store_path.mkdir(parents=True, exist_ok=True)
+    # Filled in place: drop any pointer left by an earlier versioned write
+    (store_path / POINTER_FILE).unlink(missing_ok=True)
+    values = np.lib.format.open_memmap(store_path / VALUES_FILE, mode="w+", dtype=dtype,
+                                       shape=(len(index), len(tickers)), fortran_order=True)
+    del values
+    meta = {
+        "tickers": [str(c) for c in tickers],
+        "index_name": index.name,
+        "dtype": np.dtype(dtype).name,
+    }
+    np.save(store_path / DATES_FILE, pd.DatetimeIndex(index).values.astype("datetime64[ns]"))
+    (store_path / META_FILE).write_text(json.dumps(meta))
+    return store_path
+
+
+def panel_shape(store_path: Path) -> tuple[int, int]:
+    return np.load(panel_dir(store_path) / VALUES_FILE, mmap_mode="r").shape
+
+
+def _values_layout(store_path: Path) -> tuple[int, tuple[int, int], np.dtype]:
+    """
+    (byte offset of the data, shape, dtype) of a store's column-major value file.
+    """
+    values = np.load(panel_dir(store_path) / VALUES_FILE, mmap_mode="r")
+    if not values.flags.f_contiguous:
+        raise ValueError(f"{store_path} is not a column-major panel store.")
+    return values.offset, values.shape, values.dtype
+
+
+def _block_runs(store_path: Path, rows: slice, cols: slice):
+    offset, (T, N), dtype = _values_layout(store_path)
+    r0, r1, _ = rows.indices(T)
+    c0, c1, _ = cols.indices(N)
+    # One contiguous run of rows per column
+    starts = [offset + (j * T + r0) * dtype.itemsize for j in range(c0, c1)]
+    return starts, (r1 - r0, c1 - c0), dtype
+
+
+def read_panel_block(store_path: Path, rows: slice = slice(None), cols: slice = slice(None), dtype=None) -> np.ndarray:
+    """
+    Copy of values[rows, cols], read with plain file I/O (one run per column)
+    so that nothing outside the block is mapped into memory.
+    """
+    d = panel_dir(store_path)
+    starts, shape, file_dtype = _block_runs(d, rows, cols)
+    out = np.empty(shape, dtype=file_dtype, order="F")
+    with open(d / VALUES_FILE, "rb") as f:
+        if shape[0] == panel_shape(d)[0]:
+            # Full columns: the whole block is one run
+            f.seek(starts[0] if starts else 0)
+            f.readinto(memoryview(out.reshape(-1, order="F")).cast("B"))
+        else:
+            for k, pos in enumerate(starts):
+                f.seek(pos)
+                f.readinto(memoryview(out[:, k]).cast("B"))
+    return out if dtype is None else out.astype(dtype, copy=False)
+
+
+def write_panel_block(store_path: Path, block: np.ndarray, rows: slice = slice(None), cols: slice = slice(None)) -> None:
+    d = panel_dir(store_path)
+    starts, shape, file_dtype = _block_runs(d, rows, cols)
+    block = np.asfortranarray(block, dtype=file_dtype)
+    if block.shape != shape:
+        raise ValueError(f"Block shape {block.shape} does not match the target slice {shape}.")
+    with open(d / VALUES_FILE, "r+b") as f:
+        if shape[0] == panel_shape(d)[0]:
+            f.seek(starts[0] if starts else 0)
+            f.write(memoryview(block.reshape(-1, order="F")).cast("B"))
+        else:
+            for k, pos in enumerate(starts):
+                f.seek(pos)
+                f.write(memoryview(block[:, k]).cast("B"))
+
+
+def load_adj_close(tickers=None, start=None, end=None, dtype=None) -> pd.DataFrame:
+    store = ensure_panel(ADJ_CLOSE_STORE, ADJ_CLOSE_CSV)
+    return read_panel(store, tickers=tickers, start=start, end=end, dtype=dtype)
+
+
+def load_adj_close_index() -> pd.DatetimeIndex:
+    return read_panel_index(ensure_panel(ADJ_CLOSE_STORE, ADJ_CLOSE_CSV))
+
+
+def load_adj_close_tickers() -> pd.Index:
+    return pd.Index(read_panel_meta(ensure_panel(ADJ_CLOSE_STORE, ADJ_CLOSE_CSV))["tickers"])
+
+
+def load_volume(tickers=None, start=None, end=None, dtype=None) -> pd.DataFrame:
+    store = ensure_panel(VOLUME_STORE, VOLUME_CSV)
+    return read_panel(store, tickers=tickers, start=start, end=end, dtype=dtype)
+
+
+def load_volume_index() -> pd.DatetimeIndex:
+    return read_panel_index(ensure_panel(VOLUME_STORE, VOLUME_CSV))
+
+
+# ------------------------
+# Sparse panels (mostly-zero signals such as earnings sentiment)
+# ------------------------
+def write_sparse_panel(df: pd.DataFrame, store_path: Path, dtype=np.float64) -> Path:
+    """
+    Write a dates x tickers panel keeping only its non-zero entries, as CSR
+    arrays (indptr / indices / data) plus the date index and ticker dictionary.
+    """
+    store_path = Path(store_path)
+    df = df.sort_index()
+
+    is_sparse = len(df.columns) and all(isinstance(dt, pd.SparseDtype) for dt in df.dtypes)
+    m = csr_matrix(df.sparse.to_coo() if is_sparse else df.to_numpy(dtype=float), dtype=dtype)
+    m.eliminate_zeros()
+    meta = {
+        "tickers": [str(c) for c in df.columns],
+        "index_name": df.index.name,
+        "dtype": np.dtype(dtype).name,
+        "shape": list(m.shape),
+    }
+
+    return _write_sparse_arrays(store_path, m, pd.DatetimeIndex(df.index), meta)
+
+
+def _write_sparse_arrays(store_path: Path, m: csr_matrix, dates: pd.DatetimeIndex, meta: dict) -> Path:
+    """
+    Write CSR arrays, dates and meta as a new version of the store and
+    publish it, so a crash never leaves indptr / indices / data out of step.
+    """
+    version = _new_version(store_path)
+    try:
+        np.save(version / INDPTR_FILE, m.indptr.astype(np.int64))
+        np.save(version / INDICES_FILE, m.indices.astype(np.int32))
+        np.save(version / DATA_FILE, m.data)
+        np.save(version / DATES_FILE, dates.values.astype("datetime64[ns]"))
+        (version / META_FILE).write_text(json.dumps(meta))
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    _publish(store_path, version)
+    return store_path
+
+
+def read_sparse_panel(store_path: Path,
+                      start=None,
+                      end=None,
+                      dtype=None) -> tuple[csr_matrix, pd.DatetimeIndex, pd.Index]:
+    """
+    Load a sparse store (or a date-range slice of it) as (csr_matrix, dates, tickers).
+    Only the slice's share of indices/data is read from the memory-mapped arrays.
+    """
+    store_path = Path(store_path)
+    d = panel_dir(store_path)
+    meta = read_panel_meta(d)
+    dates = read_panel_index(d)
+    indptr = np.load(d / INDPTR_FILE, mmap_mode="r")
+
+    i0 = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side="left")
+    i1 = len(dates) if end is None else dates.searchsorted(pd.Timestamp(end), side="right")
+    lo, hi = int(indptr[i0]), int(indptr[i1])
+
+    data = np.load(d / DATA_FILE, mmap_mode="r")
+    indices = np.load(d / INDICES_FILE, mmap_mode="r")
+    m = csr_matrix(
+        (np.array(data[lo:hi], dtype=dtype or data.dtype),
+         np.array(indices[lo:hi]),
+         np.array(indptr[i0:i1 + 1]) - lo),
+        shape=(i1 - i0, len(meta["tickers"])),
+    )
+    return m, dates[i0:i1], pd.Index(meta["tickers"])
+
+
+def read_sparse_panel_frame(store_path: Path, start=None, end=None, dtype=None) -> pd.DataFrame:
+    """
+    Dense DataFrame view of a sparse store (zeros filled back in).
+    """
+    m, dates, tickers = read_sparse_panel(store_path, start=start, end=end, dtype=dtype)
+    return pd.DataFrame(m.toarray(), index=dates, columns=tickers)
+
+
+def append_sparse_panel(store_path: Path, new_rows: pd.DataFrame) -> Path:
+    """
+    Replace the store's rows from the first date of `new_rows` on (dates past
+    the store's last date are appended). The ticker set must be unchanged.
+
+    Not an in-place append: the kept rows are read back, stacked with the new
+    ones and the whole store is rewritten (as a new version, via _write_sparse_arrays).
+    """
+    store_path = Path(store_path)
+    old, dates, tickers = read_sparse_panel(store_path)
+    if not tickers.equals(pd.Index([str(c) for c in new_rows.columns])):
+        raise ValueError(f"Ticker set of {store_path} differs from the rows being appended.")
+    if new_rows.empty:
+        return store_path
+    new_rows = new_rows.sort_index()
+    keep = int(dates.searchsorted(pd.Timestamp(new_rows.index[0]), side="left"))
+    new = csr_matrix(new_rows.to_numpy(dtype=float), dtype=old.dtype)
+    new.eliminate_zeros()
+
+    combined = vstack([old[:keep], new], format="csr")
+    frame_index = dates[:keep].append(pd.DatetimeIndex(new_rows.index))
+    meta = read_panel_meta(store_path)
+    meta["shape"] = list(combined.shape)
+    return _write_sparse_arrays(store_path, combined, frame_index, meta)
+
+
+if __name__ == "__main__":
+    for csv_path, store_path in ((ADJ_CLOSE_CSV, ADJ_CLOSE_STORE), (VOLUME_CSV, VOLUME_STORE)):
+        if not csv_path.exists():
+            print(f"[Skip] {csv_path} not found")
+            continue
+        import_csv(csv_path, store_path)
+        meta = read_panel_meta(store_path)
+        print(f"[Saved] {store_path} ({len(meta['tickers'])} tickers)")
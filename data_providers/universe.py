@@ -0,0 +1,215 @@
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from multi_source_alpha.data_providers.panel_store import (
+    ADJ_CLOSE_CSV,
+    ADJ_CLOSE_STORE,
+    DATES_FILE,
+    META_FILE,
+    ensure_panel,
+    read_panel_index,
+    read_panel_meta,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+UNIVERSE_DIR = REPO_ROOT / "data" / "Universe"
+
+# Constituent intervals, one row per (ticker, start, end) membership spell
+MEMBERSHIP_CSV = UNIVERSE_DIR / "sp500_membership.csv"
+# Compiled date x ticker bitmask (bits packed along tickers)
+MEMBERSHIP_STORE = UNIVERSE_DIR / "sp500_membership.mask"
+BITS_FILE = "bits.npy"
+
+# Accepted spellings in imported files
+_ALIASES = {
+    "symbol": "ticker",
+    "date_added": "start", "added": "start", "start_date": "start", "from": "start",
+    "date_removed": "end", "removed": "end", "end_date": "end", "to": "end",
+}
+
+
+# ------------------------
+# Intervals
+# ------------------------
+def load_membership_intervals(path: Path = MEMBERSHIP_CSV) -> pd.DataFrame:
+    """
+    Membership spells from a local CSV / parquet with columns ticker, start,
+    end. A name is a member on dates start <= d < end; a blank end means it
+    is still in the index. Tickers use the price files' spelling (BRK-B).
+    """
+    path = Path(path)
+    df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path, dtype={"ticker": "str", "symbol": "str"})
+    df = df.rename(columns={c: _ALIASES.get(c.strip().lower(), c.strip().lower()) for c in df.columns})
+    missing = [c for c in ("ticker", "start") if c not in df]
+    if missing:
+        raise ValueError(f"Membership file {path} is missing columns {missing}")
+    if "end" not in df:
+        df["end"] = pd.NaT
+
+    out = pd.DataFrame({
+        "ticker": df["ticker"].astype(str).str.strip().str.replace(".", "-", regex=False),
+        "start": pd.to_datetime(df["start"], errors="coerce"),
+        "end": pd.to_datetime(df["end"], errors="coerce"),
+    })
+    return out.dropna(subset=["ticker", "start"]).reset_index(drop=True)
+
+
+def membership_mask(intervals: pd.DataFrame, dates: pd.DatetimeIndex, tickers) -> np.ndarray:
+    """
+    Boolean (dates x tickers) membership from intervals. Each spell adds +1
+    at its first date and -1 at its end; one cumulative sum down the dates
+    gives the live count (overlapping spells still count once).
+    """
+    dates = pd.DatetimeIndex(dates)
+    tickers = pd.Index(tickers).astype(str)
+    j = tickers.get_indexer(intervals["ticker"])
+    keep = j >= 0
+    j = j[keep]
+    start = dates.searchsorted(intervals["start"].to_numpy()[keep], side="left")
+    end_dates = intervals["end"].to_numpy()[keep]
+    no_end = pd.isna(end_dates)
+    end = np.where(no_end, len(dates), dates.searchsorted(np.where(no_end, dates.max(), end_dates), side="left"))
+
+    delta = np.zeros((len(dates) + 1, len(tickers)), dtype=np.int32)
+    np.add.at(delta, (start, j), 1)
+    np.add.at(delta, (end, j), -1)
+    return np.cumsum(delta[:-1], axis=0) > 0
+
+
+# ------------------------
+# Compiled bitmask store
+# ------------------------
+def compile_membership(intervals: pd.DataFrame,
+                       dates: pd.DatetimeIndex,
+                       tickers,
+                       store_path: Path = MEMBERSHIP_STORE) -> Path:
+    """
+    Compile intervals against a date index and ticker list into a packed
+    bitmask (one bit per date x ticker) plus dates and a ticker dictionary.
+    """
+    store_path = Path(store_path)
+    store_path.mkdir(parents=True, exist_ok=True)
+    mask = membership_mask(intervals, dates, tickers)
+    # Stages may compile concurrently: each file is written aside and renamed into place
+    _replace(store_path / META_FILE, lambda f: f.write(json.dumps({"tickers": [str(t) for t in tickers]}).encode()))
+    _replace(store_path / DATES_FILE, lambda f: np.save(f, pd.DatetimeIndex(dates).values.astype("datetime64[ns]")))
+    _replace(store_path / BITS_FILE, lambda f: np.save(f, np.packbits(mask, axis=1)))
+    return store_path
+
+
+def _replace(path: Path, write) -> None:
+    fd, tmp = tempfile.mkstemp(suffix=path.suffix, dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_membership(store_path: Path = MEMBERSHIP_STORE) -> pd.DataFrame:
+    """
+    The compiled bitmask as a boolean dates x tickers frame.
+    """
+    store_path = Path(store_path)
+    tickers = json.loads((store_path / META_FILE).read_text())["tickers"]
+    dates = pd.DatetimeIndex(np.load(store_path / DATES_FILE))
+    bits = np.load(store_path / BITS_FILE)
+    mask = np.unpackbits(bits, axis=1, count=len(tickers)).astype(bool)
+    return pd.DataFrame(mask, index=dates, columns=pd.Index(tickers), copy=False)
+
+
+def _store_matches(store_path: Path, dates: pd.DatetimeIndex, tickers: list) -> bool:
+    return (json.loads((store_path / META_FILE).read_text())["tickers"] == tickers
+            and pd.DatetimeIndex(np.load(store_path / DATES_FILE)).equals(dates))
+
+
+def load_membership(store_path: Path = MEMBERSHIP_STORE,
+                    csv_path: Path = MEMBERSHIP_CSV,
+                    price_store: Path = ADJ_CLOSE_STORE) -> pd.DataFrame | None:
+    """
+    Point-in-time membership on the price store's dates and tickers,
+    recompiled when the interval file is newer than the store or the price
+    dates / tickers changed. None when no membership data exists (every name
+    is then treated as live). A compiled store that no longer matches the
+    prices, with no interval file to recompile from, is an error.
+    """
+    store_path, csv_path = Path(store_path), Path(csv_path)
+    have_store = (store_path / BITS_FILE).exists()
+    if not csv_path.exists() and not have_store:
+        return None
+
+    price_store = ensure_panel(price_store, ADJ_CLOSE_CSV)
+    dates, tickers = read_panel_index(price_store), read_panel_meta(price_store)["tickers"]
+    if not csv_path.exists():
+        if not _store_matches(store_path, dates, tickers):
+            raise ValueError(f"Compiled membership at {store_path} does not cover the current price dates / "
+                             f"tickers and {csv_path} is missing, so it cannot be recompiled.")
+        return read_membership(store_path)
+
+    stale = (not have_store
+             or csv_path.stat().st_mtime > (store_path / BITS_FILE).stat().st_mtime
+             # New price dates or tickers: the mask must cover them too
+             or not _store_matches(store_path, dates, tickers))
+    if stale:
+        print(f"[Compile] {csv_path} -> {store_path}")
+        compile_membership(load_membership_intervals(csv_path), dates, tickers, store_path)
+    return read_membership(store_path)
+
+
+def membership_mtime(store_path: Path = MEMBERSHIP_STORE,
+                     csv_path: Path = MEMBERSHIP_CSV) -> float | None:
+    """
+    When the membership last changed: the interval file's mtime (recompiling
+    it onto new price dates leaves earlier rows as they were), else the
+    compiled store's. None when no membership data exists.
+    """
+    csv_path, bits = Path(csv_path), Path(store_path) / BITS_FILE
+    if csv_path.exists():
+        return csv_path.stat().st_mtime
+    return bits.stat().st_mtime if bits.exists() else None
+
+
+def member_array(members, index, columns) -> np.ndarray:
+    """
+    `members` (boolean frame, array or None) as a boolean array on
+    (index, columns). Dates between two mask dates take the earlier one's
+    membership; dates outside the mask's range raise rather than being
+    treated as having no members. Tickers the mask does not list (it covers
+    every price-store ticker) count as not live.
+    """
+    if members is None:
+        return np.ones((len(index), len(columns)), dtype=bool)
+    if isinstance(members, pd.DataFrame):
+        if members.index.equals(index) and members.columns.equals(columns):
+            return members.to_numpy(dtype=bool)
+        index = pd.DatetimeIndex(index)
+        pos = members.index.searchsorted(index, side="right") - 1
+        outside = (pos < 0) | (index > members.index.max())
+        if outside.any():
+            raise ValueError(f"Membership covers {members.index.min().date()}..{members.index.max().date()} "
+                             f"but the panel has {int(outside.sum())} dates outside it "
+                             f"(e.g. {index[outside][0].date()}); recompile the membership mask.")
+        cols = members.columns.get_indexer(pd.Index(columns).astype(str))
+        mask = members.to_numpy(dtype=bool)[pos][:, np.maximum(cols, 0)]
+        mask[:, cols < 0] = False
+        return mask
+    return np.asarray(members, dtype=bool)
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_source_alpha.data_providers.universe [intervals.csv]
+    args = sys.argv[1:]
+    members = load_membership(csv_path=Path(args[0]) if args else MEMBERSHIP_CSV)
+    if members is None:
+        print(f"No membership intervals at {MEMBERSHIP_CSV}")
+    else:
+        live = members.sum(axis=1)
+        print(f"[Saved] {MEMBERSHIP_STORE} {members.shape}")
+        print(f"Live members per date: min {live.min()}, median {live.median():.0f}, max {live.max()}")
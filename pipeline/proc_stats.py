@@ -0,0 +1,54 @@
+import sys
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ------------------------
+# Process memory counters (Linux /proc, with portable fallbacks)
+# ------------------------
+def proc_status_mb(field: str) -> float | None:
+    """
+    A kB field of /proc/self/status (VmRSS, VmHWM, ...) in MB; None off Linux.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def max_rss_mb() -> float | None:
+    """
+    Process-lifetime peak RSS from getrusage (not resettable); None on Windows.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Peak RSS since the last reset_peak_rss (VmHWM), else since process start.
+    """
+    hwm = proc_status_mb("VmHWM")
+    return hwm if hwm is not None else max_rss_mb()
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the VmHWM high-water mark (Linux: write 5 to clear_refs). False
+    where unsupported, in which case the peak stays process-wide.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
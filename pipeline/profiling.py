@@ -0,0 +1,263 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from multi_source_alpha.pipeline.proc_stats import peak_rss_mb, proc_status_mb, reset_peak_rss
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PIPELINE_DIR = REPO_ROOT / "data" / "pipeline"
+STEP_LOG_PATH = PIPELINE_DIR / "steps.jsonl"
+PROFILE_DIR = PIPELINE_DIR / "profiles"
+
+# "all", or a comma list of "script" / "script.step" names to sample-profile
+PROFILE_ENV = "MSA_PROFILE"
+PROFILE_INTERVAL_ENV = "MSA_PROFILE_INTERVAL_MS"
+# Set by the pipeline runner so step records join its runs.jsonl entries
+RUN_ID_ENV = "MSA_RUN_ID"
+
+
+# ------------------------
+# Process counters (Linux /proc)
+# ------------------------
+def _io_bytes() -> tuple[int, int] | None:
+    """
+    (bytes read, bytes written) by this process so far, including page-cache hits.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        return int(io["rchar"]), int(io["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def describe(obj):
+    """
+    JSON-friendly shape of a step input/output: frames and arrays give their
+    shape and in-memory bytes, paths their on-disk size.
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        nbytes = obj.memory_usage(deep=False).sum() if isinstance(obj, pd.DataFrame) else obj.nbytes
+        return {"shape": list(obj.shape), "nbytes": int(nbytes)}
+    if hasattr(obj, "nnz") and hasattr(obj, "shape"):
+        return {"shape": list(obj.shape), "nnz": int(obj.nnz)}
+    if isinstance(obj, (str, Path)):
+        p = Path(obj)
+        files = [f for f in p.rglob("*") if f.is_file()] if p.is_dir() else [p] if p.exists() else []
+        return {"path": str(p), "nbytes": int(sum(f.stat().st_size for f in files))}
+    if isinstance(obj, dict):
+        return {str(k): describe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [describe(v) for v in obj]
+    return repr(obj)
+
+
+# ------------------------
+# Sampling profiler
+# ------------------------
+class StackSampler:
+    """
+    Samples the calling thread's Python stack every `interval_s` from a
+    background thread. Aggregated stacks are written in folded format
+    ("a;b;c count"), readable by flamegraph.pl and speedscope.
+    """
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.counts = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).stem}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+        return path
+
+
+def _profile_requested(script: str, step: str) -> bool:
+    wanted = os.environ.get(PROFILE_ENV, "").strip()
+    if not wanted:
+        return False
+    names = {w.strip() for w in wanted.split(",")}
+    return "all" in names or script in names or f"{script}.{step}" in names
+
+
+# ------------------------
+# Steps
+# ------------------------
+class Step:
+    def __init__(self, name: str):
+        self.name = name
+        self.inputs = {}
+        self.outputs = {}
+        self.peak_rss_mb = None
+
+    def input(self, name: str, obj) -> None:
+        self.inputs[name] = describe(obj)
+
+    def output(self, name: str, obj) -> None:
+        self.outputs[name] = describe(obj)
+
+
+class _Session:
+    def __init__(self, script: str, run_id: str, log_path: Path):
+        self.script = script
+        self.run_id = run_id
+        self.log_path = log_path
+        self.stack = []
+        self.records = []
+        self.n_steps = 0
+
+
+_SESSION = None
+
+
+def _write_record(session: _Session, record: dict) -> None:
+    session.records.append(record)
+    session.log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(session.log_path, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def step(name: str):
+    """
+    Measure one script step (wall, CPU, peak RSS, bytes read/written) and
+    append it to the step log. Yields a Step; call .input()/.output() on it
+    to record shapes and sizes. A no-op outside a profiled() script.
+    """
+    session = _SESSION
+    st = Step(name)
+    if session is None:
+        yield st
+        return
+
+    # Fold the parent's peak so far in before the high-water mark is reset
+    if session.stack:
+        parent = session.stack[-1]
+        parent.peak_rss_mb = max(filter(None, (parent.peak_rss_mb, peak_rss_mb())), default=None)
+    reset_peak_rss()
+    session.stack.append(st)
+    seq = session.n_steps
+    session.n_steps += 1
+
+    sampler = None
+    if _profile_requested(session.script, name):
+        interval_ms = float(os.environ.get(PROFILE_INTERVAL_ENV, "5"))
+        sampler = StackSampler(interval_ms / 1000.0).start()
+
+    rss_start = proc_status_mb("VmRSS")
+    io0 = _io_bytes()
+    started = datetime.now().isoformat(timespec="seconds")
+    t0, c0 = time.perf_counter(), time.process_time()
+    status = "ok"
+    try:
+        yield st
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        io1 = _io_bytes()
+        session.stack.pop()
+        peak = max(filter(None, (st.peak_rss_mb, peak_rss_mb())), default=None)
+        if session.stack:
+            parent = session.stack[-1]
+            parent.peak_rss_mb = max(filter(None, (parent.peak_rss_mb, peak)), default=None)
+        profile_path = None
+        if sampler is not None:
+            sampler.stop()
+            profile_path = sampler.write(PROFILE_DIR / f"{session.run_id.replace(':', '')}-{session.script}-{name}.folded")
+        _write_record(session, {
+            "run_id": session.run_id,
+            "script": session.script,
+            "step": name,
+            "seq": seq,
+            "depth": len(session.stack),
+            "status": status,
+            "started": started,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "rss_start_mb": rss_start,
+            "peak_rss_mb": peak,
+            "read_bytes": io1[0] - io0[0] if io0 and io1 else None,
+            "write_bytes": io1[1] - io0[1] if io0 and io1 else None,
+            "inputs": st.inputs,
+            "outputs": st.outputs,
+            "profile": str(profile_path) if profile_path else None,
+            "pid": os.getpid(),
+        })
+
+
+def print_summary(records: list[dict]) -> None:
+    print("\n[Profile] step                          wall_s    cpu_s  peak_MB    read_MB   write_MB")
+    for r in records:
+        mb = lambda b: f"{b / 1e6:10.1f}" if b is not None else f"{'-':>10s}"
+        peak = f"{r['peak_rss_mb']:8.0f}" if r["peak_rss_mb"] is not None else f"{'-':>8s}"
+        label = "  " * r["depth"] + r["step"]
+        print(f"[Profile] {label:28s} {r['wall_s']:8.2f} {r['cpu_s']:8.2f} {peak} {mb(r['read_bytes'])} {mb(r['write_bytes'])}")
+
+
+def profiled(script: str, log_path: Path = STEP_LOG_PATH):
+    """
+    Decorator for a script's main(): opens a profiling session, records the
+    whole call as step "total" and prints a per-step summary at the end.
+    Re-entrant calls (e.g. a fallback full rebuild) join the open session.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _SESSION
+            if _SESSION is not None:
+                return fn(*args, **kwargs)
+            run_id = os.environ.get(RUN_ID_ENV) or datetime.now().isoformat(timespec="seconds")
+            _SESSION = session = _Session(script, run_id, Path(log_path))
+            try:
+                with step("total"):
+                    return fn(*args, **kwargs)
+            finally:
+                _SESSION = None
+                # Steps close inner-first; list them in start order
+                print_summary(sorted(session.records, key=lambda r: r["seq"]))
+        return wrapper
+    return decorator
+
+
+def load_step_log(path: Path = STEP_LOG_PATH) -> pd.DataFrame:
+    """
+    All step records as a DataFrame (one row per script step per run).
+    """
+    if not Path(path).exists():
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
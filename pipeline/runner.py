@@ -0,0 +1,203 @@
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+
+from multi_source_alpha.pipeline.profiling import RUN_ID_ENV
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PIPELINE_DIR = REPO_ROOT / "data" / "pipeline"
+MANIFEST_PATH = PIPELINE_DIR / "manifest.json"
+RUN_LOG_PATH = PIPELINE_DIR / "runs.jsonl"
+
+
+class Stage:
+    """
+    One pipeline step: `func` ("package.module:function") is called with
+    `params`, reads the `inputs` paths and writes the `outputs` paths.
+    `code` lists extra modules whose source is part of the fingerprint.
+    """
+    def __init__(self, name: str, func: str, inputs=(), outputs=(), params=None, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.params = dict(params or {})
+        self.code = list(code)
+
+    def source_files(self) -> list[Path]:
+        modules = [self.func.split(":")[0]] + self.code
+        return [Path(importlib.import_module(m).__file__) for m in modules]
+
+
+def _run_stage(func: str, params: dict) -> float:
+    module_name, func_name = func.split(":")
+    fn = getattr(importlib.import_module(module_name), func_name)
+    t0 = time.perf_counter()
+    fn(**params)
+    return time.perf_counter() - t0
+
+
+# ------------------------
+# Fingerprints
+# ------------------------
+def _files(path: Path) -> list[Path]:
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file())
+    return [path]
+
+
+def _file_digest(path: Path, file_cache: dict) -> str:
+    """
+    sha256 of a file, reusing the previous digest while size and mtime are unchanged.
+    """
+    st = path.stat()
+    key = str(path)
+    hit = file_cache.get(key)
+    if hit and hit["size"] == st.st_size and hit["mtime_ns"] == st.st_mtime_ns:
+        return hit["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    file_cache[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+    return h.hexdigest()
+
+
+def stage_fingerprint(stage: Stage, file_cache: dict) -> str:
+    """
+    Hash of the stage's code, parameters and the content of every input.
+    """
+    h = hashlib.sha256()
+    h.update(stage.func.encode())
+    h.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+    for src in stage.source_files():
+        h.update(_file_digest(src, file_cache).encode())
+    for path in stage.inputs:
+        if not path.exists():
+            raise FileNotFoundError(f"Stage '{stage.name}' input missing: {path}")
+        for f in _files(path):
+            h.update(str(f.relative_to(REPO_ROOT) if f.is_relative_to(REPO_ROOT) else f).encode())
+            h.update(_file_digest(f, file_cache).encode())
+    return h.hexdigest()
+
+
+# ------------------------
+# Manifest + run log
+# ------------------------
+def load_manifest(path: Path = MANIFEST_PATH) -> dict:
+    if not path.exists():
+        return {"stages": {}, "files": {}}
+    return json.loads(path.read_text())
+
+
+def save_manifest(manifest: dict, path: Path = MANIFEST_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2))
+
+
+def log_run(record: dict, path: Path = RUN_LOG_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+# ------------------------
+# Scheduling
+# ------------------------
+def stage_dependencies(stages: list[Stage]) -> dict[str, set[str]]:
+    """
+    Stage B depends on stage A if B reads any path that A writes.
+    """
+    producer = {}
+    for st in stages:
+        for out in st.outputs:
+            producer[out.resolve()] = st.name
+    deps = {}
+    for st in stages:
+        deps[st.name] = {
+            producer[p.resolve()] for p in st.inputs
+            if p.resolve() in producer and producer[p.resolve()] != st.name
+        }
+    return deps
+
+
+def run_pipeline(stages: list[Stage],
+                 targets=None,
+                 force=(),
+                 max_workers: int = 4,
+                 manifest_path: Path = MANIFEST_PATH,
+                 run_log_path: Path = RUN_LOG_PATH) -> dict:
+    """
+    Run `stages` in dependency order, in parallel where independent.
+
+    A stage is skipped when its fingerprint (code + params + input contents)
+    matches the manifest and all its outputs exist. `targets` limits the run
+    to those stages and their upstream; `force` reruns the named stages.
+    Returns {stage: "ran" | "skipped"}.
+    """
+    by_name = {st.name: st for st in stages}
+    deps = stage_dependencies(stages)
+
+    if targets is not None:
+        wanted, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in wanted:
+                wanted.add(name)
+                todo.extend(deps[name])
+        deps = {n: d & wanted for n, d in deps.items() if n in wanted}
+
+    manifest = load_manifest(manifest_path)
+    file_cache = manifest.setdefault("files", {})
+    run_id = datetime.now().isoformat(timespec="seconds")
+    # Stage scripts tag their step-level records (pipeline.profiling) with it
+    os.environ[RUN_ID_ENV] = run_id
+    status, running = {}, {}
+
+    def _record(name, state, fingerprint, runtime_s):
+        status[name] = state
+        log_run({"run_id": run_id, "stage": name, "status": state,
+                 "runtime_s": runtime_s, "fingerprint": fingerprint}, run_log_path)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while len(status) < len(deps):
+            ready = [n for n, d in deps.items()
+                     if n not in status and n not in running.values() and d <= status.keys()]
+            for name in ready:
+                st = by_name[name]
+                fp = stage_fingerprint(st, file_cache)
+                prev = manifest["stages"].get(name, {})
+                up_to_date = prev.get("fingerprint") == fp and all(p.exists() for p in st.outputs)
+                if up_to_date and name not in force:
+                    print(f"[Pipeline] {name}: up to date, skipped")
+                    _record(name, "skipped", fp, 0.0)
+                    continue
+                print(f"[Pipeline] {name}: running")
+                running[pool.submit(_run_stage, st.func, st.params)] = name
+                manifest["stages"][name] = {"fingerprint": None, "pending": fp}
+
+            if not running:
+                if not ready:
+                    raise RuntimeError(f"Pipeline has a dependency cycle among: {sorted(set(deps) - status.keys())}")
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                runtime_s = fut.result()
+                fp = manifest["stages"][name].pop("pending")
+                manifest["stages"][name] = {
+                    "fingerprint": fp,
+                    "runtime_s": runtime_s,
+                    "finished": datetime.now().isoformat(timespec="seconds"),
+                }
+                save_manifest(manifest, manifest_path)
+                print(f"[Pipeline] {name}: done in {runtime_s:.2f}s")
+                _record(name, "ran", fp, runtime_s)
+
+    save_manifest(manifest, manifest_path)
+    return status
@@ -0,0 +1,85 @@
+import os
+import sys
+
+from multi_source_alpha.data_providers.panel_store import ADJ_CLOSE_STORE, VOLUME_STORE, refresh_panels
+from multi_source_alpha.data_providers.universe import MEMBERSHIP_CSV
+from multi_source_alpha.pipeline.profiling import PROFILE_ENV
+from multi_source_alpha.pipeline.runner import Stage, run_pipeline
+from multi_source_alpha.signals import build_momentum_z, volume_shock
+from multi_source_alpha.scripts import build_earnings_sentiment, build_portfolio_weights
+from multi_source_alpha.backtests import portfolio_backtest
+
+
+def build_stages(tc_bps: float = 0.0) -> list[Stage]:
+    # Point-in-time membership is optional; when present it feeds every cross-sectional stage
+    universe = [MEMBERSHIP_CSV] if MEMBERSHIP_CSV.exists() else []
+    return [
+        Stage(
+            "momentum",
+            "multi_source_alpha.signals.build_momentum_z:main",
+            inputs=[ADJ_CLOSE_STORE, *universe],
+            outputs=[build_momentum_z.OUT_PATH],
+            code=["multi_source_alpha.signals.momentum", "multi_source_alpha.data_providers.universe"],
+        ),
+        Stage(
+            "volume_shock",
+            "multi_source_alpha.signals.volume_shock:main",
+            inputs=[VOLUME_STORE, *universe],
+            outputs=[volume_shock.OUT_RAW, volume_shock.OUT_Z],
+            code=["multi_source_alpha.data_providers.universe"],
+        ),
+        Stage(
+            "earnings_sentiment",
+            "multi_source_alpha.scripts.build_earnings_sentiment:main",
+            inputs=[ADJ_CLOSE_STORE, build_earnings_sentiment.RAW_DIR / "kaggle_earnings.csv"],
+            outputs=[
+                build_earnings_sentiment.PROCESSED_DIR / "earnings_events.parquet",
+                build_earnings_sentiment.EVENT_Z_OUT,
+                build_earnings_sentiment.DAILY_OUT,
+            ],
+            code=[
+                "multi_source_alpha.signals.sentiment.earnings",
+                "multi_source_alpha.data_providers.earnings_finnhub",
+                "multi_source_alpha.data_providers.event_store",
+            ],
+        ),
+        Stage(
+            "weights",
+            "multi_source_alpha.scripts.build_portfolio_weights:main",
+            inputs=[
+                build_portfolio_weights.MOM_PATH,
+                build_portfolio_weights.SENT_PATH,
+                build_portfolio_weights.VOL_PATH,
+                *universe,
+            ],
+            outputs=[build_portfolio_weights.OUT_PATH],
+            code=["multi_source_alpha.signals.cross_section", "multi_source_alpha.data_providers.universe"],
+        ),
+        Stage(
+            "backtest",
+            "multi_source_alpha.backtests.portfolio_backtest:main",
+            inputs=[portfolio_backtest.WEIGHTS_PATH, ADJ_CLOSE_STORE],
+            outputs=[
+                portfolio_backtest.OUT_EQUITY_PATH,
+                portfolio_backtest.OUT_METRICS_PATH,
+                portfolio_backtest.OUT_PLOT_PATH,
+            ],
+            params={"tc_bps": tc_bps},
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_source_alpha.pipeline.stages [--force stage,...] [--tc-bps 5]
+    #        [--profile all|stage,stage.step,...]
+    args = sys.argv[1:]
+    if "--profile" in args:
+        os.environ[PROFILE_ENV] = args[args.index("--profile") + 1]
+    force = args[args.index("--force") + 1].split(",") if "--force" in args else ()
+    tc_bps = float(args[args.index("--tc-bps") + 1]) if "--tc-bps" in args else 0.0
+    # Stages fingerprint the stores, so re-downloaded CSVs must be imported first
+    refresh_panels()
+    status = run_pipeline(build_stages(tc_bps=tc_bps), force=force)
+    print("\n=== Pipeline ===")
+    for name, state in status.items():
+        print(f"{name:20s}: {state}")
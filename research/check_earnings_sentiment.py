@@ -5,15 +5,17 @@ import sys
 import os
 # Add the parent directory of 'multi_source_alpha' to the path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from multi_source_alpha.data_providers.panel_store import read_sparse_panel
 
-SENT_PATH = "data/sentiment/processed/earnings_sentiment_daily.parquet"
+SENT_PATH = "data/sentiment/processed/earnings_sentiment_daily.csr"
 
 
 def main():
     # ----------------------------
     # Load sentiment panel
     # ----------------------------
-    sent = pd.read_parquet(SENT_PATH)
+    m, dates, tickers = read_sparse_panel(SENT_PATH)
+    sent = pd.DataFrame(m.toarray(), index=dates, columns=tickers)
 
     print("Shape:", sent.shape)
     print("Date range:", sent.index.min(), "→", sent.index.max())
@@ -49,8 +51,10 @@ def main():
     print("\n=== OPTIONAL DIAGNOSTICS ===")
 
     # Sparsity
-    nonzero_frac = (sent != 0).mean().mean()
+    nonzero_frac = m.nnz / max(m.shape[0] * m.shape[1], 1)
     print(f"Fraction of non-zero entries: {nonzero_frac:.4f}")
+    print(f"Stored entries: {m.nnz:,} ({m.data.nbytes + m.indices.nbytes + m.indptr.nbytes:,} bytes vs "
+          f"{m.shape[0] * m.shape[1] * 8:,} dense)")
 
     # Cross-sectional snapshot
     sample_date = sent.index[len(sent) // 2]
@@ -1,17 +1,38 @@
+import shutil
+import tempfile
 import pandas as pd
+from pathlib import Path
+from multi_source_alpha.data_providers.panel_store import (
+    ADJ_CLOSE_CSV,
+    ADJ_CLOSE_STORE,
+    ensure_panel,
+    read_panel_block,
+    read_panel_index,
+    read_panel_meta,
+)
+from multi_source_alpha.signals.chunked import (
+    DEFAULT_BUDGET_MB,
+    OUT_DIR,
+    block_len,
+    blocks,
+    chunked_forward_returns,
+    chunked_momentum_z,
+)
 from multi_source_alpha.signals.momentum import (
     load_sp500_adj_close,
     compute_raw_momentum,
     compute_momentum_zscore,
 )
-from multi_source_alpha.signals.returns import compute_forward_returns
+from multi_source_alpha.signals.returns import ForwardReturns
+
+FWD_HORIZONS = (1, 5, 21, 63)
 
 
 def combine_momentum_and_returns():
     """
     Build a panel with:
       - mom: momentum z-scores
-      - fwd_1d, fwd_5d, fwd_21d: forward returns
+      - fwd_1d, fwd_5d, fwd_21d, fwd_63d: forward returns
     Columns: MultiIndex [panel_name, ticker]
     Index: dates
     """
@@ -22,34 +43,55 @@ def combine_momentum_and_returns():
     raw = compute_raw_momentum(prices)
     mom_z = compute_momentum_zscore(raw)
 
-    # --- Compute forward returns ---
-    fwd = compute_forward_returns(prices, horizons=(1, 5, 21,63))
-    fwd_1d = fwd[1]
-    fwd_5d = fwd[5]
-    fwd_21d = fwd[21]
-    fwd_63d = fwd[63]
+    # --- Forward returns (shared on-disk cache) ---
+    fwd = ForwardReturns.from_store().horizons(FWD_HORIZONS)
 
     # --- Align dates ---
     common_index = mom_z.index
-    for df in (fwd_1d, fwd_5d, fwd_21d):
+    for df in fwd.values():
         common_index = common_index.intersection(df.index)
 
-    mom = mom_z.loc[common_index]
-    f1 = fwd_1d.loc[common_index]
-    f5 = fwd_5d.loc[common_index]
-    f21 = fwd_21d.loc[common_index]
-    f63 = fwd_63d.loc[common_index]
-
     # --- Assign MultiIndex columns ---
-    mom.columns = pd.MultiIndex.from_product([["mom"], mom.columns])
-    f1.columns = pd.MultiIndex.from_product([["fwd_1d"], f1.columns])
-    f5.columns = pd.MultiIndex.from_product([["fwd_5d"], f5.columns])
-    f21.columns = pd.MultiIndex.from_product([["fwd_21d"], f21.columns])
-    f63.columns = pd.MultiIndex.from_product([["fwd_63d"], f63.columns])
+    parts = [mom_z.loc[common_index]] + [fwd[h].loc[common_index] for h in FWD_HORIZONS]
+    names = ["mom"] + [f"fwd_{h}d" for h in FWD_HORIZONS]
+    for name, part in zip(names, parts):
+        part.columns = pd.MultiIndex.from_product([[name], part.columns])
     # --- Combine everything ---
-    combined = pd.concat([mom, f1, f5, f21,f63], axis=1)
+    combined = pd.concat(parts, axis=1)
     return combined
 
+
+def combined_blocks(budget_mb: float = DEFAULT_BUDGET_MB):
+    """
+    The same frame as combine_momentum_and_returns, yielded one date block
+    at a time so the five panels are never held in memory together.
+
+    Momentum z-scores and forward returns are first built out of core
+    (signals.chunked) into temporary stores, then read back per date block.
+    Only for consumers that work date by date (IC, bucket returns).
+    """
+    price_store = ensure_panel(ADJ_CLOSE_STORE, ADJ_CLOSE_CSV)
+    dates = read_panel_index(price_store)
+    tickers = pd.Index(read_panel_meta(price_store)["tickers"])
+    # On disk next to the other chunked stores: a tmpfs /tmp would hold them in RAM
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix="combined_", dir=OUT_DIR))
+    try:
+        stores = {"mom": chunked_momentum_z(price_store, tmp / "mom_z.panel", budget_mb=budget_mb)}
+        fwd = chunked_forward_returns(price_store, tmp / "fwd", horizons=FWD_HORIZONS, budget_mb=budget_mb)
+        stores.update({f"fwd_{h}d": store for h, store in fwd.items()})
+
+        # Each date row is read once per panel and held again by the concat
+        for rows in blocks(len(dates), block_len(budget_mb, len(tickers), copies=2 * len(stores))):
+            parts = []
+            for name, store in stores.items():
+                part = pd.DataFrame(read_panel_block(store, rows=rows), index=dates[rows], columns=tickers, copy=False)
+                part.columns = pd.MultiIndex.from_product([[name], tickers])
+                parts.append(part)
+            yield pd.concat(parts, axis=1)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
 if __name__ == "__main__":
     combined = combine_momentum_and_returns()
     print("Combined DataFrame:")
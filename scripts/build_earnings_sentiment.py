@@ -7,18 +7,44 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from multi_source_alpha.data_providers.earnings_finnhub import fetch_earnings_history
-from multi_source_alpha.signals.momentum import load_sp500_adj_close
+from multi_source_alpha.data_providers.event_store import (
+    EVENTS_STORE,
+    resolve_priority,
+    to_canonical,
+    upsert_events,
+    write_events,
+)
+from multi_source_alpha.data_providers.panel_store import (
+    META_FILE,
+    panel_dir,
+    load_adj_close_index,
+    read_panel_index,
+    read_panel_meta,
+    write_sparse_panel,
+    append_sparse_panel,
+)
+from multi_source_alpha.pipeline.profiling import profiled, step
 from multi_source_alpha.signals.sentiment.earnings import (
     compute_eps_surprise,
     standardize_surprise_within_ticker,
+    extend_surprise_z,
+    first_changed_event_date,
     build_daily_decayed_sentiment,
 )
 
-RAW_DIR = Path("data/sentiment/raw")
-PROCESSED_DIR = Path("data/sentiment/processed")
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = REPO_ROOT / "data" / "sentiment" / "raw"
+PROCESSED_DIR = REPO_ROOT / "data" / "sentiment" / "processed"
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
+EVENT_Z_OUT = PROCESSED_DIR / "earnings_surprise_z.parquet"
+# Mostly zeros (no recent event), so stored as a CSR-by-date sparse panel
+DAILY_OUT = PROCESSED_DIR / "earnings_sentiment_daily.csr"
+
+HALF_LIFE_DAYS = 42
+ACTIVE_WINDOW_DAYS = 126
+
 
 # -----------------------------
 # 1) Load Kaggle as canonical
@@ -31,23 +57,18 @@ def load_kaggle_as_canonical(path: Path) -> pd.DataFrame:
     Canonical output:
       symbol, date, epsActual, epsEstimate, source
     """
-    df = pd.read_csv(path)
+    # Typed read: "NULL" parses as missing, symbols go straight to a categorical
+    df = pd.read_csv(path,
+                     usecols=["symbol", "date", "eps_est", "eps"],
+                     dtype={"symbol": "category", "date": "str"},
+                     na_values=["NULL"])
 
     # rename into canonical names
     df = df.rename(columns={
         "eps": "epsActual",
         "eps_est": "epsEstimate",
     })
-
-    # clean + types
-    df["symbol"] = df["symbol"].astype(str).str.strip()
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-
-    df["epsActual"] = pd.to_numeric(df["epsActual"].replace("NULL", np.nan), errors="coerce")
-    df["epsEstimate"] = pd.to_numeric(df["epsEstimate"].replace("NULL", np.nan), errors="coerce")
-
-    df["source"] = "kaggle"
-    return df[["symbol", "date", "epsActual", "epsEstimate", "source"]]
+    return to_canonical(df, "kaggle")
 
 
 # -----------------------------
@@ -61,107 +82,143 @@ def finnhub_to_canonical(df: pd.DataFrame) -> pd.DataFrame:
     Canonical output:
       symbol, date, epsActual, epsEstimate, source
     """
-    out = df.copy()
-
-    if out.empty:
-        return out
-
-    out["symbol"] = out["symbol"].astype(str).str.strip()
-    out["date"] = pd.to_datetime(out["date"], errors="coerce")
-    out["epsActual"] = pd.to_numeric(out.get("epsActual"), errors="coerce")
-    out["epsEstimate"] = pd.to_numeric(out.get("epsEstimate"), errors="coerce")
-
-    out["source"] = "finnhub"
-    return out[["symbol", "date", "epsActual", "epsEstimate", "source"]]
+    if df.empty:
+        return df
+    return to_canonical(df, "finnhub")
 
 
 # -----------------------------
 # 3) Merge, Finnhub priority
 # -----------------------------
 def merge_canonical(kaggle_df: pd.DataFrame, finnhub_df: pd.DataFrame) -> pd.DataFrame:
-    all_df = pd.concat([kaggle_df, finnhub_df], ignore_index=True)
+    # Finnhub wins on same (symbol, date); one sort also gives the (date, symbol) order
+    return resolve_priority([kaggle_df, finnhub_df])
 
-    # drop garbage rows
-    all_df = all_df.dropna(subset=["symbol", "date"])
 
-    # Finnhub wins on same (symbol, date)
-    priority = {"finnhub": 0, "kaggle": 1}
-    all_df["priority"] = all_df["source"].map(priority).fillna(9)
-
-    all_df = (
-        all_df.sort_values(["symbol", "date", "priority"])
-             .drop_duplicates(subset=["symbol", "date"], keep="first")
-             .drop(columns=["priority"])
-             .sort_values(["date", "symbol"])
-             .reset_index(drop=True)
-    )
-
-    return all_df
-
-
-def main():
+@profiled("earnings_sentiment")
+def main(incremental: bool = False):
     # Trading index for PEAD decay (aligns to your prices file)
-    prices = load_sp500_adj_close()
-    trading_index = prices.index
+    trading_index = load_adj_close_index()
 
-    # --- Load Kaggle ---
-    kaggle_path = RAW_DIR / "kaggle_earnings.csv"
-    if not kaggle_path.exists():
-        raise FileNotFoundError(f"Missing Kaggle file: {kaggle_path}")
+    # Incremental runs upsert new Finnhub rows into the stored events;
+    # Kaggle (static history) is only merged when the store is rebuilt
+    upsert = incremental and EVENTS_STORE.exists()
 
-    print("[Kaggle] Loading → canonical")
-    kaggle = load_kaggle_as_canonical(kaggle_path)
-    print(f"[Kaggle] rows: {len(kaggle):,}")
+    # --- Load Kaggle ---
+    if not upsert:
+        kaggle_path = RAW_DIR / "kaggle_earnings.csv"
+        if not kaggle_path.exists():
+            raise FileNotFoundError(f"Missing Kaggle file: {kaggle_path}")
+
+        print("[Kaggle] Loading → canonical")
+        with step("load_kaggle") as st:
+            kaggle = load_kaggle_as_canonical(kaggle_path)
+            st.input("file", kaggle_path)
+            st.output("kaggle", kaggle)
+        print(f"[Kaggle] rows: {len(kaggle):,}")
 
     # --- Fetch Finnhub ---
     print("[Finnhub] Fetching earnings history")
-    finnhub_raw = fetch_earnings_history(start="2021-01-01")
-    finnhub_raw.to_csv(RAW_DIR / "finnhub_earnings.csv", index=False)
+    with step("fetch_finnhub") as st:
+        finnhub_raw = fetch_earnings_history(start="2021-01-01")
+        finnhub_raw.to_csv(RAW_DIR / "finnhub_earnings.csv", index=False)
+        st.output("finnhub_raw", finnhub_raw)
     print(f"[Finnhub] rows: {len(finnhub_raw):,}")
 
     finnhub = finnhub_to_canonical(finnhub_raw)
 
-    # --- Merge ---
-    print("[Merge] Kaggle + Finnhub (Finnhub priority)")
-    events = merge_canonical(kaggle, finnhub)
-    print(f"[Merge] unique (symbol,date): {len(events):,}")
-
-    # Save canonical events
-    events_out = PROCESSED_DIR / "earnings_events.parquet"
-    events.to_parquet(events_out, index=False)
-    print(f"[Saved] {events_out}")
+    # --- Merge + save canonical events ---
+    if upsert:
+        print("[Merge] Upsert Finnhub into stored events (Finnhub priority)")
+        with step("upsert_events") as st:
+            events, n_changed = upsert_events(finnhub, EVENTS_STORE)
+            st.output("events", events)
+        print(f"[Merge] {n_changed:,} rows added or replaced, unique (symbol,date): {len(events):,}")
+    else:
+        print("[Merge] Kaggle + Finnhub (Finnhub priority)")
+        with step("merge") as st:
+            events = merge_canonical(kaggle, finnhub)
+            st.output("events", events)
+        print(f"[Merge] unique (symbol,date): {len(events):,}")
+
+        with step("save_events") as st:
+            write_events(events, EVENTS_STORE)
+            st.output("file", EVENTS_STORE)
+    print(f"[Saved] {EVENTS_STORE}")
 
     # --- Build surprise + z ---
     print("[Signal] Compute EPS surprise")
-    event_surprise = compute_eps_surprise(
-        events,
-        date_col="date",
-        ticker_col="symbol",
-        actual_col="epsActual",
-        estimate_col="epsEstimate",
-    )
-
-    print("[Signal] Standardize within ticker (expanding z-score)")
-    event_z = standardize_surprise_within_ticker(event_surprise)
+    with step("eps_surprise") as st:
+        event_surprise = compute_eps_surprise(
+            events,
+            date_col="date",
+            ticker_col="symbol",
+            actual_col="epsActual",
+            estimate_col="epsEstimate",
+        )
+        st.output("event_surprise", event_surprise)
+
+    stored = incremental and (panel_dir(DAILY_OUT) / META_FILE).exists() and EVENT_Z_OUT.exists()
+    with step("surprise_z") as st:
+        if stored:
+            print("[Signal] Extend per-ticker expanding z-score with new events")
+            prior_z = pd.read_parquet(EVENT_Z_OUT)
+            event_z = extend_surprise_z(prior_z, event_surprise)
+        else:
+            print("[Signal] Standardize within ticker (expanding z-score)")
+            event_z = standardize_surprise_within_ticker(event_surprise)
+        event_z.to_parquet(EVENT_Z_OUT, index=False)
+        st.output("event_z", event_z)
 
     # --- Daily decayed sentiment on trading days ---
-    print("[Signal] Build daily decayed sentiment (trading days)")
-    daily = build_daily_decayed_sentiment(
-        event_z,
-        trading_index=trading_index,
-        half_life_days=42,
-        active_window_days=126,
-    )
+    # Incremental: only days from the first new day or the first day touched
+    # by a new / changed event z (late or revised prints) are rebuilt, plus
+    # the decay window before them
+    first_new = 0
+    if stored:
+        stored_dates = read_panel_index(DAILY_OUT)
+        if len(stored_dates):
+            first_new = int(trading_index.searchsorted(stored_dates.max(), side="right"))
+        changed = first_changed_event_date(prior_z, event_z)
+        if pd.notna(changed):
+            first_new = min(first_new, int(trading_index.searchsorted(changed.normalize(), side="left")))
+        print(f"[Incremental] rebuilding {len(trading_index) - first_new} trading days")
+    start = max(first_new - (ACTIVE_WINDOW_DAYS - 1), 0)
 
-    daily_out = PROCESSED_DIR / "earnings_sentiment_daily.parquet"
-    daily.to_parquet(daily_out)
-    print(f"[Saved] {daily_out}")
+    print("[Signal] Build daily decayed sentiment (trading days)")
+    with step("daily_sentiment") as st:
+        daily = build_daily_decayed_sentiment(
+            event_z,
+            trading_index=trading_index[start:],
+            half_life_days=HALF_LIFE_DAYS,
+            active_window_days=ACTIVE_WINDOW_DAYS,
+        )
+        st.input("event_z", event_z)
+        st.output("daily", daily)
+
+    with step("save_daily") as st:
+        if stored and read_panel_meta(DAILY_OUT)["tickers"] == [str(c) for c in daily.columns]:
+            # Rows before first_new only warm up the decay window
+            append_sparse_panel(DAILY_OUT, daily.iloc[first_new - start:])
+        else:
+            if stored:
+                print("[Incremental] Ticker set changed, rebuilding full history")
+                daily = build_daily_decayed_sentiment(
+                    event_z,
+                    trading_index=trading_index,
+                    half_life_days=HALF_LIFE_DAYS,
+                    active_window_days=ACTIVE_WINDOW_DAYS,
+                )
+            write_sparse_panel(daily, DAILY_OUT)
+        st.output("store", DAILY_OUT)
+    meta = read_panel_meta(DAILY_OUT)
+    print(f"[Saved] {DAILY_OUT} (shape {tuple(meta['shape'])})")
 
     print("✅ build_earnings_sentiment.py complete.")
 
 
 if __name__ == "__main__":
-    main()
+    main(incremental="--incremental" in sys.argv)
 
 
 
@@ -3,78 +3,181 @@ import numpy as np
 from pathlib import Path
 import sys
 import os
+from scipy.sparse import issparse
 # Add the parent directory of 'multi_source_alpha' to the path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
+from multi_source_alpha.data_providers.panel_store import read_sparse_panel
+from multi_source_alpha.data_providers.universe import load_membership, member_array
+from multi_source_alpha.pipeline.profiling import profiled, step
+from multi_source_alpha.signals.cross_section import capped_simplex_rows, row_quantiles, sparse_row_quantiles
+
 # ------------------------
-# Paths (relative to repo root when you run `python -m ...`)
+# Paths (robust: absolute repo root)
 # ------------------------
-DATA = Path("data")
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DATA = REPO_ROOT / "data"
 OUT_DIR = DATA / "portfolio"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-MOM_PATH = Path("C:/Users/Suhas/Quant projects/multi_source_alpha/data/signals/momentum_z.parquet")
-SENT_PATH = Path("C:/Users/Suhas/Quant projects/multi_source_alpha/data/sentiment/processed/earnings_sentiment_daily.parquet")
-VOL_PATH = Path("C:/Users/Suhas/Quant projects/multi_source_alpha/data/volume/processed/volume_shock_z.parquet")
+MOM_PATH = DATA / "signals" / "momentum_z.parquet"
+SENT_PATH = DATA / "sentiment" / "processed" / "earnings_sentiment_daily.csr"
+VOL_PATH = DATA / "volume" / "processed" / "volume_shock_z.parquet"
 
 OUT_PATH = OUT_DIR / "weights_long_only.parquet"
 
 
-def normalize_long_only(W: pd.DataFrame, cap: float = 0.02) -> pd.DataFrame:
+def normalize_long_only(W: pd.DataFrame, cap=0.02, min_positions: int = None) -> pd.DataFrame:
     """
     Long-only normalization that preserves sleeve hierarchy.
 
-    Steps per day:
-      1) Normalize raw scores so sum(weights)=1
-      2) Cap each name to `cap`
-      3) Renormalize so sum(weights)=1 again
+    Per day, weights are proportional to the (clipped at 0) raw scores, with
+    names that would exceed their cap held at it and the excess spread
+    pro rata over the rest (exact capped-simplex water-filling; see
+    capped_simplex_rows). Weights sum to 1 unless the names cannot absorb it
+    within their caps: then every name sits at its cap and the rest is held
+    as cash (see gross_exposure).
+
+    `cap` is a scalar, a per-name Series, a dates x names DataFrame or None.
+    `min_positions` holds every name at or below 1/min_positions, so days
+    with fewer positive scores than that are only partly invested.
     """
-    W = W.clip(lower=0.0)
+    raw = W.to_numpy(dtype=float)
+    if cap is None:
+        caps = np.inf
+    elif isinstance(cap, pd.DataFrame):
+        caps = cap.reindex(index=W.index, columns=W.columns).fillna(np.inf).to_numpy(dtype=float)
+    elif isinstance(cap, pd.Series):
+        caps = cap.reindex(W.columns).fillna(np.inf).to_numpy(dtype=float)
+    else:
+        caps = float(cap)
+    if min_positions:
+        caps = np.minimum(caps, 1.0 / min_positions)
 
-    # 1) normalize
-    s = W.sum(axis=1).replace(0, np.nan)
-    W = W.div(s, axis=0).fillna(0.0)
+    out = capped_simplex_rows(raw, caps)
+    return pd.DataFrame(out, index=W.index, columns=W.columns)
 
-    # 2) cap
-    if cap is not None:
-        W = W.clip(upper=cap)
-        # 3) renormalize after cap
-        s2 = W.sum(axis=1).replace(0, np.nan)
-        W = W.div(s2, axis=0).fillna(0.0)
 
-    return W
+def gross_exposure(W: pd.DataFrame) -> pd.Series:
+    """
+    Invested fraction per day (1 = fully invested, 0 = flat).
+    """
+    return W.sum(axis=1)
 
 
-def main():
-    print("[Load] Signals")
+def under_invested_share(W: pd.DataFrame, tol: float = 1e-9) -> float:
+    """
+    Share of days whose weights sum to less than 1 (flat days included).
+    """
+    return float((gross_exposure(W) < 1.0 - tol).mean())
+
+
+# Default construction parameters (see build_weights)
+DEFAULT_PARAMS = {
+    "mom_hi_q": 0.8,
+    "mom_lo_q": 0.2,
+    "sent_neutral_q": 0.6,
+    "sent_neg_q": 0.2,
+    "vol_hi_q": 0.8,
+    "mr_weight": 0.3,
+    "cap": 0.02,
+    "min_positions": None,
+}
+
+
+def load_aligned_signals():
+    """
+    Momentum and volume panels plus the sentiment signal as a CSR matrix,
+    all aligned on common dates + tickers. Returns (mom, sent, vol).
+    """
     mom = pd.read_parquet(MOM_PATH)
-    sent = pd.read_parquet(SENT_PATH)
+    sent, sent_dates, sent_tickers = read_sparse_panel(SENT_PATH)
     vol = pd.read_parquet(VOL_PATH)
 
     # Align on common dates + tickers
-    common_dates = mom.index.intersection(sent.index).intersection(vol.index)
-    common_cols = mom.columns.intersection(sent.columns).intersection(vol.columns)
+    common_dates = mom.index.intersection(sent_dates).intersection(vol.index)
+    common_cols = mom.columns.intersection(sent_tickers).intersection(vol.columns)
 
     mom = mom.loc[common_dates, common_cols]
-    sent = sent.loc[common_dates, common_cols]
+    sent = sent[sent_dates.get_indexer(common_dates)][:, sent_tickers.get_indexer(common_cols)]
     vol = vol.loc[common_dates, common_cols]
+    return mom, sent.tocsr(), vol
 
-    print("Aligned shape:", mom.shape)
+
+def _sparse_le(s, thr: np.ndarray) -> np.ndarray:
+    """
+    Dense boolean s <= thr[row] for a CSR matrix: implicit zeros share one
+    answer per row, only the stored entries are compared individually.
+    """
+    out = np.repeat((0.0 <= thr)[:, None], s.shape[1], axis=1)
+    rows = np.repeat(np.arange(s.shape[0]), np.diff(s.indptr))
+    out[rows, s.indices] = s.data <= thr[rows]
+    return out
+
+
+def build_sleeve_masks(mom: pd.DataFrame,
+                       sent,
+                       vol: pd.DataFrame,
+                       mom_hi_q: float = 0.8,
+                       mom_lo_q: float = 0.2,
+                       sent_neutral_q: float = 0.6,
+                       sent_neg_q: float = 0.2,
+                       vol_hi_q: float = 0.8,
+                       members=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Boolean (dates x tickers) arrays for the core and MR sleeves.
+    Each panel is sorted once per row; all its cutoffs come from that sort.
+    `sent` may be a DataFrame or a CSR matrix (only its non-zeros are sorted).
+    With point-in-time `members`, every cutoff is taken over live names only
+    and non-members are never selected.
+    """
+    m = mom.to_numpy(dtype=float)
+    v = vol.to_numpy(dtype=float)
+    live = None
+    if members is not None:
+        # Non-members become NaN, which every row quantile below skips
+        live = member_array(members, mom.index, mom.columns)
+        m = np.where(live, m, np.nan)
+        v = np.where(live, v, np.nan)
 
     # ------------------------
-    # Cross-sectional thresholds (row-wise, broadcast-safe)
+    # Cross-sectional thresholds (row-wise, one sort per panel)
     # ------------------------
-    mom_hi = mom.ge(mom.quantile(0.8, axis=1), axis=0)   # top 20%
-    mom_lo = mom.le(mom.quantile(0.2, axis=1), axis=0)   # bottom 20%
+    mom_q = row_quantiles(m, (mom_hi_q, mom_lo_q))
+    vol_q = row_quantiles(v, (vol_hi_q,))
 
-    # "Neutral sentiment" = in the middle by magnitude (avoid extremes)
-    sent_neutral = sent.abs().le(sent.abs().quantile(0.6, axis=1), axis=0)
+    mom_hi = m >= mom_q[mom_hi_q][:, None]   # top 20%
+    mom_lo = m <= mom_q[mom_lo_q][:, None]   # bottom 20%
 
-    # "Very negative sentiment" = bottom 20% (mean-reversion sleeve)
-    sent_very_neg = sent.le(sent.quantile(0.2, axis=1), axis=0)
+    if issparse(sent):
+        s = sent.tocsr()
+        n_live = None
+        if live is not None:
+            # Drop stored entries of non-members; their implicit zeros are not counted either
+            s = s.multiply(live).tocsr()
+            s.eliminate_zeros()
+            n_live = live.sum(axis=1)
+        s_abs = abs(s)
+        neutral_thr = sparse_row_quantiles(s_abs, (sent_neutral_q,), n_live)[sent_neutral_q]
+        neg_thr = sparse_row_quantiles(s, (sent_neg_q,), n_live)[sent_neg_q]
+
+        # "Neutral sentiment" = in the middle by magnitude (avoid extremes)
+        sent_neutral = _sparse_le(s_abs, neutral_thr)
+        # "Very negative sentiment" = bottom 20% (mean-reversion sleeve)
+        sent_very_neg = _sparse_le(s, neg_thr)
+    else:
+        s = sent.to_numpy(dtype=float)
+        if live is not None:
+            s = np.where(live, s, np.nan)
+        s_abs = np.abs(s)
+        sent_abs_q = row_quantiles(s_abs, (sent_neutral_q,))
+        sent_q = row_quantiles(s, (sent_neg_q,))
+
+        sent_neutral = s_abs <= sent_abs_q[sent_neutral_q][:, None]
+        sent_very_neg = s <= sent_q[sent_neg_q][:, None]
 
     # High volume shock = top 20%
-    vol_hi = vol.ge(vol.quantile(0.8, axis=1), axis=0)
+    vol_hi = v >= vol_q[vol_hi_q][:, None]
     vol_not_hi = ~vol_hi
 
     # ------------------------
@@ -82,25 +185,80 @@ def main():
     # ------------------------
     core_long = mom_hi & sent_neutral & vol_not_hi
     mr_long = mom_lo & sent_very_neg & vol_hi
+    if live is not None:
+        core_long &= live
+        mr_long &= live
+    return core_long, mr_long
+
+
+def build_weights(mom: pd.DataFrame,
+                  sent,
+                  vol: pd.DataFrame,
+                  mom_hi_q: float = 0.8,
+                  mom_lo_q: float = 0.2,
+                  sent_neutral_q: float = 0.6,
+                  sent_neg_q: float = 0.2,
+                  vol_hi_q: float = 0.8,
+                  mr_weight: float = 0.3,
+                  cap: float = 0.02,
+                  min_positions: int = None,
+                  members=None) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Long-only weights from aligned signals. Returns (W, core_long, mr_long).
+    `members` (point-in-time membership) restricts ranking and holdings to
+    live index members.
+    """
+    core_long, mr_long = build_sleeve_masks(
+        mom, sent, vol,
+        mom_hi_q=mom_hi_q,
+        mom_lo_q=mom_lo_q,
+        sent_neutral_q=sent_neutral_q,
+        sent_neg_q=sent_neg_q,
+        vol_hi_q=vol_hi_q,
+        members=members,
+    )
 
     # ------------------------
     # Raw scores (core > MR)
     # ------------------------
-    raw = pd.DataFrame(0.0, index=common_dates, columns=common_cols)
+    raw = np.zeros(core_long.shape)
     raw[core_long] = 1.0
-    raw[mr_long] += 0.3
+    raw[mr_long] += mr_weight
     # Normalize + cap
-    W = normalize_long_only(raw, cap=0.02)
+    W = normalize_long_only(pd.DataFrame(raw, index=mom.index, columns=mom.columns), cap=cap, min_positions=min_positions)
+    return W, core_long, mr_long
+
+
+@profiled("weights")
+def main():
+    print("[Load] Signals")
+    with step("load_signals") as st:
+        mom, sent, vol = load_aligned_signals()
+        members = load_membership()
+        st.output("mom", mom)
+        st.output("sent", sent)
+        st.output("vol", vol)
+    print("Aligned shape:", mom.shape)
+    if members is not None:
+        print("[Universe] Point-in-time membership mask")
+
+    with step("build_weights") as st:
+        W, core_long, mr_long = build_weights(mom, sent, vol, **DEFAULT_PARAMS, members=members)
+        st.output("W", W)
 
     # Save
-    W.to_parquet(OUT_PATH)
+    with step("save") as st:
+        W.to_parquet(OUT_PATH)
+        st.output("file", OUT_PATH)
     print(f"[Saved] {OUT_PATH}")
 
     # Diagnostics
     print("Median #positions/day:", (W > 0).sum(axis=1).median())
     print("Median max weight/day:", W.max(axis=1).median())
-    print("Core longs/day (median):", core_long.sum(axis=1).median())
-    print("MR longs/day (median):", mr_long.sum(axis=1).median())
+    print("Median gross exposure/day:", gross_exposure(W).median())
+    print(f"Under-invested days (gross < 1): {under_invested_share(W):.1%}")
+    print("Core longs/day (median):", np.median(core_long.sum(axis=1)))
+    print("MR longs/day (median):", np.median(mr_long.sum(axis=1)))
 
 
 if __name__ == "__main__":
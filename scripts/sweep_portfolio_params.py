@@ -0,0 +1,166 @@
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from scipy.sparse import csr_matrix
+import sys
+import os
+# Add the parent directory of 'multi_source_alpha' to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from multi_source_alpha.backtests.portfolio_backtest import run_backtest
+from multi_source_alpha.data_providers.panel_store import load_adj_close, load_adj_close_tickers
+from multi_source_alpha.data_providers.universe import load_membership, member_array
+from multi_source_alpha.scripts.build_portfolio_weights import (
+    DEFAULT_PARAMS,
+    OUT_DIR,
+    build_weights,
+    gross_exposure,
+    load_aligned_signals,
+    under_invested_share,
+)
+
+OUT_PATH = OUT_DIR / "sweep_results.csv"
+
+# Every key is a build_weights parameter, plus tc_bps for the backtest
+DEFAULT_GRID = {
+    "mom_hi_q": [0.7, 0.8, 0.9],
+    "mom_lo_q": [0.2],
+    "sent_neutral_q": [0.5, 0.6, 0.7],
+    "sent_neg_q": [0.2],
+    "vol_hi_q": [0.8],
+    "mr_weight": [0.0, 0.3, 0.5],
+    "cap": [0.02, 0.05],
+    "tc_bps": [0.0, 5.0],
+}
+
+
+def expand_grid(grid: dict) -> list[dict]:
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+# ------------------------
+# Shared-memory panels
+# ------------------------
+def _to_shared(arr: np.ndarray, dtype=np.float64) -> tuple[shared_memory.SharedMemory, tuple]:
+    arr = np.ascontiguousarray(arr, dtype=dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+# Set once per worker by _init_worker
+_PANELS = {}
+_WORKER_SHM = []
+
+
+def _attach(spec: tuple) -> np.ndarray:
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    _WORKER_SHM.append(shm)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _init_worker(specs: dict, index: pd.DatetimeIndex, columns: dict) -> None:
+    for key, spec in specs.items():
+        if key == "sent":
+            # CSR sentiment: (data, indices, indptr) arrays
+            data, indices, indptr = (_attach(s) for s in spec)
+            _PANELS[key] = csr_matrix((data, indices, indptr), shape=(len(index), len(columns[key])))
+        else:
+            _PANELS[key] = pd.DataFrame(_attach(spec), index=index, columns=columns[key], copy=False)
+
+
+def evaluate_params(params: dict) -> dict:
+    weight_params = {k: v for k, v in params.items() if k != "tc_bps"}
+    W, _, _ = build_weights(_PANELS["mom"], _PANELS["sent"], _PANELS["vol"], **weight_params,
+                            members=_PANELS.get("members"))
+    # Same as portfolio_backtest: only names with prices are traded
+    W = W[_PANELS["rets"].columns]
+    _, metrics = run_backtest(W, _PANELS["rets"], tc_bps=params.get("tc_bps", 0.0))
+    return {
+        **params,
+        "sharpe_gross": metrics["Sharpe (gross)"],
+        "sharpe_net": metrics["Sharpe (net)"],
+        "max_dd_gross": metrics["Max Drawdown (gross)"],
+        "max_dd_net": metrics["Max Drawdown (net)"],
+        "avg_turnover": metrics["Avg Daily Turnover"],
+        "median_positions": float((W > 0).sum(axis=1).median()),
+        "gross_exposure": float(gross_exposure(W).mean()),
+        "under_invested_days": under_invested_share(W),
+    }
+
+
+def run_sweep(mom: pd.DataFrame,
+              sent: csr_matrix,
+              vol: pd.DataFrame,
+              rets: pd.DataFrame,
+              grid: dict = None,
+              max_workers: int = None,
+              members: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Weights + backtest metrics for every parameter combination in `grid`.
+
+    The aligned signal panels (sentiment as its CSR arrays), the returns
+    matrix and the optional membership mask are copied into shared memory
+    once; workers wrap them without pickling.
+    """
+    combos = expand_grid(grid or DEFAULT_GRID)
+    combos = [{**DEFAULT_PARAMS, "tc_bps": 0.0, **c} for c in combos]
+
+    rets = rets.reindex(index=mom.index, columns=mom.columns.intersection(rets.columns))
+    blocks = {"mom": mom, "vol": vol, "rets": rets}
+    columns = {key: df.columns for key, df in blocks.items()}
+    columns["sent"] = mom.columns
+    sent = csr_matrix(sent)
+    shms, specs = [], {}
+    try:
+        for key, df in blocks.items():
+            shm, spec = _to_shared(df.to_numpy(dtype=float))
+            shms.append(shm)
+            specs[key] = spec
+        sent_specs = []
+        for arr in (sent.data, sent.indices, sent.indptr):
+            shm, spec = _to_shared(arr, dtype=arr.dtype)
+            shms.append(shm)
+            sent_specs.append(spec)
+        specs["sent"] = tuple(sent_specs)
+        if members is not None:
+            shm, specs["members"] = _to_shared(member_array(members, mom.index, mom.columns), dtype=bool)
+            shms.append(shm)
+            columns["members"] = mom.columns
+
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(specs, mom.index, columns)) as pool:
+            rows = list(pool.map(evaluate_params, combos))
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(rows)
+
+
+def main(grid: dict = None, max_workers: int = None):
+    print("[Load] Signals")
+    mom, sent, vol = load_aligned_signals()
+    print("Aligned shape:", mom.shape)
+
+    print("[Load] Prices")
+    prices = load_adj_close(tickers=mom.columns.intersection(load_adj_close_tickers()))
+    rets = prices.pct_change()
+
+    combos = expand_grid(grid or DEFAULT_GRID)
+    print(f"[Sweep] {len(combos)} parameter sets")
+    results = run_sweep(mom, sent, vol, rets, grid=grid, max_workers=max_workers, members=load_membership())
+
+    results.to_csv(OUT_PATH, index=False)
+    print(f"[Saved] {OUT_PATH}")
+    print(results.sort_values("sharpe_net", ascending=False).head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
+import sys
 import pandas as pd
 from pathlib import Path
 
+from multi_source_alpha.data_providers.panel_store import load_adj_close_index
+from multi_source_alpha.data_providers.universe import load_membership, membership_mtime
+from multi_source_alpha.pipeline.profiling import profiled, step
+from multi_source_alpha.signals.incremental import (
+    load_persisted,
+    first_pending_pos,
+    warmup_start,
+    can_append,
+    append_rows,
+    outdated_by,
+)
 from multi_source_alpha.signals.momentum import (
     load_sp500_adj_close,
     compute_raw_momentum,
@@ -13,19 +25,62 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 OUT_PATH = OUT_DIR / "momentum_z.parquet"
 
+SHORT_GAP = 21
+LOOKBACK = 252
+
+
+@profiled("momentum")
+def main(incremental: bool = False):
+    with step("load_existing") as st:
+        existing = load_persisted(OUT_PATH, incremental)
+        st.output("existing", existing)
+    if existing is not None and outdated_by(OUT_PATH, membership_mtime()):
+        # Persisted z-scores were ranked under the old membership
+        print("[Incremental] Membership changed, running full rebuild")
+        return main(incremental=False)
+    index = load_adj_close_index()
+    first_new = first_pending_pos(existing, index)
+    if existing is not None and first_new >= len(index):
+        print("[Incremental] momentum_z.parquet is up to date")
+        return
+
+    # Incremental: only the LOOKBACK rows before the first new date are needed
+    start = warmup_start(index, first_new, LOOKBACK) if existing is not None else None
 
-def main():
     print("[Load] Prices (Adj Close)")
-    prices = load_sp500_adj_close()
+    if start is not None:
+        print(f"[Incremental] {len(index) - first_new} new dates, loading from {start.date()}")
+    with step("load_prices") as st:
+        prices = load_sp500_adj_close(start=start)
+        st.output("prices", prices)
 
     print("[Compute] Raw momentum (12m lookback, 1m skip)")
-    raw = compute_raw_momentum(prices, short_gap=21, lookback=252)
+    with step("raw_momentum") as st:
+        raw = compute_raw_momentum(prices, short_gap=SHORT_GAP, lookback=LOOKBACK)
+        st.input("prices", prices)
+        st.output("raw", raw)
 
     print("[Compute] Cross-sectional z-score momentum")
-    mom_z = compute_momentum_zscore(raw)
+    with step("zscore") as st:
+        members = load_membership()
+        if members is not None:
+            print("[Universe] Point-in-time membership mask")
+        mom_z = compute_momentum_zscore(raw, members)
+        st.input("raw", raw)
+        st.output("mom_z", mom_z)
+
+    if existing is not None:
+        if can_append(existing, mom_z):
+            mom_z = append_rows(existing, mom_z)
+        else:
+            print("[Incremental] Ticker set changed, running full rebuild")
+            return main(incremental=False)
 
     print("[Save] momentum_z.parquet")
-    mom_z.to_parquet(OUT_PATH)
+    with step("save") as st:
+        mom_z.to_parquet(OUT_PATH)
+        st.input("mom_z", mom_z)
+        st.output("file", OUT_PATH)
 
     print("Saved:", OUT_PATH)
     print("Shape:", mom_z.shape)
@@ -33,4 +88,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(incremental="--incremental" in sys.argv)
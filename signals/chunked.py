@@ -0,0 +1,218 @@
+import shutil
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from multi_source_alpha.data_providers.panel_store import (
+    ADJ_CLOSE_CSV,
+    ADJ_CLOSE_STORE,
+    VOLUME_CSV,
+    VOLUME_STORE,
+    create_panel,
+    ensure_panel,
+    panel_shape,
+    read_panel_block,
+    read_panel_index,
+    read_panel_meta,
+    write_panel_block,
+)
+from multi_source_alpha.data_providers.universe import load_membership
+from multi_source_alpha.pipeline.profiling import profiled, step
+from multi_source_alpha.signals.momentum import compute_raw_momentum, compute_momentum_zscore
+from multi_source_alpha.signals.returns import ForwardReturns
+from multi_source_alpha.signals.volume_shock import (
+    cross_sectional_zscore,
+    rolling_zscore_inplace,
+    winsorize_rows_inplace,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+OUT_DIR = REPO_ROOT / "data" / "chunked"
+
+MOMENTUM_Z_STORE = OUT_DIR / "momentum_z.panel"
+FWD_DIR = OUT_DIR / "fwd_returns"
+VOLUME_SHOCK_RAW_STORE = OUT_DIR / "volume_shock_raw.panel"
+VOLUME_SHOCK_Z_STORE = OUT_DIR / "volume_shock_z.panel"
+
+DEFAULT_BUDGET_MB = 1024
+# Float64 copies of one block alive at once in a step (input, output, pandas temporaries)
+WORK_COPIES = 6
+
+
+# ------------------------
+# Block planning
+# ------------------------
+def block_len(budget_mb: float, other_len: int, copies: int = WORK_COPIES, itemsize: int = 8) -> int:
+    """
+    How many tickers (or dates) fit in one block when each one spans
+    `other_len` dates (or tickers) and `copies` working copies are held.
+    """
+    per_unit = max(other_len, 1) * itemsize * copies
+    return max(int(budget_mb * 1024 * 1024 // per_unit), 1)
+
+
+def blocks(n: int, size: int) -> list[slice]:
+    return [slice(i, min(i + size, n)) for i in range(0, n, size)]
+
+
+def _frame(block: np.ndarray, index, columns) -> pd.DataFrame:
+    return pd.DataFrame(block, index=index, columns=columns, copy=False)
+
+
+def map_ticker_blocks(fn, src: Path, dsts: list[Path], budget_mb: float, copies: int = WORK_COPIES) -> None:
+    """
+    Time-series step: fn(dates x ticker-block frame) -> one array per dst,
+    applied to every ticker block of `src` (all dates).
+    """
+    T, N = panel_shape(src)
+    index = read_panel_index(src)
+    tickers = pd.Index(read_panel_meta(src)["tickers"])
+    for cols in blocks(N, block_len(budget_mb, T, copies)):
+        outs = fn(_frame(read_panel_block(src, cols=cols), index, tickers[cols]))
+        for dst, out in zip(dsts, outs):
+            write_panel_block(dst, out, cols=cols)
+
+
+def map_date_blocks(fn, src: Path, dsts: list[Path], budget_mb: float, copies: int = WORK_COPIES) -> None:
+    """
+    Cross-sectional step: fn(date-block x all tickers frame) -> one array per dst.
+    """
+    T, N = panel_shape(src)
+    index = read_panel_index(src)
+    tickers = pd.Index(read_panel_meta(src)["tickers"])
+    for rows in blocks(T, block_len(budget_mb, N, copies)):
+        outs = fn(_frame(read_panel_block(src, rows=rows), index[rows], tickers))
+        for dst, out in zip(dsts, outs):
+            write_panel_block(dst, out, rows=rows)
+
+
+def _like(src: Path, dst: Path) -> Path:
+    return create_panel(dst, read_panel_index(src), read_panel_meta(src)["tickers"])
+
+
+# ------------------------
+# Signals
+# ------------------------
+def chunked_momentum_z(price_store: Path = ADJ_CLOSE_STORE,
+                       out_store: Path = MOMENTUM_Z_STORE,
+                       short_gap: int = 21,
+                       lookback: int = 252,
+                       budget_mb: float = DEFAULT_BUDGET_MB,
+                       members: pd.DataFrame = None) -> Path:
+    """
+    compute_momentum_zscore(compute_raw_momentum(prices), members) without
+    holding the panel in memory: raw momentum per ticker block, z-score per
+    date block.
+    """
+    out_store = Path(out_store)
+    tmp = Path(tempfile.mkdtemp(prefix="raw_mom_", dir=out_store.parent if out_store.parent.exists() else None))
+    try:
+        raw_store = _like(price_store, tmp / "raw.panel")
+        map_ticker_blocks(
+            lambda p: [compute_raw_momentum(p, short_gap=short_gap, lookback=lookback).to_numpy()],
+            price_store, [raw_store], budget_mb)
+        _like(price_store, out_store)
+        map_date_blocks(lambda raw: [compute_momentum_zscore(raw, members).to_numpy()],
+                        raw_store, [out_store], budget_mb)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out_store
+
+
+def chunked_forward_returns(price_store: Path = ADJ_CLOSE_STORE,
+                            out_dir: Path = FWD_DIR,
+                            horizons=(1, 5, 21, 63),
+                            budget_mb: float = DEFAULT_BUDGET_MB) -> dict[int, Path]:
+    """
+    One store per horizon (out_dir/fwd_{h}d.panel), all filled in a single
+    pass over ticker blocks.
+    """
+    out_dir = Path(out_dir)
+    stores = {h: _like(price_store, out_dir / f"fwd_{h}d.panel") for h in horizons}
+
+    def _fwd(p):
+        # Same log-difference formula as the in-memory provider, so both paths agree
+        fwd = ForwardReturns.from_frame(p, cache_dir=None).horizons(horizons)
+        return [fwd[h].to_numpy() for h in horizons]
+
+    map_ticker_blocks(_fwd, price_store, [stores[h] for h in horizons], budget_mb,
+                      copies=WORK_COPIES + len(horizons))
+    return stores
+
+
+def chunked_volume_shock(volume_store: Path = VOLUME_STORE,
+                         out_raw: Path = VOLUME_SHOCK_RAW_STORE,
+                         out_z: Path = VOLUME_SHOCK_Z_STORE,
+                         window: int = 60,
+                         min_periods: int = 40,
+                         winsorize: bool = True,
+                         budget_mb: float = DEFAULT_BUDGET_MB,
+                         members: pd.DataFrame = None) -> tuple[Path, Path]:
+    """
+    compute_volume_shock + cross_sectional_zscore out of core: log + row
+    winsorization per date block, rolling z-score per ticker block, then the
+    cross-sectional z-score per date block.
+    """
+    out_raw, out_z = Path(out_raw), Path(out_z)
+    tmp = Path(tempfile.mkdtemp(prefix="log_vol_", dir=out_raw.parent if out_raw.parent.exists() else None))
+    try:
+        log_store = _like(volume_store, tmp / "log_volume.panel")
+
+        def _log_winsorize(vol):
+            v = vol.to_numpy(dtype=float, copy=True)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                v[~(v > 0)] = np.nan
+                np.log(v, out=v)
+            if winsorize:
+                winsorize_rows_inplace(v, 0.01, 0.99)
+            return [v]
+
+        map_date_blocks(_log_winsorize, volume_store, [log_store], budget_mb)
+
+        _like(volume_store, out_raw)
+        map_ticker_blocks(
+            lambda v: [rolling_zscore_inplace(v.to_numpy(dtype=float, copy=True), window=window, min_periods=min_periods)],
+            log_store, [out_raw], budget_mb)
+
+        _like(volume_store, out_z)
+        map_date_blocks(lambda shock: [cross_sectional_zscore(shock, members).to_numpy()], out_raw, [out_z], budget_mb)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out_raw, out_z
+
+
+@profiled("chunked")
+def main(budget_mb: float = DEFAULT_BUDGET_MB):
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    price_store = ensure_panel(ADJ_CLOSE_STORE, ADJ_CLOSE_CSV)
+    print(f"[Chunked] Panel {panel_shape(price_store)}, memory budget {budget_mb:,.0f} MB")
+    # Point-in-time membership (None: every name is live)
+    members = load_membership(price_store=price_store)
+
+    print("[Compute] Momentum z-score (ticker blocks -> date blocks)")
+    with step("momentum_z") as st:
+        chunked_momentum_z(price_store, budget_mb=budget_mb, members=members)
+        st.output("store", MOMENTUM_Z_STORE)
+    print(f"[Saved] {MOMENTUM_Z_STORE}")
+
+    print("[Compute] Forward returns (ticker blocks)")
+    with step("forward_returns") as st:
+        stores = chunked_forward_returns(price_store, budget_mb=budget_mb)
+        st.output("stores", stores)
+    for store in stores.values():
+        print(f"[Saved] {store}")
+
+    print("[Compute] Volume shock (date -> ticker -> date blocks)")
+    with step("volume_shock") as st:
+        raw, z = chunked_volume_shock(ensure_panel(VOLUME_STORE, VOLUME_CSV), budget_mb=budget_mb, members=members)
+        st.output("raw", raw)
+        st.output("z", z)
+    print(f"[Saved] {raw}\n[Saved] {z}")
+
+
+if __name__ == "__main__":
+    # Usage: python -m multi_source_alpha.signals.chunked [--budget-mb 1024]
+    args = sys.argv[1:]
+    main(budget_mb=float(args[args.index("--budget-mb") + 1]) if "--budget-mb" in args else DEFAULT_BUDGET_MB)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+
+def lerp(a: np.ndarray, b: np.ndarray, t) -> np.ndarray:
+    """
+    Linear interpolation exactly as np.quantile(method="linear") does it.
+    """
+    diff = b - a
+    out = a + diff * t
+    return np.where(np.asarray(t) >= 0.5, b - diff * (1 - t), out)
+
+
+def sort_rows(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sort every row once (NaN last). Returns (sorted rows, valid count per row).
+    """
+    a = values.to_numpy(dtype=float) if isinstance(values, pd.DataFrame) else np.asarray(values, dtype=float)
+    return np.sort(a, axis=1), (~np.isnan(a)).sum(axis=1)
+
+
+def quantile_from_sorted(sorted_rows: np.ndarray, n: np.ndarray, q: float) -> np.ndarray:
+    """
+    Per-row q-quantile (same as DataFrame.quantile(q, axis=1)) from sort_rows output.
+    Rows without valid values get NaN.
+    """
+    pos = (np.maximum(n, 1) - 1) * q
+    f = np.floor(pos).astype(np.intp)
+    c = np.minimum(f + 1, np.maximum(n - 1, 0))
+    a = np.take_along_axis(sorted_rows, f[:, None], axis=1)[:, 0]
+    b = np.take_along_axis(sorted_rows, c[:, None], axis=1)[:, 0]
+    out = lerp(a, b, pos - f)
+    out[n == 0] = np.nan
+    return out
+
+
+def row_quantiles(values, qs) -> dict[float, np.ndarray]:
+    """
+    Any number of per-row quantile cutoffs from a single sort of `values`.
+    """
+    sorted_rows, n = sort_rows(values)
+    return {q: quantile_from_sorted(sorted_rows, n, q) for q in qs}
+
+
+def sparse_row_quantiles(m, qs, n_valid=None) -> dict[float, np.ndarray]:
+    """
+    Per-row quantiles of a CSR matrix with its implicit zeros counted as
+    values (same as row_quantiles(m.toarray(), qs)), sorting only the
+    stored entries. `n_valid` optionally gives each row's number of valid
+    names (stored entries plus implicit zeros), e.g. live index members;
+    the rest of the row is then left out as if NaN.
+    """
+    m = m.tocsr()
+    T, N = m.shape
+    nnz = np.diff(m.indptr)
+    rows = np.repeat(np.arange(T), nnz)
+    data = m.data.astype(float)
+    srt = data[np.lexsort((data, rows))]
+    n_neg = np.bincount(rows, weights=data < 0, minlength=T).astype(np.intp)
+    n = np.full(T, N, dtype=np.intp) if n_valid is None else np.asarray(n_valid, dtype=np.intp)
+    n_zero = n - nnz
+
+    def kth(k):
+        # k-th smallest of the full row: stored negatives, then zeros, then the rest
+        pos = np.where(k < n_neg, k, k - n_zero)
+        idx = np.clip(m.indptr[:-1] + pos, 0, max(len(srt) - 1, 0))
+        val = srt[idx] if len(srt) else np.zeros(T)
+        return np.where((k >= n_neg) & (k < n_neg + n_zero), 0.0, val)
+
+    out = {}
+    for q in qs:
+        pos = (np.maximum(n, 1) - 1) * q
+        f = np.floor(pos).astype(np.intp)
+        c = np.minimum(f + 1, np.maximum(n - 1, 0))
+        out[q] = lerp(kth(f), kth(c), pos - f)
+        out[q][n == 0] = np.nan
+    return out
+
+
+def capped_simplex_rows(scores: np.ndarray, caps) -> np.ndarray:
+    """
+    Per row, w = min(cap, s * score) with the scale s chosen so the row sums
+    to 1: the fixed point of "normalize, clip at cap, renormalize" repeated
+    until nothing exceeds its cap. Solved for all rows at once by sorting
+    each row's cap/score ratios (water-filling). `caps` broadcasts against
+    `scores` (scalar, per-name row or full panel; np.inf for no cap).
+
+    Rows whose positive names cannot absorb 1 within their caps end at the
+    caps (sum < 1, rest in cash). Non-positive scores get zero weight.
+    """
+    x = np.clip(np.nan_to_num(np.asarray(scores, dtype=float), nan=0.0), 0.0, None)
+    c = np.broadcast_to(np.asarray(caps, dtype=float), x.shape)
+    total = x.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(total > 0, x / total, 0.0)
+    # Only rows where plain normalization breaks a cap need the sort
+    bind = (w > c).any(axis=1)
+    if bind.any():
+        w[bind] = _water_fill(x[bind], c[bind])
+    return w
+
+
+def _water_fill(x: np.ndarray, c: np.ndarray) -> np.ndarray:
+    T, N = x.shape
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(x > 0, c / x, np.inf)
+    # Flat gather indices (much cheaper than take_along_axis on wide panels)
+    flat = np.argsort(r, axis=1)
+    flat += np.arange(T)[:, None] * N
+    r_s, c_s, x_s = (np.take(a, flat) for a in (r, np.ascontiguousarray(c), x))
+
+    # csat[:, k] = caps of the k smallest ratios, xfree[:, k] = scores of the rest
+    # (infinite ratios sort last and are never saturated, so their caps are never read)
+    csat = np.zeros((T, N + 1))
+    np.cumsum(c_s, axis=1, out=csat[:, 1:])
+    xfree = np.zeros((T, N + 1))
+    np.cumsum(x_s[:, ::-1], axis=1, out=xfree[:, -2::-1])
+
+    # Total weight if the scale sits at each ratio; increasing along the row (NaN/inf past the finite ratios)
+    with np.errstate(invalid="ignore"):
+        at_ratio = csat[:, 1:] + r_s * xfree[:, 1:]
+    k = (at_ratio < 1.0).sum(axis=1)[:, None]
+    free = np.take_along_axis(xfree, k, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = (1.0 - np.take_along_axis(csat, k, axis=1)) / free
+    s[free <= 0] = np.inf
+    with np.errstate(invalid="ignore"):
+        w = np.minimum(c, s * x)
+    w[x == 0] = 0.0
+    return w
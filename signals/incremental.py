@@ -0,0 +1,50 @@
+import pandas as pd
+from pathlib import Path
+
+
+def load_persisted(path: Path, incremental: bool) -> pd.DataFrame | None:
+    """
+    Previously saved signal panel, or None when doing a full rebuild.
+    """
+    if not incremental or not Path(path).exists():
+        return None
+    df = pd.read_parquet(path)
+    df.index = pd.to_datetime(df.index)
+    return df
+
+
+def first_pending_pos(existing: pd.DataFrame | None, index: pd.DatetimeIndex) -> int:
+    """
+    Position in `index` of the first date not yet in `existing` (0 if nothing is persisted).
+    """
+    if existing is None or existing.empty:
+        return 0
+    return int(index.searchsorted(existing.index.max(), side="right"))
+
+
+def warmup_start(index: pd.DatetimeIndex, first_new: int, warmup: int) -> pd.Timestamp:
+    """
+    First date that has to be loaded so that the `warmup` rows before
+    `index[first_new]` are available to shifts / rolling windows.
+    """
+    return index[max(first_new - warmup, 0)]
+
+
+def outdated_by(path: Path, mtime: float | None) -> bool:
+    """
+    True when an input last changed at `mtime` after `path` was written, so
+    its persisted rows were computed from older data.
+    """
+    return mtime is not None and mtime > Path(path).stat().st_mtime
+
+
+def can_append(existing: pd.DataFrame | None, new_rows: pd.DataFrame) -> bool:
+    """
+    Appending is only equivalent to a rebuild if the ticker set did not change.
+    """
+    return existing is not None and existing.columns.equals(new_rows.columns)
+
+
+def append_rows(existing: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    new_rows = new_rows.loc[new_rows.index > existing.index.max()]
+    return pd.concat([existing, new_rows.astype(existing.dtypes.iloc[0])], axis=0)
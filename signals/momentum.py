@@ -1,12 +1,12 @@
+import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
-REPO_ROOT = Path(__file__).resolve().parents[1]
-PRICES_PATH = REPO_ROOT / "data/prices/sp500_adj_close.csv"
+from multi_source_alpha.data_providers.panel_store import load_adj_close
+from multi_source_alpha.data_providers.universe import member_array
 
-def load_sp500_adj_close() -> pd.DataFrame:
-    df = pd.read_csv(PRICES_PATH, index_col=0, parse_dates=True)
-    df = df.sort_index()
-    return df
+def load_sp500_adj_close(tickers=None, start=None, end=None, dtype=None) -> pd.DataFrame:
+    return load_adj_close(tickers=tickers, start=start, end=end, dtype=dtype)
 
 def compute_raw_momentum(prices:pd.DataFrame,
                          short_gap: int = 21,
@@ -16,12 +16,86 @@ def compute_raw_momentum(prices:pd.DataFrame,
     raw_mom = (p_short/p_long) - 1.0
     return raw_mom
 
-def compute_momentum_zscore(raw_mom: pd.DataFrame) -> pd.DataFrame:
+def compute_momentum_zscore(raw_mom: pd.DataFrame, members=None) -> pd.DataFrame:
+    #`members` (point-in-time membership) masks non-members to NaN first,
+    #so the cross-sectional mean / std only see live names
+    if members is not None:
+        raw_mom = raw_mom.where(member_array(members, raw_mom.index, raw_mom.columns))
     mean = raw_mom.mean(axis=1)
     std = raw_mom.std(axis=1)
     z = (raw_mom.sub(mean, axis=0)).div(std, axis=0)
     return z
 
+def zscore_rows_batched(block: np.ndarray) -> np.ndarray:
+    #Cross-sectional z-score along the last axis (same as compute_momentum_zscore,
+    #ddof=1), for a whole (params, dates, tickers) batch at once
+    valid = ~np.isnan(block)
+    n = valid.sum(axis=-1, keepdims=True)
+    x = np.where(valid, block, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = x.sum(axis=-1, keepdims=True) / n
+        dev = np.where(valid, block - mean, 0.0)
+        std = np.sqrt((dev * dev).sum(axis=-1, keepdims=True) / (n - 1))
+        return (block - mean) / std
+
+def momentum_grid_params(lookbacks, skips) -> pd.MultiIndex:
+    pairs = [(lb, sk) for lb in lookbacks for sk in skips if sk < lb]
+    return pd.MultiIndex.from_tuples(pairs, names=["lookback", "short_gap"])
+
+def compute_momentum_grid(prices:pd.DataFrame,
+                          lookbacks = (21, 42, 63, 84, 105, 126, 147, 168, 189, 210, 231, 252),
+                          skips = (0, 5, 10, 21, 42, 63),
+                          zscore: bool = True,
+                          dtype = np.float32,
+                          out_path: Path = None,
+                          batch_size: int = 8) -> tuple[np.ndarray, pd.MultiIndex]:
+    """
+    Momentum for every (lookback, short_gap) pair as one param x date x ticker array.
+
+    Log prices are computed once; each pair is a difference of two row-offset
+    views of them (p[t-gap] / p[t-lookback] - 1), so no shifted panel copies
+    are made. Pairs are z-scored cross-sectionally in batches of `batch_size`
+    and, if `out_path` is given, streamed into a .npy memmap (with a .json
+    sidecar holding params, dates and tickers).
+    """
+    params = momentum_grid_params(lookbacks, skips)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logp = np.log(prices.to_numpy(dtype=float))
+    T, N = logp.shape
+    shape = (len(params), T, N)
+
+    if out_path is not None:
+        out_path = Path(out_path)
+        out = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=shape)
+        out_path.with_suffix(".json").write_text(json.dumps({
+            "params": [list(map(int, p)) for p in params],
+            "dates": [str(d) for d in prices.index],
+            "tickers": [str(c) for c in prices.columns],
+        }))
+    else:
+        out = np.empty(shape, dtype=dtype)
+
+    for b0 in range(0, len(params), batch_size):
+        batch = params[b0:b0 + batch_size]
+        block = np.full((len(batch), T, N), np.nan)
+        for k, (lookback, short_gap) in enumerate(batch):
+            if lookback < T:
+                block[k, lookback:] = np.expm1(logp[lookback - short_gap:T - short_gap] - logp[:T - lookback])
+        if zscore:
+            block = zscore_rows_batched(block)
+        out[b0:b0 + len(batch)] = block
+
+    if out_path is not None:
+        out.flush()
+    return out, params
+
+def load_momentum_grid(path: Path, mmap: bool = True) -> tuple[np.ndarray, pd.MultiIndex, pd.DatetimeIndex, pd.Index]:
+    path = Path(path)
+    meta = json.loads(path.with_suffix(".json").read_text())
+    grid = np.load(path, mmap_mode="r" if mmap else None)
+    params = pd.MultiIndex.from_tuples([tuple(p) for p in meta["params"]], names=["lookback", "short_gap"])
+    return grid, params, pd.DatetimeIndex(meta["dates"]), pd.Index(meta["tickers"])
+
 if __name__ == "__main__":
     prices = load_sp500_adj_close()
     print("Prices shape:", prices.shape)
@@ -0,0 +1,305 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from multi_source_alpha.data_providers.universe import member_array
+from multi_source_alpha.signals.momentum import compute_momentum_zscore
+from multi_source_alpha.signals.volume_shock import cross_sectional_zscore, winsorize_rows_inplace
+
+
+class SignalServer:
+    """
+    Streaming momentum_z / volume_shock_z / decayed earnings sentiment for a
+    fixed ticker universe, updated once per bar in O(tickers).
+
+    State per ticker:
+      - a ring buffer of the last `lookback` + 1 closes (momentum),
+      - a ring buffer of the last `vol_window` winsorized log volumes with
+        running (count, sum, sum of squares) (volume shock),
+      - the decayed sentiment accumulator, plus a ring buffer of the last
+        `active_window_days` impulses so each leaves the window exactly,
+      - running (count, sum, sum of squares) of raw EPS surprises.
+
+    Feeding the same history bar by bar gives the batch values
+    (compute_momentum_zscore, compute_volume_shock + cross_sectional_zscore,
+    standardize_surprise_within_ticker + build_daily_decayed_sentiment) up
+    to floating-point rounding. Readers may query from other threads.
+
+    With point-in-time membership (a per-bar live vector passed to on_bar),
+    the cross-sectional z-scores and weights only see live names, as the
+    batch builds do with their `members` mask.
+    """
+    def __init__(self,
+                 tickers,
+                 short_gap: int = 21,
+                 lookback: int = 252,
+                 vol_window: int = 60,
+                 vol_min_periods: int = 40,
+                 half_life_days: int = 42,
+                 active_window_days: int = 126,
+                 surprise_min_periods: int = 3,
+                 surprise_min_events: int = 6,
+                 weight_params: dict = None):
+        self.tickers = pd.Index([str(t) for t in tickers])
+        self._col = {t: j for j, t in enumerate(self.tickers)}
+        N = len(self.tickers)
+        self.short_gap, self.lookback = short_gap, lookback
+        self.vol_window, self.vol_min_periods = vol_window, vol_min_periods
+        self.active_window_days = active_window_days
+        self.surprise_min_periods = surprise_min_periods
+        self.surprise_min_events = surprise_min_events
+        self.weight_params = weight_params
+        self.decay = np.exp(-np.log(2) / half_life_days)
+        self._lock = threading.Lock()
+
+        self.n_bars = 0
+        self.last_date = None
+        self._prices = np.full((lookback + 1, N), np.nan)
+
+        self._logv = np.full((vol_window, N), np.nan)
+        self._vol_ref = np.full(N, np.nan)
+        self._vol_sums = np.zeros((3, N))
+
+        self._impulse = np.zeros((active_window_days, N))
+        self._n_events = np.zeros((active_window_days, N), dtype=np.int64)
+        self._sent = np.zeros(N)
+        self._sent_count = np.zeros(N, dtype=np.int64)
+        self._has_events = np.zeros(N, dtype=bool)
+        self._surprise_state = np.zeros((3, N))
+        self._pending = []
+        # Dates of the bars still inside the active window -> bar number
+        self._bar_dates = {}
+        # Live flags of the latest bar that gave them (None: every ticker is live)
+        self._live = None
+
+        self._mom_z = np.full(N, np.nan)
+        self._shock = np.full(N, np.nan)
+        self._shock_z = np.full(N, np.nan)
+
+    # ------------------------
+    # Updates
+    # ------------------------
+    def _vector(self, values) -> np.ndarray:
+        if isinstance(values, pd.Series):
+            values = values.reindex(self.tickers)
+        return np.asarray(values, dtype=float)
+
+    def on_bar(self, date, close, volume=None, events: pd.DataFrame = None, members=None) -> None:
+        """
+        Advance one bar: `close` / `volume` are per-ticker Series (or arrays in
+        ticker order). `events` optionally carries this bar's earnings prints
+        (see on_earnings). `members` is this bar's index membership (boolean
+        Series or array; unlisted tickers are not live); without it the
+        previous bar's membership carries over.
+        """
+        date = pd.Timestamp(date).normalize()
+        close = self._vector(close)
+        volume = np.full(len(self.tickers), np.nan) if volume is None else self._vector(volume)
+        if isinstance(members, pd.Series):
+            members = members.reindex(self.tickers, fill_value=False)
+        live = None if members is None else np.asarray(members, dtype=bool)
+        with self._lock:
+            if live is not None:
+                self._live = live
+            slot = self.n_bars % (self.lookback + 1)
+            self._prices[slot] = close
+            self._update_momentum(slot)
+            self._update_volume(volume)
+            self._advance_sentiment()
+            if self.n_bars >= self.active_window_days:
+                self._bar_dates = {d: i for d, i in self._bar_dates.items()
+                                   if i > self.n_bars - self.active_window_days}
+            self._bar_dates[date] = self.n_bars
+            self.n_bars += 1
+            self.last_date = date
+            # Prints dated before this bar that never met a bar are dropped, as in batch
+            pending, self._pending = self._pending, []
+            for ev_date, j, z in pending:
+                if ev_date == date:
+                    self._add_impulse(j, z, age=0)
+                elif ev_date > date:
+                    self._pending.append((ev_date, j, z))
+        if events is not None and len(events):
+            self.on_earnings(events)
+
+    def _update_momentum(self, slot: int) -> None:
+        size = self.lookback + 1
+        if self.n_bars < self.lookback:
+            self._mom_z[:] = np.nan
+            return
+        p_short = self._prices[(slot - self.short_gap) % size]
+        p_long = self._prices[(slot - self.lookback) % size]
+        raw = p_short / p_long - 1.0
+        self._mom_z = compute_momentum_zscore(pd.DataFrame(raw[None, :]), members=self._live_row()).to_numpy()[0]
+
+    def _update_volume(self, volume: np.ndarray) -> None:
+        v = volume.copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            v[~(v > 0)] = np.nan
+            np.log(v, out=v)
+        winsorize_rows_inplace(v[None, :], 0.01, 0.99)
+
+        # New tickers are centred on their first value to keep x^2 sums well conditioned
+        first = np.isnan(self._vol_ref) & ~np.isnan(v)
+        self._vol_ref[first] = v[first]
+
+        slot = self.n_bars % self.vol_window
+        old = self._logv[slot]
+        n, s1, s2 = self._vol_sums
+        has_old = ~np.isnan(old)
+        old_c = np.where(has_old, old - self._vol_ref, 0.0)
+        n -= has_old
+        s1 -= old_c
+        s2 -= old_c * old_c
+        self._logv[slot] = v
+        has_new = ~np.isnan(v)
+        new_c = np.where(has_new, v - self._vol_ref, 0.0)
+        n += has_new
+        s1 += new_c
+        s2 += new_c * new_c
+        if slot == self.vol_window - 1:
+            # Once per window, recompute the sums from the buffer so rounding does not accumulate
+            xc = self._logv - self._vol_ref
+            valid = ~np.isnan(xc)
+            n[:] = valid.sum(axis=0)
+            s1[:] = np.where(valid, xc, 0.0).sum(axis=0)
+            s2[:] = np.where(valid, xc * xc, 0.0).sum(axis=0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m1 = s1 / n
+            m2 = s2 / n
+            var = m2 - m1 * m1
+            # Zero std exactly when the window's valid values are all equal (as in the batch kernel)
+            var[np.fmax.reduce(self._logv, axis=0) == np.fmin.reduce(self._logv, axis=0)] = 0.0
+            sd = np.sqrt(np.where(var > 0, var, np.nan))
+            shock = (new_c - m1) / sd
+        shock[(n < self.vol_min_periods) | ~has_new] = np.nan
+        self._shock = shock
+        self._shock_z = cross_sectional_zscore(pd.DataFrame(shock[None, :]), members=self._live_row()).to_numpy()[0]
+
+    def _live_row(self):
+        return None if self._live is None else self._live[None, :]
+
+    def _advance_sentiment(self) -> None:
+        W = self.active_window_days
+        slot = self.n_bars % W
+        leaving = self._impulse[slot] if self.n_bars >= W else np.zeros(len(self.tickers))
+        leaving_n = self._n_events[slot] if self.n_bars >= W else 0
+        # S[t] = decay*S[t-1] + impulse[t] - decay**W * impulse[t-W]; impulse[t] arrives via _add_impulse
+        self._sent = self.decay * self._sent - self.decay**W * leaving
+        self._sent_count -= leaving_n
+        self._impulse[slot] = 0.0
+        self._n_events[slot] = 0
+
+    def _add_impulse(self, j: int, z: float, age: int) -> None:
+        W = self.active_window_days
+        slot = (self.n_bars - 1 - age) % W
+        self._impulse[slot, j] += z
+        self._n_events[slot, j] += 1
+        self._sent[j] += z * self.decay**age
+        self._sent_count[j] += 1
+
+    def on_earnings(self, events: pd.DataFrame) -> None:
+        """
+        Earnings prints with columns ticker, event_date, surprise_raw (as from
+        compute_eps_surprise), in event-date order. Each updates its ticker's
+        expanding surprise z-score; the z impulse lands on the bar with the
+        same date (current, earlier within the active window, or a future bar).
+        """
+        with self._lock:
+            for ticker, event_date, x in events[["ticker", "event_date", "surprise_raw"]].itertuples(index=False):
+                j = self._col.get(str(ticker))
+                if j is None:
+                    continue
+                self._has_events[j] = True
+                if pd.isna(x):
+                    continue
+                n, s, ss = self._surprise_state[:, j] + (1.0, x, x * x)
+                self._surprise_state[:, j] = (n, s, ss)
+                mu = s / n
+                mean_sq = ss / n
+                var = mean_sq - mu * mu
+                if var <= 1e-14 * mean_sq:
+                    var = 0.0
+                if n < max(self.surprise_min_periods, self.surprise_min_events) or var == 0.0:
+                    continue
+                z = (x - mu) / np.sqrt(var)
+
+                ev_date = pd.Timestamp(event_date).normalize()
+                if self.last_date is None or ev_date > self.last_date:
+                    self._pending.append((ev_date, j, z))
+                    continue
+                # Back-dated prints land on their own bar if it is still in the window
+                bar = self._bar_dates.get(ev_date)
+                if bar is not None:
+                    self._add_impulse(j, z, age=self.n_bars - 1 - bar)
+
+    @classmethod
+    def from_history(cls,
+                     prices: pd.DataFrame,
+                     volume: pd.DataFrame = None,
+                     event_surprise: pd.DataFrame = None,
+                     members: pd.DataFrame = None,
+                     **kwargs) -> "SignalServer":
+        """
+        Warm a server up by replaying a (dates x tickers) history bar by bar.
+        `event_surprise` is compute_eps_surprise output; each print is fed
+        right after the bar with its date (prints on non-trading days only
+        move the surprise z-score state, as in the batch build). `members`
+        is a membership mask (see load_membership), fed one row per bar.
+        """
+        server = cls(prices.columns, **kwargs)
+        dates = pd.DatetimeIndex(prices.index).normalize()
+        live = member_array(members, prices.index, prices.columns) if members is not None else None
+        vol = volume.reindex(index=prices.index, columns=prices.columns).to_numpy(dtype=float) if volume is not None else None
+        px = prices.to_numpy(dtype=float)
+        if event_surprise is not None and len(event_surprise):
+            ev = event_surprise.assign(event_date=pd.to_datetime(event_surprise["event_date"]).dt.normalize())
+            ev = ev.sort_values(["event_date", "ticker"], kind="stable")
+            # Prints up to and including each bar's date, fed after that bar
+            cut = np.searchsorted(ev["event_date"].to_numpy(), dates.to_numpy(), side="right")
+        else:
+            ev, cut = None, np.zeros(len(dates), dtype=np.int64)
+        start = 0
+        for i, date in enumerate(dates):
+            server.on_bar(date, px[i], vol[i] if vol is not None else None,
+                          members=live[i] if live is not None else None)
+            if cut[i] > start:
+                server.on_earnings(ev.iloc[start:cut[i]])
+                start = cut[i]
+        return server
+
+    # ------------------------
+    # Queries
+    # ------------------------
+    def scores(self) -> pd.DataFrame:
+        """
+        Current cross-sectional scores per ticker.
+        """
+        with self._lock:
+            sent = np.where(self._sent_count > 0, self._sent, 0.0)
+            return pd.DataFrame({
+                "momentum_z": self._mom_z,
+                "volume_shock": self._shock,
+                "volume_shock_z": self._shock_z,
+                "sentiment": sent,
+            }, index=self.tickers)
+
+    def weights(self) -> pd.Series:
+        """
+        Current long-only weights (build_weights on today's cross-section).
+        Only tickers that have had an earnings print take part, matching the
+        batch alignment on the sentiment panel's columns, and only live
+        members are held.
+        """
+        from multi_source_alpha.scripts.build_portfolio_weights import DEFAULT_PARAMS, build_weights
+
+        with self._lock:
+            live = self._live_row()
+        sc = self.scores()
+        sc = sc[self._has_events]
+        row = lambda col: pd.DataFrame([sc[col].to_numpy()], index=[self.last_date], columns=sc.index)
+        W, _, _ = build_weights(row("momentum_z"), row("sentiment"), row("volume_shock_z"),
+                                **(self.weight_params or DEFAULT_PARAMS),
+                                members=None if live is None else live[:, self._has_events])
+        return W.iloc[0].reindex(self.tickers, fill_value=0.0)
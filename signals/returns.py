@@ -1,11 +1,28 @@
-import pandas as pd
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
 from pathlib import Path
+import numpy as np
+import pandas as pd
+from multi_source_alpha.data_providers.panel_store import (
+    ADJ_CLOSE_CSV,
+    ADJ_CLOSE_STORE,
+    VALUES_FILE,
+    panel_dir,
+    ensure_panel,
+    read_panel,
+    read_panel_index,
+    read_panel_meta,
+)
+from multi_source_alpha.signals.momentum import load_sp500_adj_close
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
-PRICES_PATH = REPO_ROOT / 'data' / 'prices' / 'sp500_adj_close.csv'
-def load_sp500_adj_close() -> pd.DataFrame:
-    df = pd.read_csv(PRICES_PATH, index_col=0, parse_dates=True)
-    df = df.sort_index()
-    return df
+FWD_CACHE_DIR = REPO_ROOT / "data" / "cache" / "forward_returns"
+# Materialized horizons kept per price panel (in memory and on disk), and price panels kept on disk
+DEFAULT_MAX_CACHED = 8
+DEFAULT_MAX_PANELS = 4
 
 def compute_forward_returns(prices:pd.DataFrame,
                             horizons = (1,5,21,63),
@@ -15,9 +32,195 @@ def compute_forward_returns(prices:pd.DataFrame,
         fwd[h] = (prices.shift(-h)/prices) - 1.0
     return fwd
 
+
+# ------------------------
+# Lazy forward-return provider
+# ------------------------
+def _frame_key(prices: pd.DataFrame) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    h.update(np.ascontiguousarray(prices.to_numpy(dtype=np.float64)).view(np.uint8))
+    h.update(pd.DatetimeIndex(prices.index).asi8.tobytes())
+    h.update("\x00".join(map(str, prices.columns)).encode())
+    return h.hexdigest()
+
+
+def _store_key(store: Path) -> str:
+    # A rewritten store (new values file) gets a new key, so stale caches are never read
+    values = panel_dir(store) / VALUES_FILE
+    st = values.stat()
+    ident = f"{values.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.blake2b(ident.encode(), digest_size=12).hexdigest()
+
+
+def _save_atomic(path: Path, arr: np.ndarray) -> None:
+    # Other processes may be reading the same cache: write aside, then rename into place
+    fd, tmp = tempfile.mkstemp(suffix=".npy", dir=path.parent)
+    os.close(fd)
+    try:
+        np.save(tmp, arr)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class ForwardReturns:
+    """
+    Forward returns for any horizon, derived on demand from one cumulative
+    log-price panel: fwd_h[t] = exp(L[t+h] - L[t]) - 1, one subtraction and
+    one expm1 per horizon instead of a shifted copy and a division.
+
+    Materialized horizons sit in a bounded LRU cache, mirrored on disk under
+    `cache_dir/<panel key>/` so later processes memory-map them instead of
+    recomputing. Returned frames may be read-only views of that cache.
+    Pass cache_dir=None to keep everything in memory.
+    """
+    def __init__(self,
+                 index: pd.DatetimeIndex,
+                 columns: pd.Index,
+                 load_prices,
+                 key: str | None,
+                 cache_dir: Path = FWD_CACHE_DIR,
+                 max_cached: int = DEFAULT_MAX_CACHED,
+                 max_panels: int = DEFAULT_MAX_PANELS):
+        self.index = index
+        self.columns = columns
+        self.key = key
+        self.max_cached = max_cached
+        self._load_prices = load_prices
+        self._memory = OrderedDict()
+        self._log_price = None
+        self.cache_dir = None
+        if cache_dir is not None:
+            self.cache_dir = Path(cache_dir) / key
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            os.utime(self.cache_dir)
+            self._prune_panels(Path(cache_dir), max_panels)
+
+    @classmethod
+    def from_frame(cls, prices: pd.DataFrame, **kwargs) -> "ForwardReturns":
+        # Hashing the values is only needed to find an on-disk cache
+        key = _frame_key(prices) if kwargs.get("cache_dir", FWD_CACHE_DIR) is not None else None
+        return cls(prices.index, prices.columns, lambda: prices, key, **kwargs)
+
+    @classmethod
+    def from_store(cls, store: Path = ADJ_CLOSE_STORE, csv_path: Path = ADJ_CLOSE_CSV, **kwargs) -> "ForwardReturns":
+        """
+        Provider over a panel store; prices are only read on a cache miss.
+        """
+        store = ensure_panel(store, csv_path)
+        return cls(read_panel_index(store), pd.Index(read_panel_meta(store)["tickers"]),
+                   lambda: read_panel(store), _store_key(store), **kwargs)
+
+    # ------------------------
+    # Cache
+    # ------------------------
+    def _path(self, name: str) -> Path | None:
+        return None if self.cache_dir is None else self.cache_dir / f"{name}.npy"
+
+    def _load_cached(self, name: str, mmap_mode="r"):
+        path = self._path(name)
+        if path is None or not path.exists():
+            return None
+        try:
+            arr = np.load(path, mmap_mode=mmap_mode)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return arr
+
+    def _prune_panels(self, root: Path, max_panels: int) -> None:
+        dirs = sorted((d for d in root.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime, reverse=True)
+        for d in dirs[max_panels:]:
+            if d != self.cache_dir:
+                shutil.rmtree(d, ignore_errors=True)
+
+    def _prune_horizons(self) -> None:
+        files = sorted(self.cache_dir.glob("fwd_*d.npy"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for p in files[self.max_cached:]:
+            p.unlink(missing_ok=True)
+
+    # ------------------------
+    # Returns
+    # ------------------------
+    def log_price(self) -> np.ndarray:
+        """
+        Cumulative log return panel (log of prices), computed once per panel.
+        """
+        if self._log_price is None:
+            # Read in full: every horizon touches the whole panel twice
+            arr = self._load_cached("log_price", mmap_mode=None)
+            if arr is None:
+                prices = self._load_prices().to_numpy(dtype=np.float64)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    arr = np.log(prices)
+                if self.cache_dir is not None:
+                    _save_atomic(self._path("log_price"), arr)
+            self._log_price = arr
+        return self._log_price
+
+    def _log_diff(self, horizon: int) -> np.ndarray:
+        if horizon < 1:
+            raise ValueError(f"Forward-return horizon must be >= 1, got {horizon}")
+        L = self.log_price()
+        out = np.empty_like(L)
+        h = min(horizon, len(L))
+        np.subtract(L[h:], L[:len(L) - h], out=out[:len(L) - h])
+        out[len(L) - h:] = np.nan
+        return out
+
+    def log_returns(self, horizon: int) -> pd.DataFrame:
+        """
+        h-day forward log return (not cached: a single subtraction).
+        """
+        return pd.DataFrame(self._log_diff(horizon), index=self.index, columns=self.columns, copy=False)
+
+    def returns(self, horizon: int) -> pd.DataFrame:
+        """
+        h-day forward simple return, equal to prices.shift(-h) / prices - 1.
+        """
+        horizon = int(horizon)
+        if horizon in self._memory:
+            self._memory.move_to_end(horizon)
+            return self._memory[horizon]
+        name = f"fwd_{horizon}d"
+        arr = self._load_cached(name)
+        if arr is None:
+            arr = self._log_diff(horizon)
+            np.expm1(arr, out=arr)
+            if self.cache_dir is not None:
+                _save_atomic(self._path(name), arr)
+                self._prune_horizons()
+        fwd = pd.DataFrame(arr, index=self.index, columns=self.columns, copy=False)
+        self._memory[horizon] = fwd
+        while len(self._memory) > self.max_cached:
+            self._memory.popitem(last=False)
+        return fwd
+
+    __getitem__ = returns
+
+    def horizons(self, horizons=(1, 5, 21, 63)) -> dict[int, pd.DataFrame]:
+        return {h: self.returns(h) for h in horizons}
+
+
+_DEFAULT_PROVIDER = None
+
+
+def load_forward_returns(horizon: int = 21) -> pd.DataFrame:
+    """
+    h-day forward returns of the S&P 500 adjusted-close store, via a shared
+    cached ForwardReturns provider.
+    """
+    global _DEFAULT_PROVIDER
+    store = ensure_panel(ADJ_CLOSE_STORE, ADJ_CLOSE_CSV)
+    if _DEFAULT_PROVIDER is None or _DEFAULT_PROVIDER.key != _store_key(store):
+        _DEFAULT_PROVIDER = ForwardReturns.from_store(store)
+    return _DEFAULT_PROVIDER.returns(horizon)
+
+
 if __name__ == "__main__":
     prices = load_sp500_adj_close()
     fwd = compute_forward_returns(prices)
     for h, df_h in fwd.items():
         print(f"Horizon {h} days, shape: {df_h.shape}")
-        print(df_h.tail())
\ No newline at end of file
+        print(df_h.tail())
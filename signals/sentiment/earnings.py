@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd 
+from scipy.signal import lfilter
 def compute_eps_surprise(events: pd.DataFrame,
                          date_col = "date",
                          ticker_col = "symbol",
@@ -13,43 +14,173 @@ def compute_eps_surprise(events: pd.DataFrame,
         actual_col: "eps_actual",
         estimate_col: "eps_est"
     })
-    df["event_date"] = pd.to_datetime(df["event_date"]).dt.date
+    #Keep datetime64 (normalized to the day), no per-event Python date objects
+    df["event_date"] = pd.to_datetime(df["event_date"]).dt.normalize()
     df = df.dropna(subset = ["ticker","eps_actual","eps_est","event_date"])
     df["surprise_raw"] = (df["eps_actual"] - df["eps_est"])/abs(df["eps_est"] + eps)
     return df[["ticker","event_date","surprise_raw"]].sort_values(["ticker","event_date"])
+def grouped_expanding_z(codes: np.ndarray,
+                        x: np.ndarray,
+                        min_periods = 3,
+                        state: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+    #Expanding z-score of x within each group, rows already ordered by
+    #(group, time). One pass of cumulative (count, sum, sum of squares),
+    #restarted at each group boundary; NaNs are skipped like expanding().
+    #`state` (3 x n_groups) continues each group from earlier rows.
+    #Returns (z, running count).
+    n_rows = len(x)
+    if n_rows == 0:
+        return np.empty(0), np.empty(0)
+    ok = ~np.isnan(x)
+    first = np.r_[True, codes[1:] != codes[:-1]]
+    starts = np.flatnonzero(first)
+    run_id = np.cumsum(first) - 1
+    #Sums are taken around a per-group reference (its first value, or its
+    #prior mean when continuing) to avoid cancellation in ss/n - mu^2
+    if state is not None:
+        prev = state[:, codes[starts]]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ref = np.where(prev[0] > 0, prev[1] / prev[0], 0.0)
+        prev = np.stack([prev[0], prev[1] - prev[0] * ref, prev[2] - 2 * ref * prev[1] + prev[0] * ref**2])
+    else:
+        first_ok = np.minimum.reduceat(np.where(ok, np.arange(n_rows), n_rows), starts)
+        ref = np.where(first_ok < n_rows, x[np.minimum(first_ok, n_rows - 1)], 0.0)
+        prev = np.zeros((3, len(starts)))
+    xv = np.where(ok, x - ref[run_id], 0.0)
+    #Lay groups out as (group x position) rows so each cumsum starts at 0
+    #(a flat cumsum would carry every earlier group's rounding along)
+    pos = np.arange(n_rows) - starts[run_id]
+    grid = np.zeros((3, len(starts), pos.max() + 1))
+    grid[:, run_id, pos] = np.stack([ok.astype(float), xv, xv * xv])
+    np.cumsum(grid, axis=2, out=grid)
+    n, s, ss = grid[:, run_id, pos] + prev[:, run_id]
+    x = x - ref[run_id]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = s / n
+        mean_sq = ss / n
+        var = mean_sq - mu**2
+        var[var <= 1e-14 * mean_sq] = 0.0
+        std = np.sqrt(var)
+        z = (x - mu) / np.where(std == 0, np.nan, std)
+    z[n < min_periods] = np.nan
+    return z, n
+def _ticker_order(event_surprise:pd.DataFrame, tickers:pd.Index = None) -> tuple[np.ndarray, np.ndarray, pd.Index]:
+    #Integer ticker codes and the stable (ticker, event_date) row order
+    dates = pd.to_datetime(event_surprise["event_date"]).to_numpy(dtype="datetime64[ns]")
+    codes, uniques = pd.factorize(event_surprise["ticker"], sort=True)
+    if tickers is not None:
+        uniques = tickers.append(pd.Index(uniques).difference(tickers))
+        codes = uniques.get_indexer(event_surprise["ticker"])
+    order = np.argsort(dates, kind="stable")
+    order = order[np.argsort(codes[order], kind="stable")]
+    return codes, order, pd.Index(uniques)
 def standardize_surprise_within_ticker(event_surprise:pd.DataFrame,
-                                       min_events = 6)-> pd.DataFrame:
+                                       min_events = 6,
+                                       min_periods = 3)-> pd.DataFrame:
+    #Per-ticker expanding z-score of surprise_raw in event-date order
+    #(mean/std over the ticker's prints so far, ddof=0, at least
+    #min_periods of them). A z is only reported once the ticker has
+    #min_events prints, counting the current one (point-in-time).
     df = event_surprise.copy()
-    def _expanding_z(x:pd.Series) -> pd.Series:
-        mu = x.expanding(min_periods=3).mean()
-        std = x.expanding(min_periods=3).std(ddof=0)
-        return (x - mu) / std.replace(0,np.nan)
-    df["surprise_z"] = df.groupby("ticker")["surprise_raw"].transform(_expanding_z)
+    codes, order, _ = _ticker_order(df)
+    x = df["surprise_raw"].to_numpy(dtype=float)[order]
+    z, n = grouped_expanding_z(codes[order], x, min_periods)
+    z[n < min_events] = np.nan
+    out = np.empty(len(df))
+    out[order] = z
+    df["surprise_z"] = out
     return df
+def extend_surprise_z(prior_z:pd.DataFrame,
+                      event_surprise:pd.DataFrame,
+                      min_periods = 3,
+                      min_events = 6) -> pd.DataFrame:
+    #Continue the per-ticker expanding z-score from the persisted events
+    #using each ticker's running (count, sum, sum of squares) as state.
+    #Tickers whose history changed (a revised or dropped print, or a
+    #back-dated new one) are recomputed from scratch instead.
+    prior_dates = pd.to_datetime(prior_z["event_date"])
+    dates = pd.to_datetime(event_surprise["event_date"])
+    prior_key = pd.MultiIndex.from_arrays([prior_z["ticker"].astype(str), prior_dates])
+    key = pd.MultiIndex.from_arrays([event_surprise["ticker"].astype(str), dates])
+    pos = prior_key.get_indexer(key)
+    is_new = pos < 0
+    #Same (ticker, event_date) but a different surprise (e.g. revised EPS)
+    old = prior_z["surprise_raw"].to_numpy(dtype=float)[np.maximum(pos, 0)]
+    cur = event_surprise["surprise_raw"].to_numpy(dtype=float)
+    revised = ~is_new & ~((old == cur) | (np.isnan(old) & np.isnan(cur)))
+    last_seen = prior_dates.groupby(prior_z["ticker"].astype(str)).max()
+    tickers = event_surprise["ticker"].astype(str)
+    back_dated = is_new & (dates <= tickers.map(last_seen)).to_numpy()
+    dropped = ~prior_key.isin(key)
+    dirty = set(tickers[revised | back_dated]) | set(prior_z["ticker"].astype(str)[dropped])
+    if not is_new.any() and not dirty:
+        return prior_z
+
+    in_dirty = tickers.isin(dirty).to_numpy()
+    prior_clean = prior_z[~prior_z["ticker"].astype(str).isin(dirty).to_numpy()]
+    new = event_surprise[is_new & ~in_dirty].copy()
+    parts = [prior_clean]
+    if dirty:
+        parts.append(standardize_surprise_within_ticker(event_surprise[in_dirty], min_events=min_events, min_periods=min_periods))
+    if not new.empty:
+        x0 = prior_clean["surprise_raw"]
+        state = pd.DataFrame({"n": x0.notna(), "s": x0.fillna(0.0), "ss": x0.fillna(0.0)**2}).groupby(prior_clean["ticker"].astype(str)).sum()
+        new["ticker"] = new["ticker"].astype(str)
+        codes, order, uniq = _ticker_order(new, state.index)
+        prev = state.reindex(uniq).fillna(0.0).to_numpy().T
+        new = new.iloc[order]
+        z, n = grouped_expanding_z(codes[order], new["surprise_raw"].to_numpy(dtype=float), min_periods, state=prev)
+        z[n < min_events] = np.nan
+        new["surprise_z"] = z
+        parts.append(new)
+    out = pd.concat([df.assign(ticker=df["ticker"].astype(str)) for df in parts], ignore_index=True)
+    out["event_date"] = pd.to_datetime(out["event_date"])
+    return out.sort_values(["ticker","event_date"]).reset_index(drop=True)
+def first_changed_event_date(prior_z:pd.DataFrame, event_z:pd.DataFrame) -> pd.Timestamp:
+    #Earliest event_date whose surprise_z was added, removed or changed
+    #between two event tables (NaT if none). Daily sentiment before that
+    #date is unaffected; a NaN z is the same as no event.
+    cols = ["ticker","event_date","surprise_z"]
+    old, cur = prior_z[cols].copy(), event_z[cols].copy()
+    for df in (old, cur):
+        df["ticker"] = df["ticker"].astype(str)
+        df["event_date"] = pd.to_datetime(df["event_date"])
+    m = old.merge(cur, on=["ticker","event_date"], how="outer", suffixes=("_old","_new"))
+    a, b = m["surprise_z_old"].to_numpy(dtype=float), m["surprise_z_new"].to_numpy(dtype=float)
+    diff = ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return m.loc[diff, "event_date"].min()
 def build_daily_decayed_sentiment(event_z:pd.DataFrame,
                                   trading_index:pd.DatetimeIndex,
                                   half_life_days: int = 42,
-                                  active_window_days: int = 126) -> pd.DataFrame:
+                                  active_window_days: int = 126,
+                                  dtype = np.float64,
+                                  sparse: bool = False) -> pd.DataFrame:
     lam = np.log(2) / half_life_days
     #Calculating decay constant(lambda) using half-life formula
     #After 42 days: The impact of an event is halved
+    decay = np.exp(-lam)
     dates = pd.DatetimeIndex(trading_index).normalize()
-    date_to_pos = {d:i for i,d in enumerate(dates)}
     tickers = sorted(event_z["ticker"].unique())
-    S = np.zeros((len(dates), len(tickers)), dtype=float)
-    ticker_to_j = {t:j for j,t in enumerate(tickers)}
-    ez = event_z.dropna(subset=["surprise_z"]).copy()
-    ez["event_date"] = pd.to_datetime(ez["event_date"]).dt.normalize()
-    for row in ez.itertuples():
-        tkr = row.ticker
-        d0 = row.event_date
-        z = row.surprise_z
-        if tkr not in ticker_to_j or d0 not in date_to_pos:
-            continue
-        i0 = date_to_pos[d0]
-        j = ticker_to_j[tkr]
-        i1 = min(i0 + active_window_days, len(dates))
-        dt = np.arange(0,i1-i0)
-        S[i0:i1,j] += z*np.exp(-lam*dt)
-    sentiment_df = pd.DataFrame(S, index=dates, columns=tickers)
+    ez = event_z.dropna(subset=["surprise_z"])
+    i0 = dates.get_indexer(pd.to_datetime(ez["event_date"]).dt.normalize())
+    j = pd.Index(tickers).get_indexer(ez["ticker"])
+    keep = (i0 >= 0) & (j >= 0)
+    i0, j, z = i0[keep], j[keep], ez["surprise_z"].to_numpy(dtype=float)[keep]
+    #Scatter all event impulses at once (same-day events for a ticker add up)
+    impulse = np.zeros((len(dates), len(tickers)), dtype=float)
+    np.add.at(impulse, (i0, j), z)
+    n_events = np.zeros((len(dates), len(tickers)), dtype=np.int32)
+    np.add.at(n_events, (i0, j), 1)
+    #Each impulse leaves the window after active_window_days:
+    #S[t] = decay*S[t-1] + impulse[t] - decay**W * impulse[t-W]
+    W = active_window_days
+    if W < len(dates):
+        impulse[W:] -= decay**W * impulse[:-W]
+        n_events[W:] -= n_events[:-W]
+    S = lfilter([1.0], [1.0, -decay], impulse, axis=0)
+    #Exact zeros where no event is active (no cancellation residue)
+    S[np.cumsum(n_events, axis=0) == 0] = 0.0
+    sentiment_df = pd.DataFrame(S.astype(dtype, copy=False), index=dates, columns=tickers)
+    if sparse:
+        sentiment_df = sentiment_df.astype(pd.SparseDtype(dtype, 0.0))
     return sentiment_df
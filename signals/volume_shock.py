@@ -1,7 +1,21 @@
+import sys
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from multi_source_alpha.data_providers.panel_store import VOLUME_STORE, load_volume, load_volume_index
+from multi_source_alpha.data_providers.universe import load_membership, member_array, membership_mtime
+from multi_source_alpha.pipeline.profiling import profiled, step
+from multi_source_alpha.signals.cross_section import lerp
+from multi_source_alpha.signals.incremental import (
+    load_persisted,
+    first_pending_pos,
+    warmup_start,
+    can_append,
+    append_rows,
+    outdated_by,
+)
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 PRICES_DIR = REPO_ROOT / "data" / "prices"
 
@@ -15,25 +29,108 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 OUT_RAW = OUT_DIR / "volume_shock_raw.parquet"
 OUT_Z = OUT_DIR / "volume_shock_z.parquet"
 
-def load_volume_panel() -> pd.DataFrame:
-    if not VOLUME_PATH.exists():
+def load_volume_panel(tickers=None, start=None, end=None, dtype=None) -> pd.DataFrame:
+    if not VOLUME_STORE.exists() and not VOLUME_PATH.exists():
         raise FileNotFoundError(f"Volume data not found at {VOLUME_PATH}. Please run 'scripts/get_volume_yfinance.py' to download it.")
-    vol = pd.read_csv(VOLUME_PATH, index_col = 0, parse_dates=True)
-    vol = vol.sort_index()
-    return vol
+    return load_volume(tickers=tickers, start=start, end=end, dtype=dtype)
+
+def winsorize_rows_inplace(a: np.ndarray, lower_q=0.01, upper_q=0.99, block_rows = 64) -> np.ndarray:
+    """
+    Clip each row of `a` (NaN-aware) to its [lower_q, upper_q] quantiles, in place.
+
+    Rows are grouped by their number of valid values; each group gets one
+    np.partition that places both bounds' order statistics at once. Groups
+    are processed `block_rows` rows at a time to bound scratch memory.
+    """
+    n_valid = (~np.isnan(a)).sum(axis=1)
+    for n in np.unique(n_valid):
+        if n == 0:
+            continue
+        bounds = []
+        for q in (lower_q, upper_q):
+            pos = q * (n - 1)
+            f = int(np.floor(pos))
+            bounds.append((f, min(f + 1, n - 1), pos - f))
+        kth = sorted({k for f, c, _ in bounds for k in (f, c)})
+        group = np.flatnonzero(n_valid == n)
+        for r0 in range(0, len(group), block_rows):
+            rows = group[r0:r0 + block_rows]
+            sub = a[rows]
+            part = np.partition(np.where(np.isnan(sub), np.inf, sub), kth, axis=1)
+            lo, hi = (lerp(part[:, f], part[:, c], t)[:, None] for f, c, t in bounds)
+            a[rows] = np.clip(sub, lo, hi)
+    return a
+
+def _constant_windows(x: np.ndarray, valid: np.ndarray, lag: np.ndarray) -> np.ndarray:
+    """
+    True where the valid values in the window [lag[t], t] of each column are
+    all equal: no valid value differs from the valid value before it, not
+    counting the window's first one.
+    """
+    T = x.shape[0]
+    rows = np.arange(T)[:, None]
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    prev = np.vstack([np.full((1, x.shape[1]), -1), last[:-1]])
+    before = np.take_along_axis(x, np.maximum(prev, 0), axis=0)
+    change = valid & (prev >= 0) & (x != before)
+    c = np.zeros((T + 1, x.shape[1]), dtype=np.int64)
+    np.cumsum(change, axis=0, out=c[1:])
+    # First valid row at or after each window start
+    nxt = np.minimum.accumulate(np.where(valid, rows, T)[::-1], axis=0)[::-1]
+    first = np.take_along_axis(nxt, np.broadcast_to(lag[:, None], x.shape), axis=0)
+    first_change = np.take_along_axis(change, np.minimum(first, T - 1), axis=0) & (first < T)
+    return (c[1:] - c[lag]) - first_change == 0
+
+def rolling_zscore_inplace(a: np.ndarray, window = 60, min_periods = 40, block_cols = 64) -> np.ndarray:
+    """
+    (x - rolling mean) / rolling std (ddof=0) down each column, in place.
+
+    Mean and variance come from one pass of windowed cumulative sums of
+    (count, x, x^2), computed per block of `block_cols` columns so the scratch
+    memory does not grow with the number of tickers. Columns are centred on
+    their mean first to keep the x^2 sums well conditioned. Same min_periods
+    and zero-std semantics as the pandas rolling version: the std is zero
+    (z -> NaN) exactly when every valid value in the window is equal.
+    """
+    T = a.shape[0]
+    lag = np.maximum(np.arange(1, T + 1) - window, 0)
+    for j0 in range(0, a.shape[1], block_cols):
+        x = a[:, j0:j0 + block_cols]
+        valid = ~np.isnan(x)
+        n_col = valid.sum(axis=0)
+        ref = np.where(n_col > 0, np.where(valid, x, 0.0).sum(axis=0) / np.maximum(n_col, 1), 0.0)
+        xc = np.where(valid, x - ref, 0.0)
+        sums = []
+        for v in (valid.astype(float), xc, xc * xc):
+            c = np.zeros((T + 1, x.shape[1]))
+            np.cumsum(v, axis=0, out=c[1:])
+            sums.append(c[1:] - c[lag])
+        n, s1, s2 = sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m1 = s1 / n
+            m2 = s2 / n
+            var = m2 - m1 * m1
+            var[_constant_windows(x, valid, lag)] = 0.0
+            # A non-constant window whose variance cancels to <= 0 has no usable std either
+            sd = np.sqrt(np.where(var > 0, var, np.nan))
+            z = (xc - m1) / sd
+        z[(n < min_periods) | ~valid] = np.nan
+        a[:, j0:j0 + block_cols] = z
+    return a
 
 def winsorize_df(df: pd.DataFrame, lower_q=0.01, upper_q=0.99) -> pd.DataFrame:
-    lo = df.quantile(lower_q, axis=1)
-    hi = df.quantile(upper_q, axis=1)
-    return df.clip(lower=lo, upper=hi, axis=0)
+    a = winsorize_rows_inplace(df.to_numpy(dtype=float, copy=True), lower_q, upper_q)
+    return pd.DataFrame(a, index=df.index, columns=df.columns, copy=False)
 
 def rolling_zscore(df: pd.DataFrame, window = 60, min_periods = 40) -> pd.DataFrame:
-    mu = df.rolling(window=window, min_periods=min_periods).mean()
-    sd = df.rolling(window=window, min_periods=min_periods).std(ddof=0).replace(0,np.nan)
-    return (df-mu)/sd
+    a = rolling_zscore_inplace(df.to_numpy(dtype=float, copy=True), window, min_periods)
+    return pd.DataFrame(a, index=df.index, columns=df.columns, copy=False)
 
 
-def cross_sectional_zscore(panel: pd.DataFrame) -> pd.DataFrame:
+def cross_sectional_zscore(panel: pd.DataFrame, members=None) -> pd.DataFrame:
+    #Non-members (point-in-time membership) are NaN and left out of mu / sd
+    if members is not None:
+        panel = panel.where(member_array(members, panel.index, panel.columns))
     mu = panel.mean(axis=1)
     sd = panel.std(axis=1).replace(0, np.nan)
     return panel.sub(mu, axis=0).div(sd, axis=0)
@@ -42,25 +139,76 @@ def compute_volume_shock(volume: pd.DataFrame,
                          window = 60,
                          min_periods = 40,
                          winsorize = True) -> pd.DataFrame:
-    v = volume.copy()
-    v = v.apply(pd.to_numeric, errors='coerce')
-    v = v.where(v > 0, np.nan)
-    logv = np.log(v)
+    #One working float panel: log, winsorize and rolling z-score all run in place
+    numeric = volume.dtypes.map(pd.api.types.is_numeric_dtype)
+    if not numeric.all():
+        volume = volume.apply(pd.to_numeric, errors='coerce')
+    v = volume.to_numpy(dtype=float, copy=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        v[~(v > 0)] = np.nan
+        np.log(v, out=v)
     if winsorize:
-        logv = winsorize_df(logv, 0.01,0.99)
-    shock = rolling_zscore(logv, window=window, min_periods=min_periods)
+        winsorize_rows_inplace(v, 0.01, 0.99)
+    rolling_zscore_inplace(v, window=window, min_periods=min_periods)
+    shock = pd.DataFrame(v, index=volume.index, columns=volume.columns, copy=False)
     return shock
 
-def main():
-    vol = load_volume_panel()
-    shock = compute_volume_shock(vol, window=60, min_periods=40, winsorize=True)
-
-    # Save raw rolling z-score signal
-    shock.to_parquet(OUT_RAW)
-
-    # Save cross-sectional standardized version (useful if you want to rank stocks each day)
-    shock_cs = cross_sectional_zscore(shock)
-    shock_cs.to_parquet(OUT_Z)
+@profiled("volume_shock")
+def main(incremental: bool = False):
+    window, min_periods = 60, 40
+    with step("load_existing") as st:
+        existing_raw = load_persisted(OUT_RAW, incremental)
+        existing_z = load_persisted(OUT_Z, incremental)
+        st.output("existing_raw", existing_raw)
+        st.output("existing_z", existing_z)
+    if existing_z is None:
+        existing_raw = None
+    if existing_raw is not None and outdated_by(OUT_Z, membership_mtime()):
+        # Persisted cross-sectional z-scores were ranked under the old membership
+        print("[Incremental] Membership changed, running full rebuild")
+        return main(incremental=False)
+
+    index = load_volume_index()
+    first_new = first_pending_pos(existing_raw, index)
+    if existing_raw is not None and first_new >= len(index):
+        print("[Incremental] volume shock is up to date")
+        return
+
+    # Incremental: the rolling moments only need the previous window-1 rows
+    start = warmup_start(index, first_new, window - 1) if existing_raw is not None else None
+    if start is not None:
+        print(f"[Incremental] {len(index) - first_new} new dates, loading from {start.date()}")
+
+    with step("load_volume") as st:
+        vol = load_volume_panel(start=start)
+        st.output("volume", vol)
+    with step("rolling_zscore") as st:
+        shock = compute_volume_shock(vol, window=window, min_periods=min_periods, winsorize=True)
+        st.input("volume", vol)
+        st.output("shock", shock)
+    # Cross-sectional standardized version (useful if you want to rank stocks each day)
+    with step("cross_sectional_zscore") as st:
+        members = load_membership()
+        if members is not None:
+            print("[Universe] Point-in-time membership mask")
+        shock_cs = cross_sectional_zscore(shock, members)
+        st.input("shock", shock)
+        st.output("shock_cs", shock_cs)
+
+    if existing_raw is not None:
+        if can_append(existing_raw, shock) and can_append(existing_z, shock_cs):
+            shock = append_rows(existing_raw, shock)
+            shock_cs = append_rows(existing_z, shock_cs)
+        else:
+            print("[Incremental] Ticker set changed, running full rebuild")
+            return main(incremental=False)
+
+    # Save raw rolling z-score signal + cross-sectional version
+    with step("save") as st:
+        shock.to_parquet(OUT_RAW)
+        shock_cs.to_parquet(OUT_Z)
+        st.output("raw_file", OUT_RAW)
+        st.output("z_file", OUT_Z)
 
     print(f"Saved volume shock to:\n  {OUT_RAW}\n  {OUT_Z}")
     print("Shape:", shock.shape)
@@ -68,4 +216,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(incremental="--incremental" in sys.argv)
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add the parent directory of 'multi_source_alpha' to the path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from multi_source_alpha.data_providers import earnings_finnhub
+
+
+def _stub_server(calls: dict):
+    """
+    Local stand-in for the Finnhub earnings calendar: the first request for
+    each window gets 429 + Retry-After, later ones get one row.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            q = parse_qs(urlparse(self.path).query)
+            a = q["from"][0]
+            calls[a] = calls.get(a, 0) + 1
+            if calls[a] == 1:
+                self.send_response(429)
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return
+            body = json.dumps({"earningsCalendar": [
+                {"symbol": "AAA", "date": a, "epsActual": 1.0, "epsEstimate": 0.9}
+            ]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_retry_after_then_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("FINNHUB_API_KEY", "test")
+    calls = {}
+    server = _stub_server(calls)
+    base_url = f"http://127.0.0.1:{server.server_port}/"
+    kwargs = dict(start="2021-01-01", end="2021-06-29", chunk_days=90, rate_per_s=100.0,
+                  backoff_s=0.01, cache_dir=tmp_path, base_url=base_url)
+    try:
+        df = earnings_finnhub.fetch_earnings_history(**kwargs)
+        # Two windows, each retried once after its 429
+        assert calls == {"2021-01-01": 2, "2021-04-01": 2}
+        assert sorted(df["date"]) == ["2021-01-01", "2021-04-01"]
+        assert len(list(tmp_path.glob("earnings_*.json"))) == 2
+
+        # Settled windows come from the cache: no further requests
+        again = earnings_finnhub.fetch_earnings_history(**kwargs)
+        assert calls == {"2021-01-01": 2, "2021-04-01": 2}
+        assert again.equals(df)
+    finally:
+        server.shutdown()
+
+
+def test_open_window_cache_is_replaced(tmp_path):
+    a = date(2024, 1, 1)
+    earnings_finnhub._write_cache(tmp_path, a, date(2024, 1, 10), [])
+    earnings_finnhub._write_cache(tmp_path, a, date(2024, 1, 11), [{"symbol": "AAA"}])
+    assert [p.name for p in tmp_path.glob("earnings_*.json")] == ["earnings_2024-01-01_2024-01-11.json"]